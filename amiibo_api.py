@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import time
+import queue
+import threading
+from io import BytesIO
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pycurl
+
+API_URL = 'https://www.amiiboapi.com/api/amiibo/'
+CACHE_DIR = 'api_cache'
+CACHE_TTL = 7 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+MAX_IN_FLIGHT = 4
+
+class amiibo_api(object):
+    _shared = {}
+    _lock = threading.Lock()
+
+    def __init__(self, url=API_URL, cache_dir=CACHE_DIR, ttl=CACHE_TTL,
+                 negative_ttl=NEGATIVE_TTL, max_in_flight=MAX_IN_FLIGHT, timeout=10):
+        """
+        A client for amiiboapi.com head lookups.
+
+        Curl handles are kept in a pool and reused, so their connections
+        (and, via a CurlShare, dns and tls sessions) outlive a lookup.
+        Answers are cached in memory and on disk, one json file per head;
+        heads the api does not know are cached too, for negative_ttl.
+
+        Parameters:
+        url (str): api endpoint, queried as url?head=<head>
+        cache_dir (str): on-disk cache location; None for memory only
+        ttl (int): seconds a found head stays cached
+        negative_ttl (int): seconds an unknown head stays cached
+        max_in_flight (int): most concurrent requests in lookup_many
+        timeout (int): seconds allowed per request
+
+        Returns: Nothing
+        """
+        self.url = url
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.stats = Counter()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._cache = {} # head -> (fetched_at, amiibo dict or None)
+        self._stats_lock = threading.Lock()
+        self._handles = queue.LifoQueue()
+        self._share = pycurl.CurlShare()
+        self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+        self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+
+    @classmethod
+    def shared(cls, url=API_URL):
+        """ Returns the process-lifetime client for url, created on first use """
+        with cls._lock:
+            try:
+                return cls._shared[url]
+            except KeyError:
+                cls._shared[url] = cls(url)
+                return cls._shared[url]
+
+    def close(self):
+        """ Closes every pooled curl handle """
+        while True:
+            try:
+                self._handles.get_nowait().close()
+            except queue.Empty:
+                break
+
+    @property
+    def hit_rate(self):
+        """ Fraction of lookups answered from the cache (0.0 before any) """
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _handle(self):
+        try:
+            return self._handles.get_nowait()
+        except queue.Empty:
+            crl = pycurl.Curl()
+            crl.setopt(crl.SHARE, self._share)
+            crl.setopt(crl.TIMEOUT, self.timeout)
+            crl.setopt(crl.FOLLOWLOCATION, True)
+            self._count('handles')
+            return crl
+
+    def _fetch(self, head):
+        """
+        Queries the api for head on a pooled handle.
+
+        Returns: amiibo dict, or None if the api does not know head
+
+        Raises: pycurl.error on transport failure, ValueError on a
+                response that is neither an answer nor a 404
+        """
+        b_obj = BytesIO()
+        crl = self._handle()
+        try:
+            crl.setopt(crl.URL, '{0}?head={1}'.format(self.url, head))
+            crl.setopt(crl.WRITEDATA, b_obj)
+            crl.perform()
+            status = crl.getinfo(crl.RESPONSE_CODE)
+        except pycurl.error:
+            crl.close() # connection state unknown, don't reuse it
+            raise
+        self._handles.put(crl)
+        self._count('requests')
+
+        if status == 404:
+            return None
+        json_obj = json.loads(b_obj.getvalue().decode('utf8'))
+        if status != 200 or 'amiibo' not in json_obj:
+            raise ValueError('unexpected response {0} for head {1}'.format(status, head))
+        amiibo = json_obj['amiibo']
+        if isinstance(amiibo, list): # a head query answers with a list
+            amiibo = amiibo[0] if amiibo else None
+        return amiibo
+
+    @staticmethod
+    def _head(head):
+        """
+        Returns: head lowercased
+
+        Raises: ValueError unless head is 8 hex digits, as it also names
+                its file in cache_dir
+        """
+        head = head.lower()
+        if len(head) != 8 or head.strip('0123456789abcdef'):
+            raise ValueError('{0!r} is not an 8 hex digit character id'.format(head))
+        return head
+
+    def _path(self, head):
+        return os.path.join(self.cache_dir, head + '.json')
+
+    def _cached(self, head):
+        """ Returns: (True, amiibo dict or None) if head is freshly cached, else (False, None) """
+        entry = self._cache.get(head)
+        if entry is None and self.cache_dir:
+            try:
+                with open(self._path(head), 'r') as fh:
+                    entry = tuple(json.load(fh))
+                self._cache[head] = entry
+            except (OSError, ValueError):
+                pass
+        if entry is None:
+            return (False, None)
+
+        fetched_at, amiibo = entry
+        ttl = self.ttl if amiibo is not None else self.negative_ttl
+        if time.time() - fetched_at >= ttl:
+            return (False, None)
+        return (True, amiibo)
+
+    def _store(self, head, amiibo):
+        entry = (time.time(), amiibo)
+        self._cache[head] = entry
+        if self.cache_dir:
+            path = self._path(head)
+            tmp = '{0}.{1}.tmp'.format(path, threading.get_ident())
+            with open(tmp, 'w') as fh:
+                json.dump(entry, fh)
+            os.replace(tmp, path)
+
+    def lookup(self, head):
+        """
+        Parameters:
+        head (str): 8 char character id, e.g., nfc_parser.character_id
+
+        Returns: the api's amiibo dict for head, or None if it has none
+
+        Raises: ValueError if head is not 8 hex digits
+        """
+        head = self._head(head)
+        found, amiibo = self._cached(head)
+        if found:
+            self._count('hits')
+            return amiibo
+
+        self._count('misses')
+        amiibo = self._fetch(head)
+        self._store(head, amiibo)
+        return amiibo
+
+    def lookup_many(self, heads):
+        """
+        Looks up several heads at once; cache misses are fetched
+        concurrently, at most max_in_flight at a time.
+
+        Returns: {head: amiibo dict or None} for each distinct head
+
+        Raises: the first transport error met, after the rest complete
+        """
+        results = {}
+        pending = []
+        for head in heads:
+            if head in results or head in pending:
+                continue
+            found, amiibo = self._cached(self._head(head))
+            if found:
+                self._count('hits')
+                results[head] = amiibo
+            else:
+                pending.append(head)
+
+        if pending:
+            with ThreadPoolExecutor(min(self.max_in_flight, len(pending))) as pool:
+                fetched = list(pool.map(self._lookup_quietly, pending))
+            for head, (amiibo, ex) in zip(pending, fetched):
+                if ex is not None:
+                    raise ex
+                results[head] = amiibo
+        return results
+
+    def _lookup_quietly(self, head):
+        try:
+            return (self.lookup(head), None)
+        except (pycurl.error, ValueError) as ex:
+            return (None, ex)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('heads',
+                        nargs='+',
+                        help="8 char character ids, e.g., 01830001")
+    parser.add_argument('--url',
+                        default=API_URL,
+                        help="api endpoint")
+    args = parser.parse_args()
+
+    api = amiibo_api(args.url)
+    for head, amiibo in api.lookup_many(args.heads).items():
+        if amiibo is None:
+            print('{0}  (unknown)'.format(head))
+        else:
+            print('{0}  {1} ({2})'.format(head, amiibo['name'], amiibo['amiiboSeries']))
+    api.close()
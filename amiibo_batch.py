@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from amiibo import AmiiboMasterKey, crypto
+from write_amiibo import prepare_image, read_key_files
+
+Prepared = namedtuple('prepared_image', 'name uid image error')
+
+UID_LENGTH = 14 # hex digits of a 7-byte NTAG21x uid
+
+_master_keys = None # per worker process, see _init_worker
+
+def read_manifest(path):
+    """
+    Reads a manifest of 'source_dump,target_uid' lines; blank lines and
+    lines starting with '#' are ignored.  UIDs may be spaced or
+    colon-separated in either case, e.g., '04 1f 06 d2 5c 64 85'.
+
+    Returns: list of (source path, uid) tuples, uid as nfc_parser.uid
+
+    Raises: ValueError on a line without a uid, or whose uid is not 7
+            bytes of hex, naming the line
+    """
+    manifest = []
+    with open(path, 'r') as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                source, uid = [p.strip() for p in line.rsplit(',', 1)]
+                uid = uid.replace(' ', '').replace(':', '').lower()
+                if len(uid) != UID_LENGTH:
+                    raise ValueError('uid must be {0} hex digits'.format(UID_LENGTH))
+                bytes.fromhex(uid)
+            except ValueError as ex:
+                raise ValueError('{0}:{1}: {2}'.format(path, lineno, ex))
+            manifest.append((source, uid))
+    return manifest
+
+def _init_worker(data_bin, tag_bin):
+    """ Unpacks the master keys once per worker process """
+    global _master_keys
+    _master_keys = AmiiboMasterKey.from_separate_bin(data_bin, tag_bin)
+
+def _prepare(source, uid, data=None):
+    """
+    Worker side of prepare_batch; source is read here unless its bytes
+    are given.  Only (image, error) travel back to the parent.
+    """
+    try:
+        if data is None:
+            with open(source, 'rb') as fh:
+                data = fh.read()
+        return (prepare_image(_master_keys, data, uid), None)
+    except (OSError, crypto.AmiiboBaseError, ValueError, RuntimeError) as ex:
+        return (None, ex)
+
+def prepare_batch(manifest, data_bin='unfixed-info.bin', tag_bin='locked-secret.bin',
+                  processes=None, cache=None):
+    """
+    Re-keys every (source dump, uid) pair of manifest in a process pool.
+    The key files are read once here and handed to each worker, which
+    unpacks them once; no image touches the disk on the way out.
+
+    With a cache, pairs it already holds skip the pool entirely and
+    freshly re-keyed images are added to it.
+
+    Parameters:
+    manifest (list): (source path, uid) tuples, see read_manifest
+    data_bin (str): path of unfixed-info.bin
+    tag_bin (str): path of locked-secret.bin
+    processes (int): worker processes; one per cpu if None
+    cache (image_cache): memoized images, built for the same key files
+
+    Returns: generator of Prepared(name, uid, image, error), cache hits
+             first, then the rest in manifest order; image is None and
+             error set if a source failed
+    """
+    keys = read_key_files(data_bin, tag_bin)
+    AmiiboMasterKey.from_separate_bin(*keys) # fail fast on bad key files
+
+    pending = [(source, uid, None) for source, uid in manifest]
+    if cache is not None:
+        pending = []
+        for source, uid in manifest:
+            data = image = None
+            try:
+                with open(source, 'rb') as fh:
+                    data = fh.read()
+                image = cache.get(data, uid)
+            except OSError:
+                pass
+            if image is None:
+                pending.append((source, uid, data)) # read once, here
+            else:
+                yield Prepared(source, uid, image, None)
+
+    if not pending:
+        return
+
+    sources, uids, data = zip(*pending)
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=keys) as pool:
+        results = pool.map(_prepare, sources, uids, data, chunksize=8)
+        for (source, uid, source_data), (image, error) in zip(pending, results):
+            if cache is not None and error is None:
+                cache.put(source_data, uid, image)
+            yield Prepared(source, uid, image, error)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('manifest',
+                        help="file of 'source_dump,target_uid' lines")
+    parser.add_argument('--processes',
+                        type=int,
+                        default=None,
+                        help="re-keying processes (default: one per cpu)")
+    parser.add_argument('--cache',
+                        action='store_true',
+                        default=False,
+                        help="reuse images already re-keyed for a tag (see image_cache)")
+    parser.add_argument('--write',
+                        action='store_true',
+                        default=False,
+                        help="write each image to its tag on the attached readers")
+    parser.add_argument('--reader',
+                        action='append',
+                        help="reader path (repeatable); all attached readers by default")
+    args = parser.parse_args()
+
+    manifest = read_manifest(args.manifest)
+
+    cache = None
+    if args.cache:
+        from image_cache import image_cache
+        cache = image_cache(read_key_files())
+
+    pool = None
+    if args.write:
+        from provision_pool import provision_pool
+        pool = provision_pool(prepare=None, readers=args.reader)
+
+    ready = 0
+    for prepared in prepare_batch(manifest, processes=args.processes, cache=cache):
+        if prepared.error is not None:
+            print('{0} error thrown ({1})'.format(prepared.error, prepared.name))
+            continue
+        ready += 1
+        if pool:
+            pool.submit_image(prepared.uid, prepared.image, prepared.name)
+    print('prepared {0} of {1} images'.format(ready, len(manifest)))
+    if cache:
+        print('image cache hit rate: {0:.1%}'.format(cache.hit_rate))
+
+    if pool:
+        try:
+            rates = pool.run()
+        finally:
+            pool.close()
+        print('wrote {0}, gave up on {1}, {2:,.1f} tags/hour'.format(
+              len(pool.done), len(pool.failed), rates['total']))
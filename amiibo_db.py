@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import heapq
+import pickle
+import hashlib
+import threading
+import unicodedata
+from collections import namedtuple
+
+DB_PATH = 'amiibo.json'
+COMPILED_SUFFIX = '.cache'
+COMPILED_VERSION = 2
+
+Source_Def = namedtuple('source_definition', 'path mtime_ns size sha256')
+Match_Def = namedtuple('match_definition', 'guid name series score')
+Page_Def = namedtuple('page_definition', 'total offset matches')
+
+NAME_WEIGHT = 2.0   # a query word found in the name counts double one in the series
+EXACT_BONUS = 1.0   # ... plus this if it is a whole word, not just a prefix
+FIRST_BONUS = 0.5   # ... plus this if it is the first word of the name
+FUZZY_PENALTY = 0.5 # misspelled words score this fraction of their similarity
+FUZZY_MIN = 0.45    # least bigram similarity for a misspelled word to match
+
+def words(text):
+    """ 'Pokémon - Pikachu' -> ['pokemon', 'pikachu']: case, accents and punctuation dropped """
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c if c.isalnum() else ' ' for c in text if not unicodedata.combining(c))
+    return text.split()
+
+def bigrams(word):
+    """
+    The 2-letter pieces of ' word ', the unit of fuzzy matching; short
+    enough that a swapped pair of letters ('mraio') still shares half
+    """
+    padded = ' {0} '.format(word)
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def _stat(path):
+    """ (mtime_ns, size) of path; the cheap half of a Source_Def """
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+class amiibo_db(object):
+    _shared = {}
+    _lock = threading.Lock()
+
+    def __init__(self, json_obj, source=None):
+        """
+        An indexed, in-memory view of the amiiboapi.com json db.
+        https://github.com/N3evin/AmiiboAPI/blob/master/database/amiibo.json
+
+        All indexes are built once, here, so that each lookup is a
+        dict access rather than a parse or a scan of every amiibo.
+
+        Parameters:
+        json_obj (dict): the decoded contents of amiibo.json
+        source (Source_Def): stamp of the file json_obj was read from
+
+        Returns: Nothing
+        """
+
+        self.source = source
+        self.series = dict(json_obj['amiibo_series'])
+        self.names = {guid: a['name'] for guid, a in json_obj['amiibos'].items()}
+
+        # '0x' + 8 char character head -> first guid (in db order) with it
+        self.heads = {}
+        for guid in self.names:
+            self.heads.setdefault(guid[:10], guid)
+
+        self._index()
+
+    def _index(self):
+        """
+        Builds the search indexes over names and series:
+            guids: every guid, shortest name first, then in db order;
+                   documents are positions in it, so lower ranks higher
+            prefixes: every prefix of every word -> {document: weight}
+            vocabulary: every whole word -> {document: weight}
+            bigrams: bigram -> words containing it, for fuzzy matching
+        """
+        self.guids = sorted(self.names, key=lambda guid: len(self.names[guid]))
+        self.prefixes = {}
+        self.vocabulary = {}
+        for doc, guid in enumerate(self.guids):
+            series = self.series.get('0x' + guid[14:16], '')
+            fields = [(w, NAME_WEIGHT + (FIRST_BONUS if i == 0 else 0))
+                      for i, w in enumerate(words(self.names[guid]))]
+            fields += [(w, 1.0) for w in words(series)]
+
+            for word, weight in fields:
+                postings = self.vocabulary.setdefault(word, {})
+                postings[doc] = max(postings.get(doc, 0), weight + EXACT_BONUS)
+                for end in range(1, len(word) + 1):
+                    postings = self.prefixes.setdefault(word[:end], {})
+                    bonus = EXACT_BONUS if end == len(word) else 0
+                    postings[doc] = max(postings.get(doc, 0), weight + bonus)
+
+        self.bigrams = {}
+        for word in self.vocabulary:
+            for gram in bigrams(word):
+                self.bigrams.setdefault(gram, []).append(word)
+
+    @classmethod
+    def from_file(cls, path=DB_PATH):
+        """ Parses and indexes amiibo.json at path """
+        with open(path, 'rb') as db:
+            raw = db.read()
+        source = Source_Def(os.path.abspath(path), *_stat(path),
+                            hashlib.sha256(raw).hexdigest())
+        return cls(json.loads(raw.decode('utf8')), source)
+
+    @classmethod
+    def compile(cls, path=DB_PATH, compiled=None):
+        """
+        Parses amiibo.json and writes the indexed result as a compiled
+        snapshot (see load).
+
+        Parameters:
+        path (str): location of amiibo.json
+        compiled (str): snapshot location; path + '.cache' if None
+
+        Returns: amiibo_db
+        """
+        db = cls.from_file(path)
+        db.save(compiled or path + COMPILED_SUFFIX)
+        return db
+
+    def save(self, compiled):
+        """
+        Pickles the indexes to compiled, replacing it atomically.  The
+        snapshot is only an optimization: if it can't be written (e.g.,
+        a read-only directory) the db is still usable from memory.
+
+        Returns: True if compiled was written
+        """
+        state = dict(self.__dict__, source=tuple(self.source))
+
+        tmp = '{0}.{1}.tmp'.format(compiled, os.getpid())
+        try:
+            with open(tmp, 'wb') as fh:
+                pickle.dump((COMPILED_VERSION, state), fh,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, compiled)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        return True
+
+    @classmethod
+    def load(cls, path=DB_PATH, compiled=None):
+        """
+        Loads the compiled snapshot of amiibo.json, (re)compiling it first
+        if it is missing or unreadable, or the json's mtime/size and then
+        sha256 no longer match the stamp it was built from.  A json
+        file that was only touched costs a hash, not a reparse.
+
+        Parameters:
+        path (str): location of amiibo.json
+        compiled (str): snapshot location; path + '.cache' if None
+
+        Returns: amiibo_db
+        """
+        compiled = compiled or path + COMPILED_SUFFIX
+        try:
+            with open(compiled, 'rb') as fh:
+                version, state = pickle.load(fh)
+            if version != COMPILED_VERSION:
+                raise ValueError('compiled db version mismatch')
+        except (OSError, EOFError, ValueError, TypeError,
+                AttributeError, pickle.UnpicklingError):
+            return cls.compile(path, compiled)
+
+        db = cls.__new__(cls)
+        db.__dict__.update(state)
+        db.source = Source_Def(*db.source)
+        stat = _stat(path)
+
+        if db.source[1:3] == stat:
+            return db
+
+        with open(path, 'rb') as fh:
+            if hashlib.sha256(fh.read()).hexdigest() != db.source.sha256:
+                return cls.compile(path, compiled)
+
+        db.source = db.source._replace(mtime_ns=stat[0], size=stat[1])
+        db.save(compiled)
+        return db
+
+    @property
+    def changed(self):
+        """ True if the source json's mtime/size differ from this instance's """
+        return self.source is None or self.source[1:3] != _stat(self.source.path)
+
+    @classmethod
+    def shared(cls, path=DB_PATH):
+        """
+        Returns the process-lifetime instance for path, loading it on
+        first use.  Subsequent calls cost a stat of the json, and reload
+        it if it changed on disk (see reload).
+        """
+        current = cls._shared.get(os.path.abspath(path))
+        if current is None:
+            return cls.reload(path, force=True)
+        try:
+            changed = current.changed
+        except OSError: # json moved away; keep serving what was loaded
+            return current
+        return cls.reload(path) if changed else current
+
+    @classmethod
+    def reload(cls, path=DB_PATH, force=False):
+        """
+        Hot-reloads the shared instance for path if amiibo.json changed on
+        disk since it was loaded.  The replacement is fully built before
+        it is swapped in, so concurrent lookups see the old db or the new
+        one, never a partial one.
+
+        Parameters:
+        path (str): location of amiibo.json
+        force (bool): reload even if the json appears unchanged
+
+        Returns: amiibo_db (the current shared instance)
+        """
+        key = os.path.abspath(path)
+        with cls._lock:
+            current = cls._shared.get(key)
+            if force or current is None or current.changed:
+                current = cls.load(path)
+                cls._shared[key] = current
+            return current
+
+    @classmethod
+    def forget(cls, path=None):
+        """ Drops the shared instance for path (or all of them) """
+        if path is None:
+            cls._shared.clear()
+        else:
+            cls._shared.pop(os.path.abspath(path), None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _scan(self, prefix):
+        """ First guid beginning with prefix, for ids that are not 8 chars """
+        for guid in self.names:
+            if guid.startswith(prefix):
+                return guid
+        return None
+
+    def lookup(self, amiibo_id, amiibo_series=None):
+        """
+        Looks up the full amiibo data of character_id.
+
+        Parameters:
+        amiibo_id (str): full 16 char string including variant and form or
+                         8 char string of just character type (fuzzy match)
+        amiibo_series (int): 0x00 form preferred
+
+        Returns: {'gameSeries': 'Animal Crossing', 'name': 'Bluebear', 'head': ...}
+        """
+
+        null_match = { 'gameSeries': None, 'name': None, 'head': None }
+
+        if amiibo_series is None and amiibo_id is not None:
+            if len(amiibo_id) == 18:
+                series = "0x{0}".format(amiibo_id[14:16]).lower()
+                return {
+                    'gameSeries': self.series[series],
+                    'name': self.names[amiibo_id],
+                    'head': amiibo_id[2:10],
+                }
+        elif amiibo_id is not None:
+            cid = "0x{0}".format(amiibo_id).lower()
+            series = "0x{0:#02}".format(amiibo_series).lower()
+
+            guid = self.heads.get(cid) if len(cid) == 10 else self._scan(cid)
+            if guid is not None:
+                try:
+                    return {
+                        'gameSeries': self.series[series],
+                        'name': self.names[guid],
+                        'head': amiibo_id,
+                    }
+                except (KeyError):
+                    return null_match
+        return null_match
+
+    def _fuzzy(self, word):
+        """ {document: weight} of the words spelled like word, by bigram similarity """
+        grams = bigrams(word)
+        shared = {}
+        for gram in grams:
+            for candidate in self.bigrams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        postings = {}
+        for candidate, n in shared.items():
+            similarity = 2.0 * n / (len(grams) + len(bigrams(candidate))) # dice coefficient
+            if similarity < FUZZY_MIN:
+                continue
+            for doc, weight in self.vocabulary[candidate].items():
+                score = weight * similarity * FUZZY_PENALTY
+                if score > postings.get(doc, 0):
+                    postings[doc] = score
+        return dict(sorted(postings.items()))
+
+    def search(self, query, limit=10, offset=0, fuzzy=True):
+        """
+        Finds the amiibos whose name or series match every word of query,
+        each as a whole word or the start of one ('tom n' finds Tom Nook),
+        or, if fuzzy and nothing starts with it, as a near spelling.
+
+        Matches are ranked by score: name words count double series
+        words, whole words and the first word of the name score extra,
+        and misspellings score less the further they are off.  Ties go
+        to the shorter name, then to db order.
+
+        Parameters:
+        query (str): words typed so far, in any case, accents optional
+        limit (int): matches per page
+        offset (int): matches to skip, e.g., limit * page number
+        fuzzy (bool): also match misspelled words
+
+        Returns: Page_Def(total, offset, [Match_Def(guid, name, series, score)])
+        """
+        scores = None
+        for word in words(query):
+            postings = self.prefixes.get(word)
+            if postings is None and fuzzy:
+                postings = self._fuzzy(word)
+            if not postings:
+                return Page_Def(0, offset, [])
+
+            if scores is None:
+                scores = dict(postings)
+            else:
+                scores = {doc: score + postings[doc] for doc, score in scores.items()
+                          if doc in postings}
+        if not scores:
+            return Page_Def(0, offset, [])
+
+        # stable, and scores is in document order: ties keep their rank
+        ranked = heapq.nlargest(offset + limit, scores, key=scores.get)
+        matches = []
+        for doc in ranked[offset:]:
+            guid = self.guids[doc]
+            matches.append(Match_Def(guid, self.names[guid],
+                                     self.series.get('0x' + guid[14:16]), scores[doc]))
+        return Page_Def(len(scores), offset, matches)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('amiibo_id',
+                        nargs='?',
+                        help="16 char guid (0x...) or 8 char head to look up")
+    parser.add_argument('--series',
+                        type=lambda s: int(s, 0),
+                        default=None,
+                        help="series for 8 char head lookups, e.g., 0x05")
+    parser.add_argument('--db',
+                        default=DB_PATH,
+                        help="path to amiibo.json")
+    parser.add_argument('--search',
+                        help="find amiibos by (part of) name or series")
+    parser.add_argument('--limit',
+                        type=int,
+                        default=10,
+                        help="search results per page")
+    parser.add_argument('--page',
+                        type=int,
+                        default=0,
+                        help="search results page, from 0")
+    parser.add_argument('--compile',
+                        action='store_true',
+                        default=False,
+                        help="rebuild the compiled snapshot of the db")
+    args = parser.parse_args()
+
+    if args.compile:
+        db = amiibo_db.compile(args.db)
+        print('compiled {0} amiibos to {1}'.format(len(db), args.db + COMPILED_SUFFIX))
+    if args.amiibo_id:
+        print(amiibo_db.load(args.db).lookup(args.amiibo_id, args.series))
+    if args.search:
+        found = amiibo_db.load(args.db).search(args.search, args.limit, args.page * args.limit)
+        for match in found.matches:
+            print('{0}  {1:<32}  {2}'.format(match.guid, match.name, match.series))
+        print('{0}-{1} of {2}'.format(min(found.total, found.offset + 1),
+                                      found.offset + len(found.matches), found.total))
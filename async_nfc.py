@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from easy_nfc import nfc_parser, reader_session
+
+async def check_db(amiibo_id, amiibo_series=None):
+    """ nfc_parser.check_db, off the event loop """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, nfc_parser.check_db, amiibo_id, amiibo_series)
+
+async def check_api(amiibo_id):
+    """ nfc_parser.check_api, off the event loop """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, nfc_parser.check_api, amiibo_id)
+
+class async_reader(object):
+    def __init__(self, interface='usb', target_type='106A', snapshot=True,
+                 clf=None, release_polls=2, retry=None):
+        """
+        An asyncio front-end to a reader_session.
+
+        All reader I/O, including opening the frontend, runs on a
+        single-thread executor owned by this reader, so commands to one
+        reader never interleave and a slow write blocks neither the event
+        loop nor any other reader.  Call open() (or use 'async with')
+        before anything else.
+
+        Parameters: as reader_session
+
+        Returns: Nothing
+        """
+        self.interface = interface
+        self.executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix='nfc-{0}'.format(interface))
+        self.session = None
+        self._session_args = (interface, target_type, snapshot, clf, release_polls, retry)
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _run(self, func, *args, **kwargs):
+        """ Returns: future of func(*args, **kwargs) run on this reader's executor """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def open(self):
+        """ Opens the frontend; returns self """
+        if self.session is None:
+            self.session = await self._run(reader_session, *self._session_args)
+        return self
+
+    async def close(self):
+        """ Closes the frontend (if the session opened it) and the executor """
+        if self.session is not None:
+            await self._run(self.session.close)
+            self.session = None
+        self.executor.shutdown(wait=False)
+
+    async def sense(self):
+        """
+        Senses once, as reader_session.poll.
+
+        Returns: async_tag for a newly presented tag, otherwise None
+        """
+        ni = await self._run(self.session.poll)
+        return None if ni is None else async_tag(self, ni)
+
+    async def wait_for_tag(self, interval=0.5):
+        """ Returns: async_tag of the next newly presented tag """
+        while True:
+            tag = await self.sense()
+            if tag is not None:
+                return tag
+            await asyncio.sleep(interval)
+
+    async def tags(self, interval=0.5):
+        """ Yields an async_tag for every newly presented tag, forever """
+        while True:
+            yield await self.wait_for_tag(interval)
+
+class async_tag(object):
+    def __init__(self, reader, ni):
+        """
+        Awaitable counterparts of the nfc_parser methods that talk to the
+        tag, run on reader's executor.  The plain nfc_parser is .ni, for
+        anything already read (e.g., .uid, or everything after snapshot()
+        in snapshot mode).
+
+        Parameters:
+        reader (async_reader): the reader the tag is on
+        ni (nfc_parser): the tag
+
+        Returns: Nothing
+        """
+        self.reader = reader
+        self.ni = ni
+
+    @property
+    def uid(self):
+        return self.ni.uid
+
+    def __repr__(self):
+        return '<async_tag {0} on {1}>'.format(self.ni.uid, self.reader.interface)
+
+    async def snapshot(self):
+        """ Returns: bytes() of every page, see nfc_parser.snapshot """
+        return await self.reader._run(self.ni.snapshot)
+
+    async def summary(self):
+        """ Returns: str(nfc_parser), the summary header of the tag """
+        return await self.reader._run(str, self.ni)
+
+    async def character_guid(self):
+        return await self.reader._run(getattr, self.ni, 'character_guid')
+
+    async def read_image(self):
+        return await self.reader._run(self.ni.read_image)
+
+    async def dump(self, archive=None):
+        """ See nfc_parser.dump """
+        return await self.reader._run(self.ni.dump, archive)
+
+    async def commit_image(self, byte_override=[], diff=False, dry_run=False, image=None,
+                           journal=None):
+        """ Returns: Commit_Result, see nfc_parser.commit_image """
+        return await self.reader._run(self.ni.commit_image, byte_override, diff=diff,
+                                      dry_run=dry_run, image=image, journal=journal)
+
+    async def verify_image(self, image=None, byte_override=[], rewrite=True, attempts=2):
+        """ Returns: Verify_Result, see nfc_parser.verify_image """
+        return await self.reader._run(self.ni.verify_image, image, byte_override, rewrite,
+                                      attempts)
+
+    async def check_db(self, amiibo_series=None):
+        """ Looks up this tag in the amiibo db; only the read uses the reader """
+        return await check_db(await self.character_guid(), amiibo_series)
+
+    async def check_api(self):
+        """ Looks up this tag on amiiboapi.com; only the read uses the reader """
+        character_id = await self.reader._run(getattr, self.ni, 'character_id')
+        return await check_api(character_id)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reader',
+                        action='append',
+                        help="reader path (repeatable); 'usb' by default")
+    parser.add_argument('--interval',
+                        type=float,
+                        default=0.5,
+                        help="seconds between polls")
+    args = parser.parse_args()
+
+    async def watch(path):
+        async with async_reader(path) as reader:
+            async for tag in reader.tags(args.interval):
+                print(await tag.summary())
+                try:
+                    print('{0}: {1}'.format(tag.uid, (await tag.check_db())['name']))
+                except (KeyError, IndexError, TypeError):
+                    print('{0}: not an amiibo'.format(tag.uid))
+
+    async def main():
+        await asyncio.gather(*[watch(path) for path in args.reader or ['usb']])
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
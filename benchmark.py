@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import sys
+import json
+import time
+import subprocess
+
+def legacy_check_db(amiibo_id, amiibo_series=None, path='amiibo.json'):
+    """
+    nfc_parser.check_db as it was before amiibo_db: the db is parsed on
+    every call and 8-char ids are matched by scanning every key.
+    Kept only as the baseline for bench_check_db.
+    """
+    with open(path, 'r') as db:
+        json_obj = json.loads(db.read())
+
+        null_match = { 'gameSeries': None, 'name': None, 'head': None }
+
+        if amiibo_series is None and amiibo_id is not None:
+            if len(amiibo_id) == 18:
+                series = "0x{0}".format(amiibo_id[14:16]).lower()
+                return {
+                    'gameSeries': json_obj['amiibo_series'][series],
+                    'name': json_obj['amiibos'][amiibo_id]['name'],
+                    'head': amiibo_id[2:10],
+                }
+            else:
+                return null_match
+        elif amiibo_id is not None:
+            cid = "0x{0}".format(amiibo_id).lower()
+            series = "0x{0:#02}".format(amiibo_series).lower()
+
+            for k in json_obj['amiibos'].keys():
+                if k.startswith(cid):
+                    try:
+                        return {
+                            'gameSeries': json_obj['amiibo_series'][series],
+                            'name': json_obj['amiibos'][k]['name'],
+                            'head': amiibo_id,
+                        }
+                    except (KeyError):
+                        return null_match
+    return null_match
+
+def rate(func, args_list, min_time=1.0):
+    """
+    Calls func(*args) for each args in args_list, repeating the list
+    until at least min_time seconds have elapsed.
+
+    Returns: calls per second (float)
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for args in args_list:
+            func(*args)
+        calls += len(args_list)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+def db_queries(path='amiibo.json'):
+    """ A mix of full-guid and fuzzy head+series lookups drawn from the db """
+    with open(path, 'r') as db:
+        json_obj = json.loads(db.read())
+
+    queries = []
+    for guid in list(json_obj['amiibos'].keys())[::25]:
+        queries.append((guid, None))
+        queries.append((guid[2:10], int(guid[14:16], 16)))
+    return queries
+
+def bench_check_db(path='amiibo.json', min_time=1.0):
+    """ Lookups/sec of legacy_check_db vs amiibo_db-backed check_db """
+    from amiibo_db import amiibo_db
+
+    queries = db_queries(path)
+    db = amiibo_db.shared(path)
+    for args in queries: # parity before timing anything
+        assert db.lookup(*args) == legacy_check_db(*args, path=path), args
+
+    return {
+        'legacy_check_db': rate(lambda i, s: legacy_check_db(i, s, path), queries, min_time),
+        'amiibo_db': rate(db.lookup, queries, min_time),
+    }
+
+def legacy_search(query, path='amiibo.json'):
+    """
+    Name/series search as done before amiibo_db.search: amiibo.json is
+    parsed and every amiibo scanned for the query, per keystroke.
+    Kept only as the baseline for bench_search.
+    """
+    with open(path, 'r') as db:
+        json_obj = json.loads(db.read())
+    query = query.lower()
+    return [guid for guid, a in json_obj['amiibos'].items()
+            if query in a['name'].lower() or
+               query in json_obj['amiibo_series'].get('0x' + guid[14:16], '').lower()]
+
+def bench_search(path='amiibo.json', min_time=1.0):
+    """
+    Microseconds per keystroke typing names from the db one letter at a
+    time: legacy_search vs the indexed amiibo_db.search (first page).
+    """
+    from amiibo_db import amiibo_db
+
+    db = amiibo_db.shared(path)
+    names = [db.names[guid] for guid in db.guids[::50]]
+    keystrokes = [(name[:end],) for name in names for end in range(1, len(name) + 1)]
+    return {
+        'legacy_search': 1e6 / rate(lambda q: legacy_search(q, path), keystrokes, min_time),
+        'amiibo_db.search': 1e6 / rate(db.search, keystrokes, min_time),
+    }
+
+COLD_START = '''
+import time
+start = time.perf_counter()
+from amiibo_db import amiibo_db
+db = amiibo_db.{loader}({path!r})
+db.lookup({guid!r})
+print(time.perf_counter() - start)
+'''
+
+def bench_cold_start(path='amiibo.json', runs=10):
+    """
+    Median seconds for a fresh interpreter to import amiibo_db, load the
+    db and answer one lookup: parsing amiibo.json (from_file) vs reading
+    the compiled snapshot (load).
+    """
+    from amiibo_db import amiibo_db
+    guid = next(iter(amiibo_db.compile(path).names))
+
+    results = {}
+    for loader in ('from_file', 'load'):
+        code = COLD_START.format(loader=loader, path=path, guid=guid)
+        times = sorted(float(subprocess.check_output([sys.executable, '-c', code]))
+                       for i in range(runs))
+        results[loader] = times[len(times) // 2]
+    return results
+
+def bench_dump(runs=10):
+    """
+    Tags/minute dumping the tag on the attached reader with plain READ
+    vs FAST_READ (where the tag supports it); see nfc_parser.read_pages.
+    """
+    from easy_nfc import nfc_parser, TAG_SPECS
+
+    ni = nfc_parser()
+    num_pages = TAG_SPECS[ni.tag_type].pages
+
+    results = {}
+    for fast_read in sorted(set([False, ni.fast_read])):
+        start = time.perf_counter()
+        for i in range(runs):
+            ni.read_pages(0, num_pages, fast_read)
+        elapsed = time.perf_counter() - start
+        results['FAST_READ' if fast_read else 'READ'] = 60 * runs / elapsed
+    return results
+
+def bench_api(latency=0.005, min_time=1.0):
+    """
+    Lookups/sec of amiibo_api against a local stand-in for amiiboapi.com
+    (see test_amiibo_api) answering each request after latency seconds:
+    a new client per lookup, as before handles were pooled, and
+    lookup_many with a cold and with a warm cache.
+
+    Returns: {name: lookups/sec}
+    """
+    import threading
+    from http.server import ThreadingHTTPServer
+    from amiibo_api import amiibo_api
+    from test_amiibo_api import stand_in, KNOWN
+
+    handler = type('stand_in', (stand_in,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.connections = server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{0}/api/amiibo/'.format(server.server_port)
+    heads = sorted(KNOWN)
+
+    def single(head):
+        api = amiibo_api(url, cache_dir=None)
+        api.lookup(head)
+        api.close()
+
+    def cold():
+        api = amiibo_api(url, cache_dir=None) # memory only: every pass starts empty
+        api.lookup_many(heads)
+        api.close()
+
+    warm = amiibo_api(url, cache_dir=None)
+    warm.lookup_many(heads)
+    try:
+        return {
+            'handle/lookup': rate(single, [(head,) for head in heads], min_time),
+            'cold': len(heads) * rate(cold, [()], min_time),
+            'warm': len(heads) * rate(warm.lookup_many, [(heads,)], min_time),
+        }
+    finally:
+        warm.close()
+        server.shutdown()
+        server.server_close()
+
+SUITE_OPS = ('pages', 'pprint', '__str__', 'check_db', 'dump', 'commit_image')
+
+def bench_suite(model='NTAG215', latency=0.0, snapshot=False, min_time=1.0):
+    """
+    Ops/sec and reader commands per op of the nfc_parser hot paths,
+    run against a simulated tag (see sim_tag) that holds the first
+    amiibo of amiibo.json.  Commands are counted on a warm parser, i.e.,
+    what every call after the first costs.
+
+    Parameters:
+    model (str): simulated tag, key of sim_tag.SIM_MODELS
+    latency (float): seconds added to every simulated command
+    snapshot (bool): construct the parser in snapshot mode
+    min_time (float): seconds to spend on each op
+
+    Returns: {op: {'ops_per_sec': float, 'commands': int}} for SUITE_OPS
+    """
+    import os
+    import tempfile
+    from amiibo_db import amiibo_db
+    from easy_nfc import nfc_parser
+    from sim_tag import sim_tag, sim_frontend
+
+    image = bytearray(1024)
+    image[84:92] = bytes.fromhex(next(iter(amiibo_db.shared().names))[2:])
+    tag = sim_tag(model, image=image)
+    clf = sim_frontend(tag, latency=latency)
+    ni = nfc_parser(clf=clf, snapshot=snapshot)
+    image = bytes(tag.memory)
+
+    ops = {
+        'pages': lambda: ni.pages,
+        'pprint': lambda: ni._pprint,
+        '__str__': lambda: str(ni),
+        'check_db': lambda: ni.check_db(ni.character_guid),
+        'dump': ni.dump,
+        'commit_image': lambda: ni.commit_image(image=image),
+    }
+
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in SUITE_OPS:
+            if name == 'dump':
+                os.chdir(tmpdir) # dump() writes dump.bin to the working directory
+            try:
+                ops[name]()
+                clf.commands.clear()
+                ops[name]()
+                commands = sum(clf.commands.values())
+                results[name] = {
+                    'ops_per_sec': rate(ops[name], [()], min_time),
+                    'commands': commands,
+                }
+            finally:
+                os.chdir(cwd)
+    return results
+
+def compare(baseline, current):
+    """
+    Prints current suite results against baseline, op by op.
+
+    Parameters:
+    baseline (dict): a bench_suite result, e.g., json from an earlier --json
+    current (dict): a bench_suite result
+    """
+    print('{0:<14} {1:>12} {2:>12} {3:>8} {4:>14}'.format(
+          'op', 'before/s', 'after/s', 'change', 'commands'))
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print('{0:<14} {1:>12} {2:>12,.1f}'.format(name, '-', now['ops_per_sec']))
+            continue
+        print('{0:<14} {1:>12,.1f} {2:>12,.1f} {3:>7.2f}x {4:>14}'.format(
+              name, before['ops_per_sec'], now['ops_per_sec'],
+              now['ops_per_sec'] / before['ops_per_sec'],
+              '{0} -> {1}'.format(before['commands'], now['commands'])))
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db',
+                        default='amiibo.json',
+                        help="path to amiibo.json")
+    parser.add_argument('--cold-start',
+                        action='store_true',
+                        default=False,
+                        help="measure cold-start lookup latency instead")
+    parser.add_argument('--dump',
+                        action='store_true',
+                        default=False,
+                        help="measure dump throughput of the tag on the reader")
+    parser.add_argument('--search',
+                        action='store_true',
+                        default=False,
+                        help="measure name/series search latency per keystroke")
+    parser.add_argument('--api',
+                        action='store_true',
+                        default=False,
+                        help="measure amiibo_api lookups/sec, cold and warm, against a local stand-in")
+    parser.add_argument('--suite',
+                        action='store_true',
+                        default=False,
+                        help="run the nfc_parser suite against a simulated tag")
+    parser.add_argument('--model',
+                        default='NTAG215',
+                        help="simulated tag for --suite, e.g., NTAG213, Ultralight")
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0.0,
+                        help="seconds per simulated command for --suite, or per request for --api")
+    parser.add_argument('--snapshot',
+                        action='store_true',
+                        default=False,
+                        help="run --suite with the parser in snapshot mode")
+    parser.add_argument('--json',
+                        metavar='FILE',
+                        help="save --suite results to FILE")
+    parser.add_argument('--compare',
+                        metavar='FILE',
+                        help="compare --suite results with those saved in FILE")
+    parser.add_argument('--min-time',
+                        type=float,
+                        default=1.0,
+                        help="seconds to spend on each measurement")
+    args = parser.parse_args()
+
+    if args.suite:
+        results = bench_suite(args.model, args.latency, args.snapshot, args.min_time)
+        if args.compare:
+            with open(args.compare, 'r') as fh:
+                compare(json.load(fh), results)
+        else:
+            for name, result in results.items():
+                print('{0:<16}: {1:>12,.1f} ops/sec {2:>6} commands'.format(
+                      name, result['ops_per_sec'], result['commands']))
+        if args.json:
+            with open(args.json, 'w') as fh:
+                json.dump(results, fh, indent=2)
+    elif args.dump:
+        for name, tpm in bench_dump().items():
+            print('{0:<16}: {1:>12,.1f} tags/min'.format(name, tpm))
+    elif args.api:
+        results = bench_api(args.latency or 0.005, args.min_time)
+        for name, ops in results.items():
+            print('{0:<16}: {1:>12,.0f} lookups/sec'.format(name, ops))
+    elif args.search:
+        results = bench_search(args.db, args.min_time)
+        for name, usecs in results.items():
+            print('{0:<16}: {1:>12,.1f} us/keystroke'.format(name, usecs))
+        print('{0:<16}: {1:>12,.1f}x'.format('speedup',
+              results['legacy_search'] / results['amiibo_db.search']))
+    elif args.cold_start:
+        results = bench_cold_start(args.db)
+        for name, secs in results.items():
+            print('{0:<16}: {1:>12,.2f} ms'.format(name, secs * 1000))
+        print('{0:<16}: {1:>12,.1f}x'.format('speedup',
+              results['from_file'] / results['load']))
+    else:
+        results = bench_check_db(args.db, args.min_time)
+        for name, ops in results.items():
+            print('{0:<16}: {1:>12,.0f} lookups/sec'.format(name, ops))
+        print('{0:<16}: {1:>12,.1f}x'.format('speedup',
+              results['amiibo_db'] / results['legacy_check_db']))
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import io
+import time
+import zlib
+import sqlite3
+import hashlib
+import tarfile
+from collections import namedtuple
+
+ARCHIVE_DIR = 'archive'
+
+Read_Def = namedtuple('read_definition', 'id digest uid character_guid tag_type read_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    compressed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reads (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES images(digest),
+    uid TEXT NOT NULL,
+    character_guid TEXT,
+    tag_type TEXT,
+    read_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reads_uid ON reads(uid);
+CREATE INDEX IF NOT EXISTS reads_character_guid ON reads(character_guid);
+CREATE INDEX IF NOT EXISTS reads_tag_type ON reads(tag_type);
+CREATE INDEX IF NOT EXISTS reads_read_at ON reads(read_at);
+"""
+
+class dump_archive(object):
+    def __init__(self, directory=ARCHIVE_DIR, compress=True):
+        """
+        A content-addressed store of tag images with an index of reads.
+
+        Each distinct image is stored once, under its sha256, in
+        objects/; every read of a tag adds a row to index.sqlite3
+        recording which image it produced, so re-reading an unchanged
+        tag costs an index row and nothing else.
+
+        Parameters:
+        directory (str): archive location; created if missing
+        compress (bool): zlib-compress newly stored images
+
+        Returns: Nothing
+        """
+        self.directory = directory
+        self.compress = compress
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'))
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        """ Number of distinct images stored """
+        return self.db.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+
+    def _path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[0:2], digest[2:])
+
+    def add(self, image, uid, character_guid=None, tag_type=None, read_at=None):
+        """
+        Records a read of a tag, storing image if it is not already held.
+
+        Parameters:
+        image (bytes): the tag's memory
+        uid (str): hex uid of the tag
+        character_guid (str): e.g., nfc_parser.character_guid
+        tag_type (str): e.g., 'NTAG215'
+        read_at (float): epoch seconds; now if None
+
+        Returns: sha256 hex digest of image
+        """
+        image = bytes(image)
+        digest = hashlib.sha256(image).hexdigest()
+
+        with self.db:
+            known = self.db.execute('SELECT 1 FROM images WHERE digest = ?',
+                                    (digest,)).fetchone()
+            if not known:
+                path = self._path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+                with open(tmp, 'wb') as fh:
+                    fh.write(zlib.compress(image) if self.compress else image)
+                os.replace(tmp, path)
+
+                self.db.execute('INSERT INTO images VALUES (?, ?, ?)',
+                                (digest, len(image), int(self.compress)))
+
+            self.db.execute('INSERT INTO reads (digest, uid, character_guid, tag_type, read_at) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            (digest, uid, character_guid, tag_type,
+                             time.time() if read_at is None else read_at))
+        return digest
+
+    def add_tag(self, ni):
+        """
+        Records a read of the tag under an nfc_parser, from its snapshot
+        in snapshot mode.
+
+        Returns: sha256 hex digest of the tag's image
+        """
+        return self.add(ni.read_image(), ni.uid, ni.character_guid, ni.tag_type)
+
+    def get(self, digest):
+        """
+        Returns: bytes() of the image stored under digest
+
+        Raises: KeyError if there is no such image
+        """
+        row = self.db.execute('SELECT compressed FROM images WHERE digest = ?',
+                              (digest,)).fetchone()
+        if row is None:
+            raise KeyError(digest)
+
+        with open(self._path(digest), 'rb') as fh:
+            data = fh.read()
+        return zlib.decompress(data) if row[0] else data
+
+    def find(self, uid=None, character_guid=None, tag_type=None, since=None, until=None):
+        """
+        Looks up reads, oldest first; every given filter must match.
+
+        Parameters:
+        uid (str): hex uid of the tag
+        character_guid (str): '0x' + 16 hex chars
+        tag_type (str): e.g., 'NTAG215'
+        since (float): earliest read_at, inclusive
+        until (float): latest read_at, exclusive
+
+        Returns: list of Read_Def(id, digest, uid, character_guid, tag_type, read_at)
+        """
+        clauses, params = [], []
+        for column, value in (('uid', uid), ('character_guid', character_guid),
+                              ('tag_type', tag_type)):
+            if value is not None:
+                clauses.append('{0} = ?'.format(column))
+                params.append(value)
+        if since is not None:
+            clauses.append('read_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('read_at < ?')
+            params.append(until)
+
+        query = 'SELECT id, digest, uid, character_guid, tag_type, read_at FROM reads'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY read_at, id'
+        return [Read_Def(*row) for row in self.db.execute(query, params)]
+
+    def export(self, fh, **filters):
+        """
+        Streams the images selected by find(**filters) to fh as an
+        uncompressed tar, one '<uid>/<digest>.bin' member per distinct
+        image of each tag.  Only one image is held in memory at a time.
+
+        Parameters:
+        fh (file): writable binary file object, e.g., sys.stdout.buffer
+
+        Returns: number of images written (int)
+        """
+        written = set()
+        with tarfile.open(fileobj=fh, mode='w|') as tar:
+            for read in self.find(**filters):
+                name = '{0}/{1}.bin'.format(read.uid, read.digest)
+                if name in written:
+                    continue
+
+                image = self.get(read.digest)
+                info = tarfile.TarInfo(name)
+                info.size = len(image)
+                info.mtime = int(read.read_at)
+                tar.addfile(info, io.BytesIO(image))
+                written.add(name)
+        return len(written)
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir',
+                        default=ARCHIVE_DIR,
+                        help="archive directory")
+    parser.add_argument('--uid',
+                        help="only reads of this tag uid")
+    parser.add_argument('--guid',
+                        help="only reads with this character guid (0x...)")
+    parser.add_argument('--type',
+                        help="only reads of this tag type, e.g., NTAG215")
+    parser.add_argument('--export',
+                        metavar='TARFILE',
+                        help="write the selected images as a tar ('-' for stdout)")
+    args = parser.parse_args()
+
+    filters = {'uid': args.uid, 'character_guid': args.guid, 'tag_type': args.type}
+    with dump_archive(args.dir) as archive:
+        if args.export == '-':
+            archive.export(sys.stdout.buffer, **filters)
+        elif args.export:
+            with open(args.export, 'wb') as fh:
+                print('exported {0} images'.format(archive.export(fh, **filters)))
+        else:
+            for read in archive.find(**filters):
+                print('{0}  {1:<14}  {2:<8}  {3}  {4}'.format(
+                      time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(read.read_at)),
+                      read.uid, str(read.tag_type), str(read.character_guid), read.digest[0:16]))
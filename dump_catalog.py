@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import time
+import sqlite3
+import hashlib
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from amiibo_db import amiibo_db, DB_PATH
+from easy_nfc import CHARACTER_PAGE
+
+CATALOG_PATH = 'catalog.sqlite3'
+INLINE_MAX = 256 # fewer changed files than this are read without a pool
+
+Entry_Def = namedtuple('entry_definition',
+                       'path size mtime_ns sha256 uid character_guid name series cataloged_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dumps (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    uid TEXT,
+    character_guid TEXT,
+    name TEXT,
+    series TEXT,
+    cataloged_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dumps_character_guid ON dumps(character_guid);
+CREATE INDEX IF NOT EXISTS dumps_name ON dumps(name);
+CREATE INDEX IF NOT EXISTS dumps_series ON dumps(series);
+CREATE INDEX IF NOT EXISTS dumps_uid ON dumps(uid);
+CREATE INDEX IF NOT EXISTS dumps_sha256 ON dumps(sha256);
+"""
+
+_db = None # per worker process, see _init_worker
+
+def _init_worker(db_path):
+    """ Loads the compiled amiibo db once per worker process """
+    global _db
+    _db = amiibo_db.load(db_path)
+
+def read_dump(path, db=None):
+    """
+    Identifies a dump from its bytes, at the offsets nfc_parser reads
+    them from a tag.
+
+    Parameters:
+    path (str): a tag image, as written by nfc_parser.dump
+    db (amiibo_db): resolves name and series; the worker's if None
+
+    Returns: (path, size, mtime_ns, sha256, uid, character_guid, name, series)
+             as a plain tuple, to travel back from a worker process
+
+    Raises: OSError if path cannot be read
+    """
+    db = db or _db
+    st = os.stat(path)
+    with open(path, 'rb') as fh:
+        image = fh.read()
+
+    uid = guid = name = series = None
+    if len(image) >= 9:
+        uid = (image[0:3] + image[4:8]).hex()
+    offset = CHARACTER_PAGE * 4
+    if len(image) >= offset + 8:
+        guid = '0x' + image[offset:offset + 8].hex()
+        try:
+            info = db.lookup(guid)
+            name, series = info['name'], info['gameSeries']
+        except KeyError:
+            pass
+    return (path, st.st_size, st.st_mtime_ns, hashlib.sha256(image).hexdigest(),
+            uid, guid, name, series)
+
+def _read(path):
+    """ Worker side of update(); unreadable files come back as None """
+    try:
+        return read_dump(path)
+    except OSError:
+        return None
+
+class dump_catalog(object):
+    def __init__(self, path=CATALOG_PATH):
+        """
+        A queryable sqlite catalog of the tag dumps found under one or
+        more directories: which character each dump holds, read offline
+        from its bytes and named through the amiibo db.
+
+        Parameters:
+        path (str): catalog file; created if missing
+
+        Returns: Nothing
+        """
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM dumps').fetchone()[0]
+
+    def update(self, directory, db_path=DB_PATH, processes=None):
+        """
+        Brings the catalog up to date with the .bin files under directory.
+
+        Files whose size and mtime match their entry are skipped unread.
+        Others are read (in a process pool, if there are many) and
+        hashed; if the hash matches their entry they were only touched,
+        and just the new mtime is kept.  Entries of files since removed
+        from directory are dropped.
+
+        Parameters:
+        directory (str): searched recursively for *.bin dumps
+        db_path (str): location of amiibo.json
+        processes (int): worker processes; one per cpu if None
+
+        Returns: Counter of added, changed, touched, unchanged, removed
+                 and unreadable files
+        """
+        root = os.path.abspath(directory)
+        known = {row[0]: row[1:] for row in self.db.execute(
+                 'SELECT path, size, mtime_ns, sha256 FROM dumps '
+                 'WHERE path = ? OR substr(path, 1, ?) = ?',
+                 (root, len(root) + 1, os.path.join(root, '')))}
+
+        stats = Counter()
+        pending = []
+        found = set()
+        for base, dirs, files in os.walk(root):
+            for f in files:
+                if not f.endswith('.bin'):
+                    continue
+                path = os.path.join(base, f)
+                found.add(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stats['unreadable'] += 1
+                    continue
+                entry = known.get(path)
+                if entry is not None and entry[0:2] == (st.st_size, st.st_mtime_ns):
+                    stats['unchanged'] += 1
+                else:
+                    pending.append(path)
+
+        _init_worker(db_path) # fail fast, and compile the db once for the workers
+        if processes == 1 or len(pending) < INLINE_MAX:
+            results = map(_read, pending)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(processes, initializer=_init_worker,
+                                       initargs=(db_path,))
+            results = pool.map(_read, pending, chunksize=64)
+
+        now = time.time()
+        try:
+            with self.db:
+                for path, result in zip(pending, results):
+                    if result is None:
+                        stats['unreadable'] += 1
+                        continue
+                    entry = known.get(path)
+                    if entry is None:
+                        stats['added'] += 1
+                    elif entry[2] == result[3]:
+                        stats['touched'] += 1
+                        self.db.execute('UPDATE dumps SET size = ?, mtime_ns = ? WHERE path = ?',
+                                        (result[1], result[2], path))
+                        continue
+                    else:
+                        stats['changed'] += 1
+                    self.db.execute('INSERT OR REPLACE INTO dumps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    result + (now,))
+
+                gone = [(path,) for path in known if path not in found]
+                self.db.executemany('DELETE FROM dumps WHERE path = ?', gone)
+                stats['removed'] = len(gone)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return stats
+
+    def find(self, character_guid=None, name=None, series=None, uid=None, sha256=None):
+        """
+        Looks up cataloged dumps, by path; every given filter must match.
+        name and series may use sqlite LIKE wildcards, e.g., 'Tom%'.
+
+        Returns: list of Entry_Def
+        """
+        clauses, params = [], []
+        for column, value in (('character_guid', character_guid), ('uid', uid),
+                              ('sha256', sha256)):
+            if value is not None:
+                clauses.append('{0} = ?'.format(column))
+                params.append(value.lower())
+        for column, value in (('name', name), ('series', series)):
+            if value is not None:
+                clauses.append('{0} LIKE ?'.format(column))
+                params.append(value)
+
+        query = 'SELECT * FROM dumps'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY path'
+        return [Entry_Def(*row) for row in self.db.execute(query, params)]
+
+    def counts(self, by='series'):
+        """ Returns: [(series or name, number of dumps)], most common first """
+        if by not in ('series', 'name', 'character_guid'):
+            raise ValueError('cannot count by {0}'.format(by))
+        return self.db.execute('SELECT {0}, COUNT(*) AS n FROM dumps GROUP BY {0} '
+                               'ORDER BY n DESC, {0}'.format(by)).fetchall()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory',
+                        nargs='*',
+                        help="directories of .bin dumps to (re)catalog")
+    parser.add_argument('--catalog',
+                        default=CATALOG_PATH,
+                        help="catalog file")
+    parser.add_argument('--db',
+                        default=DB_PATH,
+                        help="path to amiibo.json")
+    parser.add_argument('--processes',
+                        type=int,
+                        default=None,
+                        help="reading processes (default: one per cpu)")
+    parser.add_argument('--guid',
+                        help="list dumps of this character guid (0x...)")
+    parser.add_argument('--name',
+                        help="list dumps of this character name (LIKE pattern)")
+    parser.add_argument('--series',
+                        help="list dumps of this series (LIKE pattern)")
+    parser.add_argument('--counts',
+                        choices=('series', 'name', 'character_guid'),
+                        help="number of dumps per series/name/guid")
+    args = parser.parse_args()
+
+    with dump_catalog(args.catalog) as catalog:
+        for directory in args.directory:
+            started = time.perf_counter()
+            stats = catalog.update(directory, args.db, args.processes)
+            print('{0}: {1} in {2:.2f}s'.format(
+                  directory, ', '.join('{0} {1}'.format(k, v) for k, v in sorted(stats.items())),
+                  time.perf_counter() - started))
+
+        if args.counts:
+            for key, n in catalog.counts(args.counts):
+                print('{0:>6}  {1}'.format(n, key))
+        if args.guid or args.name or args.series:
+            for entry in catalog.find(args.guid, args.name, args.series):
+                print('{0}  {1}  {2:<24}  {3}'.format(entry.character_guid, entry.uid,
+                                                     str(entry.name), entry.path))
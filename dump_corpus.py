@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import tempfile
+
+import numpy as np
+
+from tag_profile import PROFILES
+from easy_nfc import CHARACTER_PAGE
+
+UID_BYTES = [0, 1, 2, 4, 5, 6, 7] # UID0-UID2, (BCC0), UID3-UID6
+GUID_OFFSET = CHARACTER_PAGE * 4 # character_guid: pages 15h-16h
+
+def find_dumps(directory):
+    """ Returns: sorted paths of every .bin file under directory """
+    found = []
+    for root, dirs, files in os.walk(directory):
+        found.extend(os.path.join(root, f) for f in files if f.endswith('.bin'))
+    return sorted(found)
+
+def _groups(keys):
+    """
+    Returns: list of arrays of row indices sharing a key, for every key
+             found in more than one row
+    """
+    order = np.argsort(keys, kind='stable')
+    ordered = keys[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    sizes = np.diff(np.r_[starts, len(ordered)])
+    return [order[s:s + n] for s, n in zip(starts[sizes > 1], sizes[sizes > 1])]
+
+class dump_corpus(object):
+    def __init__(self, directory, tag_type='NTAG215', cache=None):
+        """
+        Every tag dump under directory, as one memory-mapped 2-D array of
+        uint8 (a row per dump, a column per byte), so that uids, guids,
+        locks and factory-default checks are computed for the whole set
+        at once rather than dump by dump.
+
+        Dumps shorter than the tag's memory are zero-filled; their real
+        lengths are kept in self.lengths.  Longer ones are cut short.
+
+        Parameters:
+        directory (str): searched recursively for *.bin dumps
+        tag_type (str): key of tag_profile.PROFILES the dumps were read from
+        cache (str): .npy file to keep the array in; reused as-is while
+                     it is newer than every dump and lists the same files,
+                     a temporary file is used if None
+
+        Returns: Nothing
+        """
+        self.profile = PROFILES[tag_type]
+        self.width = self.profile.pages * 4
+        self.paths = find_dumps(directory)
+
+        if cache is not None and self._cached(cache):
+            self.data = np.load(cache, mmap_mode='r')
+            self.lengths = np.load(cache + '.lengths.npy')
+            return
+
+        shape = (len(self.paths), self.width)
+        if cache is not None:
+            self.data = np.lib.format.open_memmap(cache, mode='w+', dtype=np.uint8, shape=shape)
+        else:
+            self._tmp = tempfile.TemporaryFile()
+            self.data = np.memmap(self._tmp, dtype=np.uint8, mode='w+', shape=max(shape[0], 1) * self.width)
+            self.data = self.data[0:shape[0] * self.width].reshape(shape)
+
+        self.lengths = np.zeros(len(self.paths), dtype=np.int32)
+        for row, path in enumerate(self.paths):
+            with open(path, 'rb') as fh:
+                self.lengths[row] = fh.readinto(self.data[row])
+
+        if cache is not None:
+            self.data.flush()
+            np.save(cache + '.lengths.npy', self.lengths)
+            with open(cache + '.paths', 'w') as fh:
+                fh.write(''.join(p + '\n' for p in self.paths))
+
+    def _cached(self, cache):
+        try:
+            with open(cache + '.paths', 'r') as fh:
+                if fh.read().split('\n')[:-1] != self.paths:
+                    return False
+            built = os.stat(cache).st_mtime
+        except OSError:
+            return False
+        return all(os.stat(p).st_mtime <= built for p in self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def page(self, page, count=1):
+        """ Returns: (dumps, 4 * count) view of count pages from page """
+        return self.data[:, page * 4:(page + count) * 4]
+
+    @property
+    def uid_keys(self):
+        """ Returns: uint64 array of each dump's 7-byte uid """
+        uid = self.data[:, UID_BYTES].astype(np.uint64)
+        shifts = np.arange(48, -1, -8, dtype=np.uint64)
+        return (uid << shifts).sum(axis=1, dtype=np.uint64)
+
+    @property
+    def uids(self):
+        """ Returns: list of uid hex strings, as nfc_parser.uid """
+        return ['{0:014x}'.format(k) for k in self.uid_keys.tolist()]
+
+    @property
+    def bcc_ok(self):
+        """ Returns: bool array, True where both uid check bytes are right """
+        d = self.data
+        bcc0 = 0x88 ^ d[:, 0] ^ d[:, 1] ^ d[:, 2]
+        bcc1 = d[:, 4] ^ d[:, 5] ^ d[:, 6] ^ d[:, 7]
+        return (bcc0 == d[:, 3]) & (bcc1 == d[:, 8])
+
+    @property
+    def guid_keys(self):
+        """ Returns: uint64 array of each dump's character_guid """
+        guid = np.ascontiguousarray(self.data[:, GUID_OFFSET:GUID_OFFSET + 8])
+        return guid.view('>u8').ravel().astype(np.uint64)
+
+    @property
+    def character_guids(self):
+        """ Returns: list of '0x...' strings, as nfc_parser.character_guid """
+        return ['0x{0:016x}'.format(k) for k in self.guid_keys.tolist()]
+
+    @property
+    def static_lock(self):
+        """ Returns: (dumps, 2) array of page 02h, bytes 2-3 """
+        return self.data[:, 10:12]
+
+    @property
+    def dynamic_lock(self):
+        """ Returns: (dumps, 3) array of the dynamic lock bytes, or None """
+        if self.profile.dynamic_lock is None:
+            return None
+        return self.page(self.profile.dynamic_lock)[:, 0:3]
+
+    def oem_matches(self):
+        """
+        Returns: (dumps, pages) bool array, one column per page of the
+                 profile's factory defaults (OEM_BYTES), True where the
+                 dump holds the default
+        """
+        oem = self.profile.oem or []
+        columns = [np.all(self.page(int(loc[:-1], 16)) == np.frombuffer(d, np.uint8), axis=1)
+                   for loc, d in oem]
+        return np.stack(columns, axis=1) if columns else np.ones((len(self), 0), bool)
+
+    @property
+    def cc_ok(self):
+        """ Returns: bool array, True where page 03h holds the factory CC """
+        return self.oem_matches()[:, 0] if self.profile.oem else np.ones(len(self), bool)
+
+    @property
+    def blank(self):
+        """ Returns: bool array, True where every OEM_BYTES page is at its default """
+        return self.oem_matches().all(axis=1)
+
+    def duplicate_uids(self):
+        """ Returns: list of lists of paths whose dumps share a uid """
+        return [[self.paths[i] for i in group] for group in _groups(self.uid_keys)]
+
+    def duplicate_images(self):
+        """ Returns: list of lists of paths whose dumps are byte-for-byte identical """
+        rows = np.ascontiguousarray(self.data).view(np.dtype((np.void, self.width))).ravel()
+        return [[self.paths[i] for i in group] for group in _groups(rows)]
+
+    def summary(self):
+        """ Returns: dict of corpus-wide counts """
+        static = self.static_lock
+        return {
+            'dumps': len(self),
+            'short': int((self.lengths < self.width).sum()),
+            'bad_bcc': int((~self.bcc_ok).sum()),
+            'cc_mismatch': int((~self.cc_ok).sum()),
+            'blank': int(self.blank.sum()),
+            'static_locked': int(((static[:, 0] != 0) | (static[:, 1] != 0)).sum()),
+            'characters': len(np.unique(self.guid_keys)),
+            'duplicate_uids': len(self.duplicate_uids()),
+            'duplicate_images': len(self.duplicate_images()),
+        }
+
+if __name__ == '__main__':
+    import json
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory',
+                        help="directory searched recursively for .bin dumps")
+    parser.add_argument('--type',
+                        default='NTAG215',
+                        choices=sorted(PROFILES),
+                        help="tag type the dumps were read from")
+    parser.add_argument('--cache',
+                        help="keep the loaded corpus in this .npy file between runs")
+    parser.add_argument('--duplicates',
+                        action='store_true',
+                        default=False,
+                        help="list the dumps sharing a uid or identical contents")
+    parser.add_argument('--json',
+                        action='store_true',
+                        default=False,
+                        help="print the summary as json")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    corpus = dump_corpus(args.directory, args.type, args.cache)
+    summary = corpus.summary()
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print('{0:<16}: {1}'.format(key, value))
+
+    if args.duplicates:
+        for title, groups in (('same uid', corpus.duplicate_uids()),
+                              ('same contents', corpus.duplicate_images())):
+            for group in groups:
+                print('{0}: {1}'.format(title, '  '.join(group)))
@@ -7,31 +7,31 @@ __email__ = "wdchromium@gmail.com"
 __status__ = "Development"
 
 import nfc
+import sys
+import time
 from collections import namedtuple
+from metrics import registry
+from hexdump import render_pages
+from tag_profile import PROFILES, resolve
 
 Tag_Def = namedtuple('tag_definition', 'cc size pages')
-TAG_SPECS = {
-    'NTAG213': Tag_Def(0x12, 128, 32),
-    'NTAG215': Tag_Def(0x3e, 496, 135),
-    'NTAG216': Tag_Def(0x6d, 872, 231),
-    'Ultralight': Tag_Def(0x06, 64, 16),
-    'Type2Tag': Tag_Def(0x00, 0, 0),
-}
-
-OEM_BYTES = { # https://www.nxp.com/docs/en/data-sheet/NTAG213_215_216.pdf
-    'NTAG213': [('03h', bytes([0xe1, 0x10, 0x12, 0x00])),
-                ('04h', bytes([0x01, 0x03, 0xa0, 0x0c])),
-                ('05h', bytes([0x34, 0x03, 0x00, 0xfe]))],
-    'NTAG215': [('03h', bytes([0xe1, 0x10, 0x3e, 0x00])),
-                ('04h', bytes([0x03, 0x00, 0xfe, 0x00])),
-                ('05h', bytes([0x00, 0x00, 0x00, 0x00]))],
-    'NTAG216': [('03h', bytes([0xe1, 0x10, 0x6d, 0x00])),
-                ('04h', bytes([0x03, 0x00, 0xfe, 0x00])),
-                ('05h', bytes([0x00, 0x00, 0x00, 0x00]))],
-}
+TAG_SPECS = {name: Tag_Def(p.cc, p.cc * 8, p.pages) for name, p in PROFILES.items()}
+
+OEM_BYTES = {name: p.oem for name, p in PROFILES.items() if p.oem}
+
+FAST_READ_DEFAULT_FRAME = 64 # bytes, if the frontend can't say
+
+Commit_Result = namedtuple('commit_result', 'written skipped error')
+Verify_Result = namedtuple('verify_result', 'checked rewritten failed')
+
+CHARACTER_PAGE = 0x15 # character_guid: this page and the next
+
+HEADER_INFO = ("UID0-UID2, BCC0", "UID3-UID6", # as labelled by nfc's tag.dump()
+               "BCC1, INT, LOCK0-LOCK1", "OTP0-OTP3")
 
 class nfc_parser(object):
-    def __init__(self, interface='usb', target_type='106A'):
+    def __init__(self, interface='usb', target_type='106A', snapshot=False,
+                 clf=None, tag=None, retry=None):
         """
         A high-level interface to quickly read an NFC tag.
         Heavily integrates 'nfc' module for functionality and hardware support.
@@ -42,16 +42,38 @@ class nfc_parser(object):
                          but usb is most frequently-used value.
         target_type (str): Sense cards at 106kbps, type A target by default.
                            Available: '106A', '106B', '212F'
+        snapshot (bool): read the whole tag once and serve every page,
+                         summary, pprint and dump from that one buffer
+                         until refresh()/invalidate() or a write.
+        clf (nfc.ContactlessFrontend): an already-open frontend to use
+                                       instead of opening interface
+        tag (nfc.tag.Tag): an already-activated tag on clf; skips sensing
+        retry (retry_policy): retry transient page/chunk failures under
+                              this policy; fail on the first if None
 
         Returns: Nothing
 
         """
 
-        self.clf = nfc.ContactlessFrontend(interface)
-        self.target = self.clf.sense(nfc.clf.RemoteTarget(target_type))
-        self.tag = nfc.tag.activate(self.clf, self.target)
+        self.clf = clf or nfc.ContactlessFrontend(interface)
+        if tag is None:
+            self.target = self.clf.sense(nfc.clf.RemoteTarget(target_type))
+            self.tag = nfc.tag.activate(self.clf, self.target)
+        else:
+            self.target = tag.target
+            self.tag = tag
+        if self.tag is not None:
+            registry.instrument(self.tag)
         self.raw = nfc.tag.tt2.Type2TagMemoryReader(self.tag)
 
+        self.snapshot_mode = snapshot
+        self._snapshot = None
+        self._signature = None
+        self._profile = None
+
+        self.retry = retry.session() if retry is not None else None
+        self._chunk = None # FAST_READ pages per command, see read_pages
+
     def __str__(self):
         """
         Returns a string-representation of the nfc_parser object
@@ -69,7 +91,11 @@ class nfc_parser(object):
             retval.append('Dynamic Lock: ' + str(self.dynamic_lockpages))
 
             retval.append('')
-            char_info = self.check_db(self.character_guid)
+            char_info = {'gameSeries': None, 'name': None, 'head': None}
+            try:
+                char_info = self.check_db(self.character_guid)
+            except (KeyError, OSError): # blank tag, or a character not in the db
+                pass
             retval.append('Series      : ' + str(char_info['gameSeries']))
             retval.append('Character   : ' + str(char_info['name']))
             retval.append('Char ID     : ' + str(char_info['head']))
@@ -78,7 +104,7 @@ class nfc_parser(object):
                 ['Type','Product','UID','Signature', 'Static Lock', 'Dynamic Lock']])
 
         retval.append('')
-        retval.extend(self.tag.dump()[0:4])
+        retval.extend(self._dump_header())
         return '\n'.join(retval)
 
     @property
@@ -93,7 +119,11 @@ class nfc_parser(object):
         Tag signatures are known to exist in any NTAG21* devices
         """
         try:
-            return self.tag.signature.hex()
+            if not self.snapshot_mode:
+                return self.tag.signature.hex()
+            elif self._signature is None: # fixed at production; read once
+                self._signature = self.tag.signature.hex()
+            return self._signature
         except AttributeError:
             return None
 
@@ -104,8 +134,8 @@ class nfc_parser(object):
         strings with no space padding.
         """
 
-        num_pages = TAG_SPECS[self.tag_type].pages
-        return [self.get_page(i).hex() for i in range(0, num_pages)]
+        image = self._image()
+        return [image[i:i + 4].hex() for i in range(0, len(image), 4)]
 
     @property
     def static_lockpages(self):
@@ -122,33 +152,40 @@ class nfc_parser(object):
     @property
     def dynamic_lockpages(self):
         """
-        Returns Page 130h, Byte 1,2,3 of an nfc tag.
-        This is only present on NTAG215 cards.
+        Returns the dynamic lock bytes (LOCK2-LOCK4), e.g., page 130 of
+        an NTAG215.  None on tags without dynamic lock bits.
         """
         try:
-            return self.spaced_hex(self.get_page('82h')[0:3])
+            return self.spaced_hex(self.get_page(self.profile.dynamic_lock)[0:3])
         except TypeError:
             return None
 
+    @property
+    def profile(self):
+        """
+        The tag's tag_profile.Profile_Def: page count, user memory, lock
+        and config pages, FAST_READ support and factory defaults.
+        Resolved once per nfc_parser, from the tag class nfcpy picked
+        by GET_VERSION at activation.
+        """
+        if self._profile is None:
+            self._profile = resolve(self.tag)
+        return self._profile
+
     @property
     def tag_type(self):
         """
-        Attempts to identify the tag type based on the product name.
+        The name of the tag's profile, e.g., 'NTAG215', 'MF0UL21' or
+        'Ultralight C', and the key into TAG_SPECS and OEM_BYTES.
 
         While similarly-named properties exist such as tag.type,
         this is often insufficent for determining the capabilities
         and capacities, e.g., "Type2Tag" does not convey pagecounts.
 
-        In fact, if no known product is identified, tag.type is returned
-        which appears to be the default state of UID-only cards.
+        If no known product is identified, 'Type2Tag' is returned,
+        which is the default state of UID-only cards.
         """
-
-        if 'NTAG21'.lower() in self.tag.product.lower():
-            return 'NTAG21{}'.format(self.tag.product[-1])
-        elif 'ultralight' in self.tag.product.lower():
-            return 'Ultralight'
-        else:
-            return self.tag.type
+        return self.profile.name
 
     @property
     def uid_only(self):
@@ -164,9 +201,14 @@ class nfc_parser(object):
 
     @property
     def oem_bytes(self):
-        """ Checks if current nfc tag has factory default values set. """
+        """
+        Checks if current nfc tag has factory default values set;
+        None if the factory defaults of its type are not known.
+        """
+        if not self.profile.oem:
+            return None
         try:
-            for loc, d_bytes in OEM_BYTES.get(self.tag_type):
+            for loc, d_bytes in self.profile.oem:
                 assert(self.get_page(loc) == d_bytes)
         except AssertionError:
             return False
@@ -177,7 +219,7 @@ class nfc_parser(object):
     def character_id(self):
         """ Returns character id bytes (15h, 0-3) """
         try:
-            return self.get_page('15h').hex()
+            return self.get_page(CHARACTER_PAGE).hex()
         except (TypeError, AttributeError):
             return None
 
@@ -185,22 +227,85 @@ class nfc_parser(object):
     def character_guid(self):
         """ Returns character id bytes (15h+16h, 0-3) """
         try:
-            return '0x' + self.get_page('15h').hex() + self.get_page('16h').hex()
+            return '0x' + self.get_page(CHARACTER_PAGE).hex() + \
+                   self.get_page(CHARACTER_PAGE + 1).hex()
         except (TypeError, AttributeError):
             return None
 
+    def _image(self):
+        """
+        All pages of the tag in one buffer, for rendering: the snapshot in
+        snapshot mode, else read through self.raw (4 pages per READ).
+        """
+        if self.snapshot_mode or self.uid_only:
+            return self.snapshot()
+        num_pages = self.profile.pages
+        return bytes(self._call(self.raw.__getitem__, slice(0, num_pages * 4)))
+
     @property
     def _pprint(self):
         """
         Generates the list used by the pprint method to show
         enumerated, spaced hex format of all nfc tag's pages.
         """
-        return ['{}  {}'.format(str(p).zfill(3), self.spaced_hex(d)) for p,d in enumerate(self.pages)]
+        return list(render_pages(self._image()))
 
     def pprint(self):
         """ Prints to stdout a tabularized hexadecimal output of the nfc tag contents """
-        print('\n'.join(self._pprint))
+        sys.stdout.write(''.join(line + '\n' for line in render_pages(self._image())))
+
+    def record(self, pages=False):
+        """
+        Everything the summary shows, as a dict ready for json.dumps,
+        built from one snapshot() of the tag whatever the parser's mode.
+
+        Parameters:
+        pages (bool): include every page, as a list of hex strings
+
+        Returns: {'uid', 'type', 'product', 'tag_type', 'signature',
+                  'static_lock', 'dynamic_lock', 'character_guid',
+                  'name', 'series', 'read_at'[, 'pages']}; values the tag
+                  does not have are None
+        """
+        image = self.snapshot()
+
+        def page(addr, first=0, last=4):
+            if addr is None:
+                return None
+            data = image[addr * 4:addr * 4 + 4]
+            return data[first:last] if len(data) == 4 else None
 
+        static_lock = page(0x02, 2)
+        dynamic_lock = page(self.profile.dynamic_lock, 0, 3)
+        guid = None
+        if page(CHARACTER_PAGE) is not None and page(CHARACTER_PAGE + 1) is not None:
+            guid = '0x' + page(CHARACTER_PAGE).hex() + page(CHARACTER_PAGE + 1).hex()
+
+        char_info = {'gameSeries': None, 'name': None}
+        if guid is not None:
+            try:
+                char_info = self.check_db(guid)
+            except (KeyError, OSError):
+                pass
+
+        retval = {
+            'uid': self.uid,
+            'type': self.tag.type,
+            'product': self.tag.product,
+            'tag_type': self.tag_type,
+            'signature': self.signature,
+            'static_lock': static_lock.hex() if static_lock else None,
+            'dynamic_lock': dynamic_lock.hex() if dynamic_lock else None,
+            'character_guid': guid,
+            'name': char_info['name'],
+            'series': char_info['gameSeries'],
+            'read_at': time.time(),
+        }
+        if pages:
+            retval['pages'] = [image[i:i + 4].hex() for i in range(0, len(image) - 3, 4)]
+        return retval
+
+    @registry.timed('get_page')
     def get_page(self, page_addr):
         """
         Retreive the contents of a page from the active card's memory.
@@ -219,12 +324,141 @@ class nfc_parser(object):
 
         if self.uid_only:
             return None
+        elif self.snapshot_mode:
+            data = self.snapshot()[page * 4:page * 4 + 4]
+            return data if len(data) == 4 else None
         else:
             try:
-                return bytes(self.raw[page * 4:page * 4 + 4])
+                return bytes(self._call(self.raw.__getitem__, slice(page * 4, page * 4 + 4)))
             except nfc.tag.tt2.Type2TagCommandError:
                 return None
 
+    def snapshot(self):
+        """
+        Reads the tag's memory (all pages of its tag_type) into a single
+        bytes buffer, once; later calls return the same buffer until
+        refresh() or invalidate() is called, or the tag is written to.
+
+        If the tag stops answering partway, the buffer holds the pages
+        read up to that point.  UID-only cards yield b''.
+
+        Returns: bytes() object of the tag's memory.
+        """
+
+        if self._snapshot is None:
+            if self.uid_only:
+                self._snapshot = bytes()
+            else:
+                num_pages = self.profile.pages
+                try:
+                    self._snapshot = self.read_pages(0, num_pages)
+                except nfc.tag.tt2.Type2TagCommandError:
+                    try: # salvage what plain READs can still reach
+                        self._snapshot = bytes(self.raw[0:num_pages * 4])
+                    except nfc.tag.tt2.Type2TagCommandError:
+                        self._snapshot = bytes(self.raw[0:len(self.raw)])
+        return self._snapshot
+
+    @property
+    def fast_read(self):
+        """ True if the tag supports the FAST_READ (3Ah) range command """
+        return self.profile.fast_read
+
+    @property
+    def fast_read_pages(self):
+        """
+        Pages per FAST_READ command: as many as fit in one response frame
+        of the frontend (e.g., 72 pages for a 290 byte RC-S380 frame).
+        """
+        try:
+            frame = self.clf.max_recv_data_size
+        except (AttributeError, IOError):
+            frame = FAST_READ_DEFAULT_FRAME
+        return max(1, min(frame // 4, 0x100))
+
+    def read_pages(self, start, stop, fast_read=None):
+        """
+        Reads a range of pages in as few reader round-trips as possible:
+        FAST_READ in frame-sized chunks where the tag supports it,
+        otherwise READ, which returns 4 pages per command.
+
+        Parameters:
+        start (int): first page to read
+        stop (int): page after the last page to read
+        fast_read (bool): force (True) or forbid (False) FAST_READ;
+                          None picks based on tag_type
+
+        Returns: bytes() object of len(4 * (stop - start))
+
+        Raises: nfc.tag.tt2.Type2TagCommandError if the tag stops responding
+
+        Under a retry policy a failed chunk is retried, and a failed
+        FAST_READ chunk is first halved; the chunk size then doubles back
+        after each chunk read on the first try.
+        """
+
+        if fast_read is None:
+            fast_read = self.fast_read
+        if self._chunk is None:
+            self._chunk = self.fast_read_pages
+
+        data = bytearray()
+        page = start
+        retry = 0
+        while page < stop:
+            try:
+                if fast_read:
+                    last = min(stop, page + self._chunk) - 1
+                    rsp = self.tag.transceive(bytearray([0x3A, page, last]))
+                    if len(rsp) != (last - page + 1) * 4:
+                        registry.count_error('FAST_READ', page)
+                        raise nfc.tag.tt2.Type2TagCommandError(
+                            nfc.tag.tt2.INVALID_RESPONSE_ERROR)
+                    data += rsp
+                    page = last + 1
+                else:
+                    data += self.tag.read(page)[0:(stop - page) * 4]
+                    page += 4
+            except nfc.tag.tt2.Type2TagCommandError as ex:
+                if self.retry is None or not self.retry.allow(ex, retry):
+                    raise
+                if fast_read and self._chunk > self.retry.policy.min_chunk:
+                    self._chunk = max(self.retry.policy.min_chunk, self._chunk // 2)
+                    self.retry.count('shrunk')
+                time.sleep(self.retry.policy.delay(retry))
+                retry += 1
+                continue
+
+            if retry:
+                self.retry.count('recovered')
+            elif self._chunk < self.fast_read_pages:
+                self._chunk = min(self.fast_read_pages, self._chunk * 2)
+            retry = 0
+        return bytes(data)
+
+    def invalidate(self):
+        """ Discards any tag memory cached by snapshot() or self.raw """
+        self._snapshot = None
+        self.raw = nfc.tag.tt2.Type2TagMemoryReader(self.tag)
+
+    def refresh(self):
+        """
+        Discards cached tag memory and re-reads it.
+
+        Returns: bytes() object of the tag's memory (see snapshot)
+        """
+        self.invalidate()
+        return self.snapshot()
+
+    def _dump_header(self):
+        """
+        The first four lines of tag.dump(), rendered from pages 0-3 (one
+        READ, or the snapshot) rather than dumping the whole tag.
+        """
+        return [nfc.tag.tt2.pagedump(i, self.get_page(i) or [None] * 4, info)
+                for i, info in enumerate(HEADER_INFO)]
+
+    @registry.timed('write_page')
     def write_page(self, page_addr, instr):
         """
         Alias function for tag.write.
@@ -235,43 +469,230 @@ class nfc_parser(object):
 
         Returns: None
         """
-        self.tag.write(page_addr, instr)
+        try:
+            self._call(self.tag.write, page_addr, instr)
+        finally:
+            self.invalidate()
+
+    def read_image(self):
+        """
+        Reads the whole of the tag's memory, from the snapshot in
+        snapshot mode, with FAST_READ where supported (see read_pages).
+
+        Returns: bytes() object of profile.pages * 4 bytes
+        """
+        num_pages = self.profile.pages
+        if self.snapshot_mode:
+            return self.snapshot()[0:num_pages * 4]
+        return self.read_pages(0, num_pages)
+
+    @registry.timed('dump')
+    def dump(self, archive=None):
+        """
+        Dumps current tag to 'dump.bin' file in script directory,
+        or records it in a dump_archive.
+
+        Parameters:
+        archive (dump_archive): store the image here instead of dump.bin
+
+        Returns: sha256 hex digest of the image if archived, else None
+        """
+        if archive is not None:
+            return archive.add_tag(self)
 
-    def dump(self):
-        """ Dumps current tag to 'dump.bin' file in script directory """
         with open('dump.bin', 'wb') as fh:
-            fh.write(self.raw[0:TAG_SPECS[self.tag_type].pages * 4])
+            fh.write(self.read_image())
 
-    def commit_image(self, byte_override=[]):
+    def commit_image(self, byte_override=[], diff=False, dry_run=False, image=None,
+                     journal=None):
         """
-        Writes 'dump.bin' to current card.
+        Writes 'dump.bin' (or image) to current card.
+
+        byte_override is only applied once every data page is written,
+        so an interrupted write never leaves a tag locked half-written.
 
         Parameters:
         byte_override (dict): dict containing {(hex_page, offset, [4 bytes])}
         # ('02h', 2, [0x0F, 0x48, 0x0F, 0xE0]) #static lockpages
-
-        Returns: None
+        diff (bool): read the card first and only write pages whose contents
+                     differ from the image; byte_override is still applied
+        dry_run (bool): print the pages that would be written, write nothing
+        image (bytes): tag image to write instead of reading 'dump.bin'
+        journal (write_journal): checkpoint each written page, and resume
+                                 an earlier interrupted write of the same
+                                 image to this tag after its last checkpoint
+
+        Returns: Commit_Result(written, skipped, error): page counts, where
+                 skipped are pages left alone because they already match
+                 the image (or were written before a resumed interruption),
+                 and the Type2TagCommandError that cut the data pages
+                 short (None if all were written)
         """
         PAGES_TO_SKIP = [0,1]
         PAGES_TO_SKIP.extend([int(p[:-1], 16) for p,o,d in byte_override])
 
-        with open('dump.bin', 'rb') as fh:
-            page = 0
-            while page < TAG_SPECS[self.tag_type].pages:
-                next_four = bytes(fh.read(4))
+        num_pages = self.profile.pages
+        if image is None:
+            with open('dump.bin', 'rb') as fh:
+                image = fh.read(num_pages * 4)
+        image = bytes(image[0:num_pages * 4])
+
+        current = None
+        if diff:
+            current = self.snapshot() if self.snapshot_mode else self.read_pages(0, num_pages)
+
+        writes = []
+        skipped = 0
+        for page in range(num_pages):
+            next_four = image[page * 4:page * 4 + 4]
+            if page in PAGES_TO_SKIP or len(next_four) != 4:
+                continue
+            elif current is not None and current[page * 4:page * 4 + 4] == next_four:
+                skipped += 1
+            else:
+                writes.append((page, next_four))
+
+        if journal is not None:
+            resume = journal.checkpoint(self.uid, image)
+            if resume is not None:
+                skipped += len([p for p, d in writes if p <= resume])
+                writes = [(p, d) for p, d in writes if p > resume]
+
+        if dry_run:
+            for page, next_four in writes:
+                print('{0}  {1}'.format(str(page).zfill(3), self.spaced_hex(next_four)))
+            for page_addr, byte_offset, bytedata in byte_override:
+                page = int(page_addr.rstrip('h'), 16)
+                print('{0}  {1} (override)'.format(str(page).zfill(3),
+                                                   self.spaced_hex(bytes(bytedata))))
+            print('{0} pages to write, {1} unchanged'.format(len(writes), skipped))
+            return Commit_Result(0, skipped, None)
+
+        written = 0
+        error = None
+        entry = journal.open(self.uid, image) if journal is not None else None
+        try:
+            for page, next_four in writes:
                 try:
-                    if page not in PAGES_TO_SKIP:
-                        self.tag.write(page, next_four)
+                    self._call(self._commit_page, page, next_four)
                 except nfc.tag.tt2.Type2TagCommandError as ex:
                     print('{0} error thrown (page {1})'.format(ex, page))
+                    error = ex
                     break
+                written += 1
+                if entry is not None:
+                    entry.confirm(page)
 
-                page += 1
+            if error is None:
+                for page_addr, byte_offset, bytedata in byte_override:
+                    page = int(page_addr.rstrip('h'), 16)
 
-        for page_addr, byte_offset, bytedata in byte_override:
-            page = int(page_addr.rstrip('h'), 16)
+                    self._call(self._commit_page, page, bytearray(bytedata))
+                    written += 1
+
+                if journal is not None:
+                    journal.complete(self.uid, image)
+        finally:
+            if entry is not None:
+                entry.close()
+            self.invalidate()
 
-            self.tag.write(page, bytearray(bytedata))
+        return Commit_Result(written, skipped, error)
+
+    @staticmethod
+    def _runs(pages):
+        """ [4, 5, 6, 9] -> [(4, 7), (9, 10)]: contiguous (start, stop) page ranges """
+        runs = []
+        for page in sorted(pages):
+            if runs and runs[-1][1] == page:
+                runs[-1][1] = page + 1
+            else:
+                runs.append([page, page + 1])
+        return [tuple(r) for r in runs]
+
+    @staticmethod
+    def _mismatches(image, current, pages, byte_override):
+        """ The pages of current that do not hold what image/byte_override put there """
+        overrides = {int(p[:-1], 16): (o, bytes(d)) for p, o, d in byte_override}
+        differ = []
+        for page in pages:
+            have = current.get(page)
+            if page in overrides:
+                offset, data = overrides[page]
+                if have is None or have[offset:] != data[offset:]:
+                    differ.append(page)
+            elif have != image[page * 4:page * 4 + 4]:
+                differ.append(page)
+        return differ
+
+    def verify_image(self, image=None, byte_override=[], rewrite=True, attempts=2):
+        """
+        Reads the tag back within this session, in the largest blocks it
+        supports (see read_pages), and checks it holds image as
+        commit_image(image, byte_override) would have left it: every data
+        page equal, and each byte_override page equal from its offset on,
+        e.g., the lock bytes of 02h.  PWD/PACK read back as zeros and
+        pages 0-1 are fixed, so those are not checked.
+
+        Pages that differ are written again and only they are re-read,
+        up to attempts times.
+
+        Parameters:
+        image (bytes): what was committed; 'dump.bin' if None
+        byte_override (list): as passed to commit_image
+        rewrite (bool): write differing pages again; only report if False
+        attempts (int): rewrite/re-read rounds before giving up on a page
+
+        Returns: Verify_Result(checked, rewritten, failed): pages compared,
+                 page writes spent fixing them, and the pages still
+                 differing (an empty list if the tag verified)
+
+        Raises: nfc.tag.tt2.Type2TagCommandError if the tag stops responding
+        """
+        num_pages = self.profile.pages
+        if image is None:
+            with open('dump.bin', 'rb') as fh:
+                image = fh.read(num_pages * 4)
+        image = bytes(image[0:num_pages * 4])
+
+        skip = {0, 1, self.profile.pwd, self.profile.pack}
+        overrides = {int(p[:-1], 16) for p, o, d in byte_override}
+        pages = [p for p in range(len(image) // 4) if p not in skip or p in overrides]
+
+        self.invalidate()
+        data = self.read_pages(0, num_pages)
+        current = {p: data[p * 4:p * 4 + 4] for p in pages}
+        differ = self._mismatches(image, current, pages, byte_override)
+
+        rewritten = 0
+        for attempt in range(attempts if rewrite else 0):
+            if not differ:
+                break
+            for page in differ:
+                override = [bytes(d) for p, o, d in byte_override if int(p[:-1], 16) == page]
+                self._call(self._commit_page, page, override[-1] if override
+                           else image[page * 4:page * 4 + 4])
+                rewritten += 1
+
+            self.invalidate()
+            for start, stop in self._runs(differ):
+                data = self.read_pages(start, stop)
+                current.update((p, data[(p - start) * 4:(p - start) * 4 + 4])
+                               for p in range(start, stop))
+            differ = self._mismatches(image, current, differ, byte_override)
+
+        return Verify_Result(len(pages), rewritten, differ)
+
+    def _call(self, func, *args):
+        """ func(*args), retried under the retry policy if there is one """
+        if self.retry is None:
+            return func(*args)
+        return self.retry.call(func, *args)
+
+    @registry.timed('commit_page')
+    def _commit_page(self, page, data):
+        """ One page write of commit_image, timed on its own """
+        self.tag.write(page, data)
 
     @staticmethod
     def spaced_hex(instr):
@@ -283,32 +704,24 @@ class nfc_parser(object):
         return ' '.join(instr[i:i+2] for i in range(0, len(instr), 2))
 
     @staticmethod
+    @registry.timed('check_api')
     def check_api(amiibo_id):
         """
         Checks amiiboapi.com for full amiibo data of character_id.
-        https://stackabuse.com/using-curl-in-python-with-pycurl/
-        """
-        import pycurl
-        from io import BytesIO
 
-        API_URL = "https://www.amiiboapi.com/api/amiibo/?head={}".format(amiibo_id)
+        Served by the process-lifetime amiibo_api client, which reuses its
+        connections and caches answers in api_cache/.
 
-        b_obj = BytesIO()
-        crl = pycurl.Curl()
-
-        crl.setopt(crl.URL, API_URL)
-        crl.setopt(crl.WRITEDATA, b_obj) # Write bytes that are utf-8 encoded
-        crl.perform() # Perform a file transfer
-        crl.close() # End curl session
-
-        get_body = b_obj.getvalue() # Get content stored in the BytesIO object (as bytes)
-        body_str = get_body.decode('utf8') # Decode bytes in get_body and return
-
-        import json
-        json_obj = json.loads(body_str)
-        return json_obj['amiibo'][0]
+        Raises: KeyError if the api has no amiibo for amiibo_id
+        """
+        from amiibo_api import amiibo_api
+        json_obj = amiibo_api.shared().lookup(amiibo_id)
+        if json_obj is None:
+            raise KeyError(amiibo_id)
+        return json_obj
 
     @staticmethod
+    @registry.timed('check_db')
     def check_db(amiibo_id, amiibo_series=None):
         """
         Checks json db from amiiboapi.com github for full amiibo data of character_id.
@@ -320,47 +733,126 @@ class nfc_parser(object):
         amiibo_series (int): 0x00 form preferred
 
         Returns: {'gameSeries': 'Animal Crossing', 'name': 'Bluebear'}
+
+        Served from the compiled, process-lifetime amiibo_db (amiibo.json.cache).
         """
-        import json
-        with open('amiibo.json', 'r') as db:
-            json_obj = json.loads(db.read())
+        from amiibo_db import amiibo_db
+        return amiibo_db.shared().lookup(amiibo_id, amiibo_series)
 
-            null_match = { 'gameSeries': None, 'name': None, 'head': None }
+class reader_session(object):
+    def __init__(self, interface='usb', target_type='106A', snapshot=True,
+                 clf=None, release_polls=2, retry=None):
+        """
+        A long-lived reader that keeps its frontend open across tags,
+        handing out an nfc_parser per newly presented tag.
 
-            if amiibo_series is None and amiibo_id is not None:
-                if len(amiibo_id) == 18:
-                    series = "0x{0}".format(amiibo_id[14:16]).lower()
-                    return {
-                        'gameSeries': json_obj['amiibo_series'][series],
-                        'name': json_obj['amiibos'][amiibo_id]['name'],
-                        'head': amiibo_id[2:10],
-                    }
-                else:
-                    return null_match
-            elif amiibo_id is not None:
-                cid = "0x{0}".format(amiibo_id).lower()
-                series = "0x{0:#02}".format(amiibo_series).lower()
-
-                for k in json_obj['amiibos'].keys():
-                    if k.startswith(cid):
-                        try:
-                            return {
-                                'gameSeries': json_obj['amiibo_series'][series],
-                                'name': json_obj['amiibos'][k]['name'],
-                                'head': amiibo_id,
-                            }
-                        except (KeyError):
-                            return null_match
-        return null_match
+        A tag is only handed out once while it stays on the reader; it
+        must be absent for release_polls consecutive polls before the
+        same UID counts as newly presented again.
+
+        Parameters:
+        interface (str): frontend to open, as in nfc_parser
+        target_type (str): '106A', '106B', '212F'
+        snapshot (bool): construct the parsers in snapshot mode
+        clf (nfc.ContactlessFrontend): an already-open frontend to use;
+                                       it is left open by close()
+        release_polls (int): empty polls before a UID is forgotten
+        retry (retry_policy): handed to each parser; every tag gets its
+                              own retry budget, policy.stats sums them
+
+        Returns: Nothing
+        """
+        self._owns_clf = clf is None
+        self.clf = clf or nfc.ContactlessFrontend(interface)
+        self.target_type = target_type
+        self.snapshot = snapshot
+        self.release_polls = release_polls
+        self.retry = retry
+
+        self.last_uid = None
+        self._empty_polls = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """ Closes the frontend, if this session opened it """
+        if self._owns_clf:
+            self.clf.close()
+
+    @staticmethod
+    def _target_uid(target):
+        """ The card identifier from sense responses, without activation """
+        return bytes(target.sdd_res or target.sensf_res or target.sensb_res or b'')
+
+    def poll(self):
+        """
+        Senses once.
+
+        Returns: nfc_parser for a newly presented tag, otherwise None
+        """
+        target = self.clf.sense(nfc.clf.RemoteTarget(self.target_type))
+        if target is None:
+            self._empty_polls += 1
+            if self._empty_polls >= self.release_polls:
+                self.last_uid = None
+            return None
+
+        self._empty_polls = 0
+        uid = self._target_uid(target)
+        if uid == self.last_uid:
+            return None
+
+        tag = nfc.tag.activate(self.clf, target)
+        if tag is None:
+            return None
+
+        self.last_uid = uid
+        return nfc_parser(clf=self.clf, tag=tag, snapshot=self.snapshot, retry=self.retry)
+
+    def run(self, callback, interval=0.5, limit=None):
+        """
+        Polls until limit tags were handled, passing each newly presented
+        tag to callback.  A tag pulled mid-callback is reported and the
+        loop carries on with the next one.
+
+        Parameters:
+        callback (function): called with a fresh nfc_parser per tag
+        interval (float): seconds to wait between polls
+        limit (int): stop after this many tags; None runs forever
+
+        Returns: number of tags handled (int)
+        """
+        count = 0
+        while limit is None or count < limit:
+            ni = self.poll()
+            if ni is None:
+                time.sleep(interval)
+                continue
+
+            try:
+                callback(ni)
+            except nfc.tag.TagCommandError as ex:
+                print('{0} error thrown (uid {1})'.format(ex, ni.uid), file=sys.stderr)
+            count += 1
+        return count
 
 if __name__ == '__main__':
+    import json
     import argparse
     
     parser = argparse.ArgumentParser()
     parser.add_argument('--dump',
                         action='store_true',
                         default=False,
-                        help="dump raw tag data to dump.bin")
+                        help="dump raw tag data to dump.bin (or --archive)")
+    parser.add_argument('--archive',
+                        metavar='DIR',
+                        default=None,
+                        help="with --dump, keep every read in a dump_archive in DIR")
     parser.add_argument('--summary',
                         action='store_true',
                         default=True,
@@ -369,21 +861,109 @@ if __name__ == '__main__':
                         action='store_true',
                         default=False,
                         help="output formatted nfc tag data to stdout")
+    parser.add_argument('--format',
+                        choices=('text', 'json', 'ndjson', 'bin'),
+                        default='text',
+                        help="text: --summary/--show; json/ndjson: one record per tag "
+                             "(see nfc_parser.record); bin: the raw tag image")
+    parser.add_argument('--pages',
+                        action='store_true',
+                        default=False,
+                        help="include every page in json/ndjson records")
+    parser.add_argument('--watch',
+                        action='store_true',
+                        default=False,
+                        help="keep the reader open and handle each tag presented")
+    parser.add_argument('--interval',
+                        type=float,
+                        default=0.5,
+                        help="seconds between polls in --watch mode")
+    parser.add_argument('--retries',
+                        type=int,
+                        default=0,
+                        help="retry transient RF failures up to N times per page (see retry_policy)")
+    parser.add_argument('--metrics',
+                        metavar='FILE',
+                        default=None,
+                        help="record timings; write them to FILE after each tag "
+                             "(Prometheus textfile, or json lines if FILE ends in .jsonl)")
+    parser.add_argument('--trace',
+                        metavar='FILE',
+                        default=None,
+                        help="record every reader command and response to FILE "
+                             "(replay it with nfc_trace.py)")
     args = parser.parse_args()
 
+    if args.metrics:
+        registry.enable()
+
+    retry = None
+    if args.retries:
+        from retry_policy import retry_policy
+        retry = retry_policy(retries=args.retries)
+
+    clf = None
+    if args.trace:
+        import atexit
+        from nfc_trace import recording_frontend
+        clf = recording_frontend(nfc.ContactlessFrontend('usb'), args.trace,
+                                 meta={'argv': sys.argv[1:]})
+        atexit.register(clf.close)
+
+    archive = None
+    if args.archive:
+        from dump_archive import dump_archive
+        archive = dump_archive(args.archive)
+
+    # messages go to stderr when stdout carries records
+    messages = sys.stdout if args.format == 'text' else sys.stderr
+    records = 0
+
+    def report(ni):
+        global records
+        if args.dump:
+            ni.dump(archive)
+
+        if args.format == 'bin':
+            sys.stdout.buffer.write(ni.read_image())
+            sys.stdout.buffer.flush()
+        elif args.format == 'ndjson':
+            print(json.dumps(ni.record(args.pages)), flush=True)
+        elif args.format == 'json':
+            record = json.dumps(ni.record(args.pages), indent=2)
+            if args.watch: # a json array, streamed one element at a time
+                print(',' if records else '[', record, sep='\n' if records else '', flush=True)
+            else:
+                print(record)
+        elif args.show:
+            ni.pprint()
+        elif args.summary:
+            print(ni)
+        records += 1
+
+        if ni.retry is not None and ni.retry.stats:
+            from retry_policy import format_stats
+            print('retry stats: {0}'.format(format_stats(ni.retry.stats)), file=messages)
+
+        if args.metrics:
+            registry.export(args.metrics)
+
+    if args.watch:
+        with reader_session(clf=clf, retry=retry) as session:
+            try:
+                session.run(report, interval=args.interval)
+            except KeyboardInterrupt:
+                pass
+        if args.format == 'json':
+            print(']' if records else '[]')
+        quit(0)
+
     ni = None
     try:
-        ni = nfc_parser()
+        ni = nfc_parser(snapshot=True, clf=clf, retry=retry)
     except AttributeError:
         # no card on reader, non-blocking app will exit
-        print('no card found on reader, exiting')
+        print('no card found on reader, exiting', file=messages)
         quit(1)
     else:
-        if args.dump:
-            ni.dump()
-
-        if args.show:
-            ni.pprint()
-        elif args.summary:
-            print(ni)
-
+        report(ni)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import tag_profile
+
+ANSI = {
+    'uid': '\x1b[36m',          # cyan
+    'lock': '\x1b[31m',         # red
+    'cc': '\x1b[33m',           # yellow
+    'dynamic lock': '\x1b[31m',
+    'config': '\x1b[35m',       # magenta
+    'pwd': '\x1b[35m',
+    'pack': '\x1b[35m',
+    '-': '\x1b[31m',
+    '+': '\x1b[32m',            # green
+}
+RESET = '\x1b[0m'
+
+ASCII = ''.join(chr(b) if 0x20 <= b < 0x7f else '.' for b in range(256))
+
+def page_roles(num_pages):
+    """
+    Names the special pages of a Type 2 tag image of num_pages pages
+    (see tag_profile.page_roles); the uid, static lock and capability
+    container pages alone if no known tag has that size.
+
+    Returns: {page: role}
+    """
+    profile = tag_profile.from_pages(num_pages)
+    if profile is None:
+        return {0: 'uid', 1: 'uid', 2: 'lock', 3: 'cc'}
+    return tag_profile.page_roles(profile)
+
+def _bounds(image, start, stop):
+    last = len(image) // 4
+    return max(0, start), last if stop is None else min(stop, last)
+
+def render_pages(image, start=0, stop=None):
+    """
+    The nfc_parser.pprint table, straight from an image: one
+    '000  aa bb cc dd' line per page.
+
+    Parameters:
+    image (bytes, bytearray, memoryview): the tag's memory
+    start (int): first page
+    stop (int): page after the last; the end of image if None
+
+    Returns: generator of str lines
+    """
+    view = memoryview(image)
+    start, stop = _bounds(view, start, stop)
+    for page in range(start, stop):
+        yield '{0:03}  {1}'.format(page, view[page * 4:page * 4 + 4].hex(' '))
+
+def render(image, start=0, stop=None, pages_per_row=4, roles=None, color=False):
+    """
+    A classic hex + ASCII view of an image, page-aligned:
+
+        004h 0010  03 00 fe 00 00 00 00 00 00 00 00 00 00 00 00 00  |................|
+
+    Parameters:
+    image (bytes, bytearray, memoryview): the tag's memory
+    start (int): first page
+    stop (int): page after the last; the end of image if None
+    pages_per_row (int): pages shown on each line
+    roles (dict): {page: role} to highlight, e.g., page_roles(); pages
+                  with a role are colored if color, and named at the
+                  end of the line otherwise
+    color (bool): highlight with ANSI escapes
+
+    Returns: generator of str lines
+    """
+    view = memoryview(image)
+    start, stop = _bounds(view, start, stop)
+    roles = roles or {}
+
+    for row in range(start, stop, pages_per_row):
+        end = min(stop, row + pages_per_row)
+        groups = []
+        marks = []
+        for page in range(row, end):
+            text = view[page * 4:page * 4 + 4].hex(' ')
+            role = roles.get(page)
+            if role is not None:
+                if color:
+                    text = ANSI.get(role, '') + text + RESET
+                elif role not in marks:
+                    marks.append(role)
+            groups.append(text)
+        groups.extend(['           '] * (pages_per_row - (end - row)))
+
+        chars = bytes(view[row * 4:end * 4]).decode('latin-1').translate(ASCII)
+        line = '{0:03x}h {1:04x}  {2}  |{3}|'.format(row, row * 4, ' '.join(groups), chars)
+        yield line + ('  ' + ', '.join(marks) if marks else '')
+
+def diff(before, after, start=0, stop=None, context=0, color=False):
+    """
+    The pages that differ between two images, as '-'/'+' line pairs in
+    the pprint format, with context unchanged pages around each change
+    and '...' between distant changes.  Pages past the end of the
+    shorter image count as differing.
+
+    Returns: generator of str lines
+    """
+    a, b = memoryview(before), memoryview(after)
+    last = max(len(a), len(b)) // 4
+    start, stop = max(0, start), last if stop is None else min(stop, last)
+
+    def line(sign, view, page):
+        data = view[page * 4:page * 4 + 4]
+        text = '{0}{1:03}  {2}'.format(sign, page, data.hex(' ') if len(data) == 4 else '(none)')
+        return ANSI[sign] + text + RESET if color and sign != ' ' else text
+
+    shown = start - 1 # last page printed
+    for page in range(start, stop):
+        if a[page * 4:page * 4 + 4] == b[page * 4:page * 4 + 4]:
+            continue
+        first = max(shown + 1, page - context)
+        if shown >= start and first > shown + 1:
+            yield '...'
+        for near in range(first, page):
+            yield line(' ', a, near)
+        yield line('-', a, page)
+        yield line('+', b, page)
+        shown = page
+
+        for near in range(page + 1, min(stop, page + 1 + context)):
+            if a[near * 4:near * 4 + 4] != b[near * 4:near * 4 + 4]:
+                break
+            yield line(' ', a, near)
+            shown = near
+
+def page_range(text):
+    """ Parses 'start:stop' (either may be empty, hex with 'h' suffix) -> (start, stop) """
+    def page(p):
+        return int(p[:-1], 16) if p.endswith('h') else int(p)
+    start, _, stop = text.partition(':')
+    return (page(start) if start else 0, page(stop) if stop else None)
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('dumps',
+                        nargs='+',
+                        help="tag images; with --diff, the first is compared to each other")
+    parser.add_argument('--range',
+                        type=page_range,
+                        default=(0, None),
+                        help="pages to show as start:stop, e.g., 4:16 or 15h:17h")
+    parser.add_argument('--pprint',
+                        action='store_true',
+                        default=False,
+                        help="the nfc_parser.pprint table instead of hex + ASCII")
+    parser.add_argument('--diff',
+                        action='store_true',
+                        default=False,
+                        help="show only the pages that differ from the first dump")
+    parser.add_argument('--context',
+                        type=int,
+                        default=0,
+                        help="unchanged pages shown around each --diff change")
+    parser.add_argument('--color',
+                        action='store_true',
+                        default=sys.stdout.isatty(),
+                        help="highlight special pages (default when on a terminal)")
+    args = parser.parse_args()
+
+    start, stop = args.range
+    out = sys.stdout
+    if args.diff:
+        with open(args.dumps[0], 'rb') as fh:
+            base = fh.read()
+
+    for path in (args.dumps[1:] if args.diff else args.dumps):
+        with open(path, 'rb') as fh:
+            image = fh.read()
+
+        if len(args.dumps) > 1:
+            out.write('== {0}\n'.format(path))
+        if args.diff:
+            lines = diff(base, image, start, stop, args.context, args.color)
+        elif args.pprint:
+            lines = render_pages(image, start, stop)
+        else:
+            lines = render(image, start, stop, roles=page_roles(len(image) // 4),
+                           color=args.color)
+        for line in lines:
+            out.write(line + '\n')
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+CACHE_DIR = 'image_cache'
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+class image_cache(object):
+    def __init__(self, keys, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        """
+        An on-disk, size-bounded LRU cache of re-keyed amiibo images.
+
+        Re-keying a source dump for a uid always gives the same image, so
+        each entry is keyed by sha256(source dump), the uid and the hash
+        of the key files it was signed with.  Entries carry a sha256 of
+        their own contents, checked on every read.
+
+        Parameters:
+        keys (tuple): (unfixed-info.bin, locked-secret.bin) file contents
+        directory (str): where entries are stored; created if missing
+        max_bytes (int): total size above which least recently used
+                         entries are evicted
+
+        Returns: Nothing
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keys_digest = hashlib.sha256(b''.join(keys)).hexdigest()
+        self.stats = Counter()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # key -> size, least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        found = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.bin'):
+                st = entry.stat()
+                found.append((st.st_mtime_ns, entry.name[:-4], st.st_size))
+        for mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """ Fraction of get()s answered from the cache (0.0 before any) """
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def _key(self, source, uid):
+        key = hashlib.sha256(hashlib.sha256(source).digest())
+        key.update(uid.lower().encode('ascii'))
+        key.update(self.keys_digest.encode('ascii'))
+        return key.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.bin')
+
+    def _forget(self, key):
+        self._size -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, source, uid):
+        """
+        Returns: the cached image for source re-keyed to uid, or None.
+                 Entries that fail their integrity check are discarded.
+        """
+        key = self._key(source, uid)
+        with self._lock:
+            try:
+                with open(self._path(key), 'rb') as fh:
+                    digest, image = fh.read(32), fh.read()
+            except FileNotFoundError:
+                self._entries.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+
+            if hashlib.sha256(image).digest() != digest:
+                self._forget(key)
+                self.stats['corrupt'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            os.utime(self._path(key))
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else: # put by another instance sharing the directory
+                self._entries[key] = len(image) + 32
+                self._size += len(image) + 32
+                self._evict()
+            self.stats['hits'] += 1
+            return image
+
+    def put(self, source, uid, image):
+        """ Stores image as source re-keyed to uid, evicting LRU entries """
+        key = self._key(source, uid)
+        path = self._path(key)
+        with self._lock:
+            tmp = '{0}.{1}.{2}.tmp'.format(path, os.getpid(), threading.get_ident())
+            with open(tmp, 'wb') as fh:
+                fh.write(hashlib.sha256(image).digest())
+                fh.write(image)
+            os.replace(tmp, path)
+
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = len(image) + 32
+            self._size += len(image) + 32
+            self._evict()
+
+    def _evict(self):
+        """ Drops least recently used entries until under max_bytes; hold _lock """
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            self._forget(next(iter(self._entries)))
+            self.stats['evicted'] += 1
+
+    def prepare(self, master_keys, source, uid):
+        """ write_amiibo.prepare_image, answered from the cache when possible """
+        from write_amiibo import prepare_image
+
+        image = self.get(source, uid)
+        if image is None:
+            image = prepare_image(master_keys, source, uid)
+            self.put(source, uid, image)
+        return image
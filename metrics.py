@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import Counter
+
+import nfc
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+COMMANDS = {0x30: 'READ', 0x3a: 'FAST_READ', 0xa2: 'WRITE', 0x60: 'GET_VERSION',
+            0x3c: 'READ_SIG', 0x1a: 'AUTHENTICATE', 0x1b: 'PWD_AUTH'}
+
+class histogram(object):
+    def __init__(self, buckets=BUCKETS):
+        """ Cumulative-on-export latency histogram, in seconds """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        """ Returns: list of (upper bound str, observations <= bound) """
+        total = 0
+        retval = []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            retval.append((str(bound), total))
+        return retval
+
+class metrics_registry(object):
+    def __init__(self, enabled=False):
+        """
+        Latency histograms per nfc_parser operation and per reader command,
+        plus Type2TagCommandError counts by command and page.
+
+        Hooks check .enabled before doing anything else, so a disabled
+        registry costs one attribute test per hooked call.
+
+        Parameters:
+        enabled (bool): start recording immediately
+
+        Returns: Nothing
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """ Drops everything recorded so far """
+        with self._lock:
+            self.operations = {}
+            self.commands = {}
+            self.errors = Counter() # (command, page) -> count
+
+    def observe(self, op, seconds, table=None):
+        """ Records one op taking seconds (in operations, or table) """
+        table = self.operations if table is None else table
+        with self._lock:
+            try:
+                table[op].observe(seconds)
+            except KeyError:
+                table[op] = histogram()
+                table[op].observe(seconds)
+
+    def timed(self, op):
+        """ Decorator recording the latency of every call as op """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(op, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def count_error(self, command, page=None):
+        """ Counts one failed command, e.g., ('WRITE', 0) """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.errors[(command, page)] += 1
+
+    def instrument(self, tag):
+        """
+        Wraps tag.transceive, through which every Type 2 command passes
+        (tag.read and tag.write included), to time each command and count
+        its failures by page.
+
+        tag.read and tag.write are wrapped too: they raise their own
+        Type2TagCommandError on a NAK or a malformed response, after
+        transceive has returned; those are counted against their page.
+
+        Returns: tag
+        """
+        if getattr(tag, '_metrics', None) is self:
+            return tag
+        transceive = tag.transceive
+
+        @functools.wraps(transceive)
+        def timed_transceive(data, *args, **kwargs):
+            if not self.enabled:
+                return transceive(data, *args, **kwargs)
+            command = COMMANDS.get(data[0], '0x{0:02X}'.format(data[0]))
+            start = time.perf_counter()
+            try:
+                return transceive(data, *args, **kwargs)
+            except nfc.tag.TagCommandError as error:
+                self.count_error(command, data[1] if len(data) > 1 else None)
+                error._metrics_counted = True # not again by read/write below
+                raise
+            finally:
+                self.observe(command, time.perf_counter() - start, self.commands)
+
+        def counted(func, command):
+            @functools.wraps(func)
+            def wrapper(page, *args, **kwargs):
+                try:
+                    return func(page, *args, **kwargs)
+                except nfc.tag.TagCommandError as error:
+                    if not getattr(error, '_metrics_counted', False):
+                        self.count_error(command, page)
+                    raise
+            return wrapper
+
+        tag.transceive = timed_transceive
+        tag.read = counted(tag.read, 'READ')
+        tag.write = counted(tag.write, 'WRITE')
+        tag._metrics = self
+        return tag
+
+    def as_dict(self):
+        """
+        Returns: {'time': epoch, 'operations': {op: stats}, 'commands':
+                 {command: stats}, 'errors': [{command, page, count}]},
+                 where stats are {'count', 'sum', 'buckets': {le: count}}
+        """
+        def stats(table):
+            return {name: {'count': h.count, 'sum': h.sum, 'buckets': dict(h.cumulative())}
+                    for name, h in sorted(table.items())}
+
+        with self._lock:
+            return {
+                'time': time.time(),
+                'operations': stats(self.operations),
+                'commands': stats(self.commands),
+                'errors': [{'command': c, 'page': p, 'count': n}
+                           for (c, p), n in sorted(self.errors.items(), key=str)],
+            }
+
+    def prometheus(self):
+        """ Returns: str of everything recorded, in Prometheus text format """
+        lines = []
+        with self._lock:
+            for metric, label, table, desc in (
+                    ('nfc_operation_seconds', 'op', self.operations,
+                     'Latency of nfc_parser operations'),
+                    ('nfc_command_seconds', 'command', self.commands,
+                     'Latency of Type 2 tag commands, including retries')):
+                lines.append('# HELP {0} {1}'.format(metric, desc))
+                lines.append('# TYPE {0} histogram'.format(metric))
+                for name, h in sorted(table.items()):
+                    for bound, count in h.cumulative():
+                        lines.append('{0}_bucket{{{1}="{2}",le="{3}"}} {4}'.format(
+                                     metric, label, name, bound, count))
+                    lines.append('{0}_sum{{{1}="{2}"}} {3}'.format(metric, label, name, h.sum))
+                    lines.append('{0}_count{{{1}="{2}"}} {3}'.format(metric, label, name, h.count))
+
+            lines.append('# HELP nfc_command_errors_total Failed Type 2 tag commands by page')
+            lines.append('# TYPE nfc_command_errors_total counter')
+            for (command, page), count in sorted(self.errors.items(), key=str):
+                lines.append('nfc_command_errors_total{{command="{0}",page="{1}"}} {2}'.format(
+                             command, '' if page is None else page, count))
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """ Atomically (re)writes path for node_exporter's textfile collector """
+        tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp, 'w') as fh:
+            fh.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def append_jsonl(self, path):
+        """ Appends the current as_dict() to path as one json line """
+        with open(path, 'a') as fh:
+            fh.write(json.dumps(self.as_dict()) + '\n')
+
+    def export(self, path):
+        """ append_jsonl for '.jsonl' paths, write_textfile for anything else """
+        if path.endswith('.jsonl'):
+            self.append_jsonl(path)
+        else:
+            self.write_textfile(path)
+
+registry = metrics_registry(enabled=bool(os.environ.get('NFC_METRICS')))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+# Deliberately stdlib-only: no nfc, no amiibo, so a command costs an
+# interpreter start and a socket round-trip, not a reader enumeration.
+import os
+import json
+import socket
+
+SOCKET_PATH = os.environ.get('NFCD_SOCKET', 'nfcd.sock')
+
+def send(sock_file, message):
+    """ Writes one json message, newline-terminated, and flushes it """
+    sock_file.write((json.dumps(message) + '\n').encode('utf8'))
+    sock_file.flush()
+
+def receive(sock_file):
+    """ Returns: the next json message, or None once the peer hung up """
+    line = sock_file.readline()
+    return json.loads(line.decode('utf8')) if line else None
+
+class nfcd_error(RuntimeError):
+    """ An operation the daemon ran and reported as failed """
+    pass
+
+class nfc_client(object):
+    def __init__(self, path=SOCKET_PATH, timeout=30.0):
+        """
+        A connection to a running nfcd, which owns the readers and keeps
+        the amiibo db and master keys loaded.  One connection may carry
+        any number of calls.
+
+        Parameters:
+        path (str): the daemon's unix socket
+        timeout (float): seconds to wait for any one reply
+
+        Returns: Nothing
+
+        Raises: OSError if no daemon is listening on path
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.file = self.sock.makefile('rwb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def call(self, op, **args):
+        """
+        Runs op on the daemon.
+
+        Returns: its result (decoded json)
+
+        Raises: nfcd_error if the daemon reports a failure
+                ConnectionError if the daemon went away
+        """
+        send(self.file, dict(args, op=op))
+        reply = receive(self.file)
+        if reply is None:
+            raise ConnectionError('nfcd closed the connection')
+        if not reply['ok']:
+            raise nfcd_error(reply['error'])
+        return reply['result']
+
+    def ping(self):
+        """ Returns: {'version', 'readers', 'uptime', 'keys'} """
+        return self.call('ping')
+
+    def summary(self, reader=None, wait=0):
+        """ Returns: str(nfc_parser) of the tag on reader """
+        return self.call('summary', reader=reader, wait=wait)
+
+    def read(self, reader=None, pages=False, wait=0):
+        """ Returns: nfc_parser.record(pages) of the tag on reader """
+        return self.call('read', reader=reader, pages=pages, wait=wait)
+
+    def dump(self, reader=None, wait=0):
+        """ Returns: bytes() of the tag's image (nfc_parser.read_image) """
+        return bytes.fromhex(self.call('dump', reader=reader, wait=wait))
+
+    def provision(self, source=None, image=None, reader=None, verify=False, wait=0):
+        """
+        Writes an amiibo to the tag on reader, with lock_data, as
+        write_amiibo.py does.
+
+        Parameters:
+        source (bytes): amiibo dump, re-keyed by the daemon for the tag
+        image (bytes): an image already prepared for this tag, written as-is
+        verify (bool): read back and fix differing pages (verify_image)
+
+        Returns: {'uid', 'written', 'skipped', 'verified'}
+        """
+        return self.call('provision', reader=reader, verify=verify, wait=wait,
+                         source=source.hex() if source is not None else None,
+                         image=image.hex() if image is not None else None)
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('op',
+                        choices=('ping', 'summary', 'read', 'dump', 'provision'),
+                        help="what to ask of nfcd")
+    parser.add_argument('source',
+                        nargs='?',
+                        default='orig.bin',
+                        help="provision: the amiibo dump to write (default orig.bin)")
+    parser.add_argument('--socket',
+                        default=SOCKET_PATH,
+                        help="nfcd's socket (default $NFCD_SOCKET or nfcd.sock)")
+    parser.add_argument('--reader',
+                        default=None,
+                        help="reader to use, as named by ping; the first if omitted")
+    parser.add_argument('--wait',
+                        type=float,
+                        default=0,
+                        help="seconds to wait for a tag to be presented")
+    parser.add_argument('--pages',
+                        action='store_true',
+                        default=False,
+                        help="read: include every page in the record")
+    parser.add_argument('--prepared',
+                        action='store_true',
+                        default=False,
+                        help="provision: source is already keyed for the tag, write it as-is")
+    parser.add_argument('--verify',
+                        action='store_true',
+                        default=False,
+                        help="provision: read back and rewrite pages that differ")
+    parser.add_argument('--time',
+                        action='store_true',
+                        default=False,
+                        help="print the round-trip time to stderr")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        with nfc_client(args.socket) as client:
+            if args.op == 'ping':
+                print(json.dumps(client.ping(), indent=2))
+            elif args.op == 'summary':
+                print(client.summary(args.reader, args.wait))
+            elif args.op == 'read':
+                print(json.dumps(client.read(args.reader, args.pages, args.wait), indent=2))
+            elif args.op == 'dump':
+                with open('dump.bin', 'wb') as fh:
+                    fh.write(client.dump(args.reader, args.wait))
+            elif args.op == 'provision':
+                with open(args.source, 'rb') as fh:
+                    data = fh.read()
+                result = client.provision(image=data if args.prepared else None,
+                                          source=None if args.prepared else data,
+                                          reader=args.reader, verify=args.verify, wait=args.wait)
+                print('wrote {0} pages to {1}, skipped {2} unchanged'.format(
+                      result['written'], result['uid'], result['skipped']))
+    except (OSError, nfcd_error) as ex:
+        print('{0} error thrown ({1})'.format(ex, args.op), file=sys.stderr)
+        quit(1)
+    finally:
+        if args.time:
+            print('{0:.1f} ms'.format((time.perf_counter() - started) * 1000), file=sys.stderr)
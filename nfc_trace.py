@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import gzip
+import json
+import time
+from collections import defaultdict, deque, Counter
+
+import nfc
+import nfc.clf
+from sim_tag import OPCODES
+
+TRACE_VERSION = 1
+TARGET_FIELDS = ('sens_res', 'sel_res', 'sdd_res', 'sensf_res', 'sensb_res')
+ERRORS = {cls.__name__: cls for cls in (nfc.clf.CommunicationError, nfc.clf.ProtocolError,
+                                        nfc.clf.TransmissionError, nfc.clf.TimeoutError,
+                                        nfc.clf.BrokenLinkError)}
+
+# A trace is gzipped json lines: a header, then one event per frontend call,
+#   [t, dt, 's', {brty, sens_res, ...} or null]    sense, and the target found
+#   [t, dt, 'x', command hex, response hex]         exchange
+#   [t, dt, 'e', command hex, 'TimeoutError']       exchange that raised
+# where t is seconds since the trace began and dt the seconds the call took.
+
+class trace_mismatch(RuntimeError):
+    """ The session asked something the trace has no answer for """
+    pass
+
+def _target(target):
+    """ Returns: dict of a RemoteTarget's bitrate/type and sense responses """
+    if target is None:
+        return None
+    retval = {'brty': target.brty}
+    for field in TARGET_FIELDS:
+        value = getattr(target, field, None)
+        if value is not None:
+            retval[field] = bytes(value).hex()
+    return retval
+
+class recording_frontend(object):
+    def __init__(self, clf, path, meta=None):
+        """
+        Wraps a frontend (nfc.ContactlessFrontend or sim_frontend),
+        passing every call through to it while writing each sense and
+        exchange -- command, response or error, start time and duration --
+        to a trace file for replay_frontend.
+
+        Parameters:
+        clf (nfc.ContactlessFrontend): the frontend to record
+        path (str): trace file to write; see the format above
+        meta (dict): kept in the trace header, e.g., what was run
+
+        Returns: Nothing
+        """
+        self.clf = clf
+        self.path = path
+        self.events = 0
+        self._fh = gzip.open(path, 'wt', encoding='ascii')
+        self._started = time.perf_counter()
+        self._write({'trace': TRACE_VERSION,
+                     'created': time.time(),
+                     'max_send_data_size': clf.max_send_data_size,
+                     'max_recv_data_size': clf.max_recv_data_size,
+                     'meta': meta or {}})
+
+    def __getattr__(self, name):
+        return getattr(self.clf, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """ Finishes the trace, then closes the wrapped frontend """
+        if not self._fh.closed:
+            self._fh.close()
+        self.clf.close()
+
+    def _write(self, event):
+        self._fh.write(json.dumps(event, separators=(',', ':')) + '\n')
+
+    def _event(self, started, *event):
+        self.events += 1
+        now = time.perf_counter()
+        self._write([round(started - self._started, 6), round(now - started, 6)] + list(event))
+
+    def sense(self, *targets, **options):
+        started = time.perf_counter()
+        target = self.clf.sense(*targets, **options)
+        self._event(started, 's', _target(target))
+        return target
+
+    def exchange(self, send_data, timeout):
+        started = time.perf_counter()
+        try:
+            rsp = self.clf.exchange(send_data, timeout)
+        except nfc.clf.CommunicationError as ex:
+            self._event(started, 'e', bytes(send_data).hex(), type(ex).__name__)
+            raise
+        self._event(started, 'x', bytes(send_data).hex(), bytes(rsp).hex())
+        return rsp
+
+def load(path):
+    """ Returns: (header dict, list of events) of a trace file """
+    with gzip.open(path, 'rt', encoding='ascii') as fh:
+        header = json.loads(fh.readline())
+        if header.get('trace') != TRACE_VERSION:
+            raise ValueError('{0} is not a version {1} trace'.format(path, TRACE_VERSION))
+        return header, [json.loads(line) for line in fh]
+
+class replay_frontend(object):
+    def __init__(self, path, realtime=False, strict=True):
+        """
+        A frontend answering a session from a trace instead of a reader:
+        nfc.tag.activate and nfc_parser run against it exactly as they
+        ran against the reader the trace was recorded from, including
+        its timeouts and transmission errors.
+
+        Parameters:
+        path (str): trace written by recording_frontend
+        realtime (bool): take as long over each call as the reader did;
+                         otherwise answer immediately
+        strict (bool): the session must repeat the recorded calls in
+                       order; if False, each command is answered by the
+                       next recorded response to that same command,
+                       so reordered reads (but no new ones) still replay
+
+        Returns: Nothing
+
+        Raises: trace_mismatch, from sense/exchange, on anything the
+                trace cannot answer
+        """
+        self.path = path
+        self.header, self.events = load(path)
+        self.realtime = realtime
+        self.strict = strict
+        self.commands = Counter()
+        self.target = None
+
+        self._next = 0
+        self._queues = defaultdict(deque)
+        for i, event in enumerate(self.events):
+            self._queues[self._key(event)].append(i)
+
+    @staticmethod
+    def _key(event):
+        return ('s',) if event[2] == 's' else ('x', event[3])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.target = None
+
+    @property
+    def max_send_data_size(self):
+        return self.header['max_send_data_size']
+
+    @property
+    def max_recv_data_size(self):
+        return self.header['max_recv_data_size']
+
+    @property
+    def remaining(self):
+        """ Returns: number of recorded events not yet replayed """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _take(self, key):
+        """ Returns: the event answering key, honouring strict and realtime """
+        queue = self._queues[key]
+        if self.strict:
+            event = self.events[self._next] if self._next < len(self.events) else None
+            if event is None or self._key(event) != key:
+                raise trace_mismatch('call {0}: session sent {1}, trace has {2}'.format(
+                                     self._next, key, event and self._key(event)))
+            self._next += 1
+        elif not queue:
+            raise trace_mismatch('no recorded answer left for {0}'.format(key))
+        event = self.events[queue.popleft()]
+        if self.realtime and event[1] > 0:
+            time.sleep(event[1])
+        return event
+
+    def sense(self, *targets, **options):
+        self.commands['SENSE'] += 1
+        found = self._take(('s',))[3]
+        if found is None:
+            self.target = None
+        else:
+            fields = {k: bytearray.fromhex(v) for k, v in found.items() if k != 'brty'}
+            self.target = nfc.clf.RemoteTarget(found['brty'], **fields)
+        return self.target
+
+    def exchange(self, send_data, timeout):
+        command = bytes(send_data).hex()
+        self.commands[OPCODES.get(send_data[0], '0x{:02X}'.format(send_data[0]))] += 1
+        event = self._take(('x', command))
+        if event[2] == 'e':
+            raise ERRORS.get(event[4], nfc.clf.CommunicationError)()
+        return bytearray.fromhex(event[4])
+
+def summarize(path):
+    """ Returns: dict of a trace's command counts, errors and reader time """
+    header, events = load(path)
+    commands, errors = Counter(), Counter()
+    for event in events:
+        if event[2] == 's':
+            commands['SENSE'] += 1
+            continue
+        opcode = int(event[3][0:2], 16)
+        commands[OPCODES.get(opcode, '0x{:02X}'.format(opcode))] += 1
+        if event[2] == 'e':
+            errors[event[4]] += 1
+    return {'created': header['created'],
+            'meta': header['meta'],
+            'events': len(events),
+            'commands': dict(commands),
+            'errors': dict(errors),
+            'reader_seconds': round(sum(e[1] for e in events), 6),
+            'session_seconds': round(events[-1][0] + events[-1][1], 6) if events else 0.0}
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from easy_nfc import nfc_parser
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trace',
+                        help="trace file, as written by easy_nfc.py --trace")
+    parser.add_argument('--replay',
+                        choices=('summary', 'record', 'dump'),
+                        default=None,
+                        help="re-run this read against the trace (as recorded, in snapshot mode)")
+    parser.add_argument('--realtime',
+                        action='store_true',
+                        default=False,
+                        help="replay at the recorded reader's pace, not as fast as possible")
+    parser.add_argument('--loose',
+                        action='store_true',
+                        default=False,
+                        help="answer commands in any order the trace can, see replay_frontend")
+    args = parser.parse_args()
+
+    if args.replay is None:
+        print(json.dumps(summarize(args.trace), indent=2))
+        quit(0)
+
+    clf = replay_frontend(args.trace, args.realtime, not args.loose)
+    started = time.perf_counter()
+    try:
+        ni = nfc_parser(clf=clf, snapshot=True)
+        if args.replay == 'summary':
+            print(ni)
+        elif args.replay == 'record':
+            print(json.dumps(ni.record(), indent=2))
+        elif args.replay == 'dump':
+            sys.stdout.buffer.write(ni.read_image())
+    except trace_mismatch as ex:
+        print('{0} error thrown (replaying {1})'.format(ex, args.trace), file=sys.stderr)
+        quit(1)
+    print('replayed {0} commands in {1:.1f} ms, {2} recorded events unused'.format(
+          sum(clf.commands.values()), (time.perf_counter() - started) * 1000, clf.remaining),
+          file=sys.stderr)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import time
+import socket
+import threading
+import socketserver
+
+import nfc
+from easy_nfc import nfc_parser, reader_session
+from amiibo_db import amiibo_db
+from nfc_client import SOCKET_PATH, send, receive
+from provision_pool import find_readers
+from write_amiibo import lock_data, load_master_keys, prepare_image
+
+OPS = ('ping', 'summary', 'read', 'dump', 'provision')
+
+class _handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        """ Answers newline-delimited json requests until the client hangs up """
+        while True:
+            try:
+                request = receive(self.rfile)
+            except ValueError as ex:
+                send(self.wfile, {'ok': False, 'error': 'bad request: {0}'.format(ex)})
+                continue
+            if request is None:
+                return
+            send(self.wfile, self.server.nfcd.handle(request))
+
+class _server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def _listening(path):
+    """ Returns: True if something accepts connections on the unix socket at path """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError: # missing, or a stale socket nobody listens on
+        return False
+    finally:
+        sock.close()
+    return True
+
+class nfcd(object):
+    def __init__(self, readers=None, socket_path=SOCKET_PATH, keys=None, retry=None,
+                 interval=0.1):
+        """
+        A resident daemon owning the readers, the amiibo db and the master
+        keys, serving nfc_client over a unix socket.  A command then costs
+        a socket round-trip and the tag I/O itself, rather than python
+        startup, importing nfc, usb enumeration and a cold db load.
+
+        Each request senses afresh on its reader, so a tag may be swapped
+        between commands; requests to the same reader are serialized,
+        requests to different readers run concurrently.  amiibo.json is
+        re-checked (a stat) per request and reloaded if it changed.
+
+        Parameters:
+        readers (list): reader paths ('usb:001:004') or open frontends;
+                        every attached reader if None
+        socket_path (str): where to listen; a stale socket is replaced,
+                           a live one (another nfcd) raises RuntimeError
+        keys (tuple): (data_bin, tag_bin) key file paths; provisioning
+                      from a source dump is refused if they can't be read
+        retry (retry_policy): handed to each parser, see nfc_parser
+        interval (float): seconds between senses while a request waits
+
+        Returns: Nothing
+        """
+        if _listening(socket_path):
+            raise RuntimeError('another nfcd is already listening on {0}'.format(socket_path))
+        if readers is None:
+            readers = find_readers()
+
+        self.sessions = {}
+        for i, reader in enumerate(readers):
+            if isinstance(reader, str):
+                self.sessions[reader] = reader_session(reader, retry=retry)
+            else:
+                self.sessions['reader{0}'.format(i)] = reader_session(clf=reader, retry=retry)
+        self.locks = {name: threading.Lock() for name in self.sessions}
+        self.interval = interval
+        self.started = time.time()
+
+        amiibo_db.shared() # compiled once here, not on the first summary
+        try:
+            self.master_keys = load_master_keys(*(keys or ()))
+        except OSError as ex:
+            print('{0} error thrown (master keys not loaded)'.format(ex))
+            self.master_keys = None
+
+        if os.path.exists(socket_path): # stale, see _listening above
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.server = _server(socket_path, _handler)
+        self.server.nfcd = self
+        os.chmod(socket_path, 0o600)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """ Stops serve_forever() from another thread """
+        self.server.shutdown()
+
+    def close(self):
+        self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        for session in self.sessions.values():
+            session.close()
+
+    def handle(self, request):
+        """
+        Runs one decoded request.
+
+        Returns: {'ok': True, 'result': ...} or {'ok': False, 'error': str}
+        """
+        op = request.pop('op', None) if isinstance(request, dict) else None
+        if op not in OPS:
+            return {'ok': False, 'error': 'unknown op {0}'.format(op)}
+        try:
+            amiibo_db.reload() # a stat; picks up an updated amiibo.json
+        except (OSError, ValueError): # missing or half-written: keep the loaded db
+            pass
+        try:
+            return {'ok': True, 'result': getattr(self, op)(**request)}
+        except Exception as ex:
+            return {'ok': False, 'error': '{0}: {1}'.format(type(ex).__name__, ex)}
+
+    def _parser(self, session, wait):
+        """
+        Senses the tag now on session's reader, for up to wait seconds.
+
+        Returns: nfc_parser, in snapshot mode
+
+        Raises: LookupError if no tag was presented in time
+        """
+        deadline = time.monotonic() + (wait or 0)
+        while True:
+            target = session.clf.sense(nfc.clf.RemoteTarget(session.target_type))
+            tag = nfc.tag.activate(session.clf, target) if target is not None else None
+            if tag is not None:
+                return nfc_parser(clf=session.clf, tag=tag, snapshot=True,
+                                  retry=session.retry)
+            if time.monotonic() >= deadline:
+                raise LookupError('no tag present')
+            time.sleep(self.interval)
+
+    def _with_tag(self, reader, wait, func):
+        """ Calls func(nfc_parser) holding reader's lock; the first reader if None """
+        name = reader or next(iter(self.sessions), None)
+        if name not in self.sessions:
+            raise LookupError('no reader {0}'.format(name))
+        with self.locks[name]:
+            return func(self._parser(self.sessions[name], wait))
+
+    def ping(self):
+        return {'version': __version__,
+                'readers': list(self.sessions),
+                'uptime': round(time.time() - self.started, 3),
+                'keys': self.master_keys is not None}
+
+    def summary(self, reader=None, wait=0):
+        return self._with_tag(reader, wait, str)
+
+    def read(self, reader=None, pages=False, wait=0):
+        return self._with_tag(reader, wait, lambda ni: ni.record(pages))
+
+    def dump(self, reader=None, wait=0):
+        return self._with_tag(reader, wait, lambda ni: ni.read_image().hex())
+
+    def provision(self, source=None, image=None, reader=None, verify=False, wait=0):
+        if (source is None) == (image is None):
+            raise ValueError('provision takes one of source or image')
+        if source is not None and self.master_keys is None:
+            raise RuntimeError('master keys not loaded, only prepared images can be written')
+
+        def write(ni):
+            if source is not None:
+                data = prepare_image(self.master_keys, bytes.fromhex(source), ni.uid)
+            else:
+                data = bytes.fromhex(image)
+            result = ni.commit_image(byte_override=lock_data, image=data)
+            if result.error is not None:
+                raise result.error
+            verified = ni.verify_image(data, byte_override=lock_data) if verify else None
+            if verified is not None and verified.failed:
+                raise RuntimeError('pages {0} did not verify'.format(verified.failed))
+            return {'uid': ni.uid,
+                    'written': result.written,
+                    'skipped': result.skipped,
+                    'verified': verified.checked if verified is not None else None}
+        return self._with_tag(reader, wait, write)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('readers',
+                        nargs='*',
+                        help="reader paths, e.g., usb:001:004 (default: every attached reader)")
+    parser.add_argument('--socket',
+                        default=SOCKET_PATH,
+                        help="unix socket to listen on (default $NFCD_SOCKET or nfcd.sock)")
+    parser.add_argument('--retries',
+                        type=int,
+                        default=0,
+                        help="retry transient RF failures up to N times per page (see retry_policy)")
+    args = parser.parse_args()
+
+    retry = None
+    if args.retries:
+        from retry_policy import retry_policy
+        retry = retry_policy(retries=args.retries)
+
+    with nfcd(args.readers or None, args.socket, retry=retry) as daemon:
+        print('serving {0} on {1}'.format(', '.join(daemon.sessions) or 'no readers',
+                                          args.socket))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import time
+import queue
+import threading
+from collections import namedtuple, Counter
+
+import nfc
+from easy_nfc import reader_session
+from write_amiibo import lock_data
+
+Job = namedtuple('provision_job', 'name source attempts failed_on uid')
+
+def find_readers():
+    """ Returns the 'usb:bus:dev' path of every attached nfcpy-supported reader """
+    import nfc.clf.device
+    import nfc.clf.transport
+
+    found = nfc.clf.transport.USB.find('usb') or []
+    return ['usb:{0:03d}:{1:03d}'.format(bus, dev) for vid, pid, bus, dev in found
+            if (vid, pid) in nfc.clf.device.usb_device_map]
+
+class provision_pool(object):
+    def __init__(self, prepare, readers=None, max_attempts=3, interval=0.2, journal=None,
+                 retry=None, verify=False):
+        """
+        Provisions tags on several readers at once, one worker thread per
+        reader (nfcpy I/O blocks), all pulling jobs from a shared queue.
+
+        Each worker waits for a tag, takes the next job, re-keys it for
+        that tag's uid with prepare() and commits it with lock_data, just
+        as write_amiibo.py does.  A failed job goes back on the queue for
+        a reader it has not failed on yet, up to max_attempts.
+
+        Images already prepared for a known uid (see submit_image) are
+        written as-is to that tag, on whichever reader it turns up.
+
+        With a journal, a tag pulled partway through keeps its job: the
+        job is requeued bound to that tag, and presenting it again (on
+        any reader) resumes the write from the last confirmed page.
+
+        Parameters:
+        prepare (function): prepare(source, uid) -> image bytes, e.g.,
+                            functools.partial(prepare_image, master_keys)
+        readers (list): reader paths ('usb:001:004') or open frontends;
+                        every attached reader if None
+        max_attempts (int): tries per job before it is given up on
+        interval (float): seconds between polls on an empty reader
+        journal (write_journal): see nfc_parser.commit_image
+        retry (retry_policy): retry transient failures within a job
+                              before failing it; see nfc_parser
+        verify (bool): read each tag back after writing it, rewriting
+                       pages that differ; see nfc_parser.verify_image
+
+        Returns: Nothing
+        """
+        if readers is None:
+            readers = find_readers()
+
+        self.prepare = prepare
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self.journal = journal
+        self.verify = verify
+
+        self.sessions = {}
+        for i, reader in enumerate(readers):
+            if isinstance(reader, str):
+                self.sessions[reader] = reader_session(reader, retry=retry)
+            else:
+                self.sessions['reader{0}'.format(i)] = reader_session(clf=reader, retry=retry)
+
+        self.jobs = queue.Queue()
+        self.stats = {name: Counter() for name in self.sessions}
+        self.done = []
+        self.failed = []
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.started = None
+        self.finished = None
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+
+    def submit(self, source, name=None):
+        """
+        Queues a source amiibo dump to be written to the next free tag.
+
+        Parameters:
+        source (bytes or str): dump contents or a path to read them from
+        name (str): label for reporting; the path if source is one
+        """
+        if isinstance(source, str):
+            name = name or source
+            with open(source, 'rb') as fh:
+                source = fh.read()
+        self.jobs.put(Job(name, source, 0, frozenset(), None))
+
+    def submit_image(self, uid, image, name=None):
+        """
+        Queues a finished image for the tag with the given uid; it is not
+        passed through prepare().
+
+        Parameters:
+        uid (str): hex uid of the tag the image was prepared for
+        image (bytes): the image to commit
+        name (str): label for reporting
+        """
+        self.jobs.put(Job(name or uid, image, 0, frozenset(), uid))
+
+    def run(self, timeout=None):
+        """
+        Provisions until every submitted job is written or given up on,
+        or until timeout.  Jobs still queued when it stops (e.g., bound
+        to a tag that never came back) are moved to self.failed.
+
+        Parameters:
+        timeout (float): seconds to keep provisioning; None waits for
+                         every job
+
+        Returns: dict of rates(), see below
+        """
+        self.started = time.time()
+        self._stop.clear()
+
+        workers = [threading.Thread(target=self._worker, args=(name,), daemon=True)
+                   for name in self.sessions]
+        for worker in workers:
+            worker.start()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.jobs.all_tasks_done:
+            while self.jobs.unfinished_tasks and any(w.is_alive() for w in workers):
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                self.jobs.all_tasks_done.wait(self.interval)
+        self._stop.set()
+        for worker in workers:
+            worker.join()
+
+        while True:
+            try:
+                self.failed.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+            self.jobs.task_done()
+
+        self.finished = time.time()
+        return self.rates()
+
+    def rates(self):
+        """ Tags/hour written per reader and in aggregate ('total') """
+        elapsed = ((self.finished or time.time()) - (self.started or time.time())) / 3600
+        retval = {name: (stats['written'] / elapsed if elapsed else 0.0)
+                  for name, stats in self.stats.items()}
+        retval['total'] = sum(retval.values())
+        return retval
+
+    def _next_job(self, name, uid):
+        """
+        Takes the queued job prepared for uid if there is one, else the
+        first unbound job that has not already failed on this reader,
+        putting back the ones it passes over.  Returns None if there is
+        none (e.g., only jobs other readers should retry).
+        """
+        with self._lock:
+            passed = []
+            job = None
+            try:
+                for i in range(self.jobs.qsize()):
+                    candidate = self.jobs.get_nowait()
+                    if candidate.uid == uid:
+                        passed.extend([job] if job else [])
+                        job = candidate
+                        break
+                    elif job is None and candidate.uid is None and \
+                         (name not in candidate.failed_on or
+                          len(candidate.failed_on) >= len(self.sessions)):
+                        job = candidate
+                    else:
+                        passed.append(candidate)
+            except queue.Empty:
+                pass
+
+            for candidate in passed:
+                self.jobs.put(candidate)
+                self.jobs.task_done()
+            return job
+
+    def _worker(self, name):
+        session = self.sessions[name]
+
+        while not self._stop.is_set():
+            try:
+                ni = session.poll()
+            except Exception as ex: # e.g., a tag pulled mid-activation
+                print('{0} error thrown (polling {1})'.format(ex, name))
+                ni = None
+            if ni is None:
+                time.sleep(self.interval)
+                continue
+
+            job = self._next_job(name, ni.uid)
+            if job is None:
+                print('no job for tag {0} on {1}, present another'.format(ni.uid, name))
+                continue
+
+            image = None
+            try:
+                if job.uid is None:
+                    image = self.prepare(job.source, ni.uid)
+                else:
+                    image = job.source
+                result = ni.commit_image(byte_override=lock_data, image=image,
+                                         journal=self.journal)
+                if result.error is not None:
+                    raise result.error
+                if self.verify:
+                    verified = ni.verify_image(image, byte_override=lock_data)
+                    if verified.failed:
+                        raise RuntimeError('pages {0} did not verify'.format(verified.failed))
+            except Exception as ex:
+                print('{0} error thrown ({1} on {2})'.format(ex, job.name, name))
+                if self.journal is not None and image is not None and \
+                   self.journal.checkpoint(ni.uid, image) is not None:
+                    # partly written: finish this tag rather than start over on another
+                    job = job._replace(source=image, uid=ni.uid)
+                self._failed(name, job)
+            else:
+                with self._lock:
+                    self.stats[name]['written'] += 1
+                    self.done.append((job.name, ni.uid, name))
+            finally:
+                self.jobs.task_done()
+
+    def _failed(self, name, job):
+        """ Requeues job for another reader, or gives up on it """
+        job = job._replace(attempts=job.attempts + 1, failed_on=job.failed_on | {name})
+        with self._lock:
+            self.stats[name]['failed'] += 1
+            if job.attempts < self.max_attempts:
+                self.jobs.put(job)
+            else:
+                self.failed.append(job)
+
+if __name__ == '__main__':
+    import argparse
+    import functools
+    from amiibo import AmiiboMasterKey
+    from write_amiibo import read_key_files, prepare_image
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('dumps',
+                        nargs='+',
+                        help="amiibo dumps to provision, one tag each")
+    parser.add_argument('--reader',
+                        action='append',
+                        help="reader path (repeatable); all attached readers by default")
+    parser.add_argument('--attempts',
+                        type=int,
+                        default=3,
+                        help="tries per dump before giving up on it")
+    parser.add_argument('--cache',
+                        action='store_true',
+                        default=False,
+                        help="reuse images already re-keyed for a tag (see image_cache)")
+    parser.add_argument('--journal',
+                        action='store_true',
+                        default=False,
+                        help="resume writes to tags pulled early (see write_journal)")
+    parser.add_argument('--verify',
+                        action='store_true',
+                        default=False,
+                        help="read each tag back after writing, rewriting pages that differ")
+    parser.add_argument('--retries',
+                        type=int,
+                        default=0,
+                        help="retry transient RF failures up to N times per page (see retry_policy)")
+    parser.add_argument('--timeout',
+                        type=float,
+                        default=None,
+                        help="stop after this many seconds, giving up on unwritten dumps")
+    parser.add_argument('--metrics',
+                        metavar='FILE',
+                        default=None,
+                        help="record timings and write them to FILE when done "
+                             "(Prometheus textfile, or json lines if FILE ends in .jsonl)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        from metrics import registry
+        registry.enable()
+
+    keys = read_key_files()
+    cache = None
+    if args.cache:
+        from image_cache import image_cache
+        cache = image_cache(keys)
+        prepare = functools.partial(cache.prepare, AmiiboMasterKey.from_separate_bin(*keys))
+    else:
+        prepare = functools.partial(prepare_image, AmiiboMasterKey.from_separate_bin(*keys))
+    journal = None
+    if args.journal:
+        from write_journal import write_journal
+        journal = write_journal()
+    retry = None
+    if args.retries:
+        from retry_policy import retry_policy
+        retry = retry_policy(retries=args.retries)
+    pool = provision_pool(prepare, readers=args.reader, max_attempts=args.attempts,
+                          journal=journal, retry=retry, verify=args.verify)
+    print('provisioning {0} dumps on {1} readers'.format(len(args.dumps), len(pool.sessions)))
+
+    for path in args.dumps:
+        pool.submit(path)
+    try:
+        rates = pool.run(args.timeout)
+    finally:
+        pool.close()
+        if args.metrics:
+            registry.export(args.metrics)
+
+    for name in sorted(pool.stats):
+        print('{0:<16}: {1:>4} written, {2:>4} failed, {3:>8,.1f} tags/hour'.format(
+              name, pool.stats[name]['written'], pool.stats[name]['failed'], rates[name]))
+    print('{0:<16}: {1:>4} written, {2:>4} given up, {3:>8,.1f} tags/hour'.format(
+          'total', len(pool.done), len(pool.failed), rates['total']))
+    if cache:
+        print('image cache hit rate: {0:.1%}'.format(cache.hit_rate))
+    if retry:
+        from retry_policy import format_stats
+        print('retry stats: {0}'.format(format_stats(retry.stats) or 'none needed'))
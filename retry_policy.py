@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import time
+import threading
+from collections import Counter
+
+import nfc
+import nfc.tag.tt2
+
+# errors worth another try; a NAK (INVALID_PAGE_ERROR) is the tag refusing
+TRANSIENT_ERRORS = (nfc.tag.TIMEOUT_ERROR, nfc.tag.RECEIVE_ERROR,
+                    nfc.tag.PROTOCOL_ERROR, nfc.tag.tt2.INVALID_RESPONSE_ERROR)
+
+def format_stats(stats):
+    """ Returns: 'retries 3, recovered 2, ...' for a retry stats Counter """
+    return ', '.join('{0} {1}'.format(k, stats[k]) for k in
+                     ('retries', 'recovered', 'shrunk', 'exhausted', 'over_budget', 'permanent')
+                     if stats[k])
+
+class retry_policy(object):
+    def __init__(self, retries=2, budget=32, backoff=0.005, factor=2.0,
+                 max_backoff=0.1, min_chunk=4):
+        """
+        How hard an nfc_parser tries again after a transient RF failure.
+
+        Each page (get_page, write_page, commit_image) or chunk (read_pages)
+        gets up to retries more tries, waiting backoff * factor**n seconds
+        (at most max_backoff) before the nth.  A failed FAST_READ chunk is
+        also halved, down to min_chunk pages, before it is retried.  Every
+        tag session (one nfc_parser) may spend at most budget retries in
+        all, so a tag that is really gone fails in bounded time.
+
+        Parameters:
+        retries (int): extra tries per page or chunk
+        budget (int): retries per tag session; None for no limit
+        backoff (float): seconds before the first retry
+        factor (float): backoff multiplier per further retry
+        max_backoff (float): longest wait between tries
+        min_chunk (int): smallest FAST_READ chunk, in pages
+
+        Returns: Nothing
+        """
+        self.retries = retries
+        self.budget = budget
+        self.backoff = backoff
+        self.factor = factor
+        self.max_backoff = max_backoff
+        self.min_chunk = min_chunk
+
+        self.stats = Counter() # across every session
+        self._lock = threading.Lock()
+
+    def delay(self, retry):
+        """ Seconds to wait before retry number retry (0-based) """
+        return min(self.max_backoff, self.backoff * self.factor ** retry)
+
+    @staticmethod
+    def transient(ex):
+        return getattr(ex, 'errno', None) in TRANSIENT_ERRORS
+
+    def session(self):
+        """ Returns: retry_budget for one tag, e.g., an nfc_parser """
+        return retry_budget(self)
+
+    def count(self, stat, n=1):
+        with self._lock:
+            self.stats[stat] += n
+
+class retry_budget(object):
+    def __init__(self, policy):
+        """
+        The retries one tag session may still spend under policy, and
+        what it spent them on.  stats counts:
+            retries: tries after the first
+            recovered: pages/chunks that succeeded after a retry
+            exhausted: failures that used up their per-page retries
+            over_budget: failures left unretried as the budget ran out
+            permanent: failures not worth retrying (e.g., NAK)
+            shrunk: FAST_READ chunks halved after a failure
+        """
+        self.policy = policy
+        self.remaining = policy.budget
+        self.stats = Counter()
+
+    def count(self, stat):
+        self.stats[stat] += 1
+        self.policy.count(stat)
+
+    def allow(self, ex, retry):
+        """
+        Decides whether to try again after ex, the failure of try number
+        retry (0-based) of one page or chunk, and spends the retry.
+
+        Returns: bool
+        """
+        if not self.policy.transient(ex):
+            self.count('permanent')
+            return False
+        elif retry >= self.policy.retries:
+            self.count('exhausted')
+            return False
+        elif self.remaining is not None and self.remaining <= 0:
+            self.count('over_budget')
+            return False
+
+        if self.remaining is not None:
+            self.remaining -= 1
+        self.count('retries')
+        return True
+
+    def call(self, func, *args):
+        """
+        Returns: func(*args), tried again with backoff while policy allows
+
+        Raises: the last nfc.tag.TagCommandError if it never succeeds
+        """
+        retry = 0
+        while True:
+            try:
+                result = func(*args)
+            except nfc.tag.TagCommandError as ex:
+                if not self.allow(ex, retry):
+                    raise
+                time.sleep(self.policy.delay(retry))
+                retry += 1
+            else:
+                if retry:
+                    self.count('recovered')
+                return result
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import time
+import random
+from collections import namedtuple, Counter
+
+import nfc
+import nfc.clf
+
+Sim_Model = namedtuple('sim_model', 'product pages version signature fast_read auth')
+SIM_MODELS = {
+    'NTAG210': Sim_Model('NXP NTAG210', 20, bytes.fromhex('0004040101000b03'), True, True, False),
+    'NTAG212': Sim_Model('NXP NTAG212', 41, bytes.fromhex('0004040101000e03'), True, True, False),
+    'NTAG213': Sim_Model('NXP NTAG213', 45, bytes.fromhex('0004040201000f03'), True, True, False),
+    'NTAG215': Sim_Model('NXP NTAG215', 135, bytes.fromhex('0004040201001103'), True, True, False),
+    'NTAG216': Sim_Model('NXP NTAG216', 231, bytes.fromhex('0004040201001303'), True, True, False),
+    'MF0UL11': Sim_Model('Mifare Ultralight EV1 (MF0UL11)', 20,
+                         bytes.fromhex('0004030101000b03'), True, True, False),
+    'MF0UL21': Sim_Model('Mifare Ultralight EV1 (MF0UL21)', 41,
+                         bytes.fromhex('0004030101000e03'), True, True, False),
+    'Ultralight': Sim_Model('Mifare Ultralight (MF01CU1)', 16, None, False, False, False),
+    'Ultralight C': Sim_Model('Mifare Ultralight C (MF01CU2)', 48, None, False, False, True),
+    'Type2Tag': Sim_Model('Type2Tag', 0, None, False, False, False),
+}
+
+OPCODES = {0x30: 'READ', 0x3a: 'FAST_READ', 0xa2: 'WRITE',
+           0x60: 'GET_VERSION', 0x3c: 'READ_SIG', 0x1a: 'AUTHENTICATE'}
+
+ACK = bytearray([0x0a])
+NAK = bytearray([0x00])
+
+class sim_tag(object):
+    def __init__(self, model='NTAG215', uid=None, image=None):
+        """
+        A simulated Type 2 tag holding a linear memory image.
+
+        Parameters:
+        model (str): key of SIM_MODELS, e.g., 'NTAG215' or 'Type2Tag'
+        uid (bytes): 7-byte uid (4 bytes for uid-only cards); random if None
+        image (bytes): initial memory contents; zero-filled if None
+
+        Returns: Nothing
+        """
+        self.model = SIM_MODELS[model]
+        self.name = model
+
+        if uid is None:
+            if model == 'Type2Tag':
+                uid = bytes([0x08] + [random.getrandbits(8) for i in range(3)])
+            else:
+                uid = bytes([0x04] + [random.getrandbits(8) for i in range(6)])
+        self.uid = bytes(uid)
+
+        self.memory = bytearray(self.model.pages * 4)
+        if image is not None:
+            self.memory[:] = bytes(image)[0:len(self.memory)].ljust(len(self.memory), b'\x00')
+        if self.model.pages:
+            bcc0 = 0x88 ^ self.uid[0] ^ self.uid[1] ^ self.uid[2]
+            bcc1 = self.uid[3] ^ self.uid[4] ^ self.uid[5] ^ self.uid[6]
+            self.memory[0:9] = self.uid[0:3] + bytes([bcc0]) + self.uid[3:7] + bytes([bcc1])
+
+        self.signature = bytes(random.getrandbits(8) for i in range(32)) \
+                         if self.model.signature else None
+
+    def read(self, page):
+        """ READ: 16 bytes from page, rolling over at the end of memory """
+        if page >= self.model.pages:
+            return None
+        size = len(self.memory)
+        return bytearray(self.memory[(page * 4 + i) % size] for i in range(16))
+
+    def fast_read(self, start, end):
+        """ FAST_READ: all pages from start to end, inclusive """
+        if start > end or end >= self.model.pages:
+            return None
+        return bytearray(self.memory[start * 4:(end + 1) * 4])
+
+    def write(self, page, data):
+        """ WRITE: pages 0-1 are read-only, lock and otp bits are one-way """
+        if page < 2 or page >= self.model.pages or len(data) != 4:
+            return False
+        if page == 2:
+            self.memory[10] |= data[2]
+            self.memory[11] |= data[3]
+        elif page == 3:
+            for i in range(4):
+                self.memory[12 + i] |= data[i]
+        else:
+            self.memory[page * 4:page * 4 + 4] = data
+        return True
+
+class sim_frontend(object):
+    def __init__(self, tag=None, latency=0.0, error_rate=0.0, max_frame=252, seed=None):
+        """
+        A hardware-free stand-in for nfc.ContactlessFrontend.
+        Implements sense/exchange/close closely enough that nfc.tag.activate
+        and nfc_parser operate against it exactly as against a usb reader.
+
+        Parameters:
+        tag (sim_tag): tag initially present on the reader, or None
+        latency (float): seconds added to every command exchange
+        error_rate (float): probability [0-1] of any exchange timing out
+        max_frame (int): reported max_recv_data_size / max_send_data_size
+        seed (int): seed for the error injection rng
+
+        Returns: Nothing
+        """
+        self.tag = tag
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_frame = max_frame
+        self.rng = random.Random(seed)
+
+        self.fail_pages = {}   # page -> number of failures to inject
+        self.remove_after = None   # commands until the tag is pulled
+        self.commands = Counter()
+        self.target = None
+        self._muted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.target = None
+
+    def present(self, tag):
+        """ Places a tag on the reader, replacing any present tag """
+        self.tag = tag
+        self.target = None
+
+    def remove(self):
+        """ Pulls the current tag off the reader """
+        self.tag = None
+        self.target = None
+
+    @property
+    def max_send_data_size(self):
+        return self.max_frame
+
+    @property
+    def max_recv_data_size(self):
+        return self.max_frame
+
+    def sense(self, *targets, **options):
+        self.commands['SENSE'] += 1
+        if self.tag is None or not any(t.brty.endswith('A') for t in targets):
+            self.target = None
+            return None
+
+        self._muted = False
+        self.target = nfc.clf.RemoteTarget('106A',
+                                           sens_res=bytearray(b'\x44\x00'),
+                                           sel_res=bytearray(b'\x00'),
+                                           sdd_res=bytearray(self.tag.uid))
+        return self.target
+
+    def exchange(self, send_data, timeout):
+        send_data = bytearray(send_data)
+        opcode = OPCODES.get(send_data[0], '0x{:02X}'.format(send_data[0]))
+        self.commands[opcode] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.remove_after is not None:
+            if self.remove_after <= 0:
+                self.remove()
+            else:
+                self.remove_after -= 1
+
+        if self.tag is None or self._muted:
+            raise nfc.clf.TimeoutError
+
+        page = send_data[1] if len(send_data) > 1 else None
+        if self.fail_pages.get(page) and opcode in ('READ', 'WRITE', 'FAST_READ'):
+            self.fail_pages[page] -= 1
+            raise nfc.clf.TimeoutError
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise nfc.clf.TimeoutError
+
+        return self._respond(opcode, send_data)
+
+    def _respond(self, opcode, data):
+        """ Dispatches a Type 2 command to the simulated tag """
+        tag = self.tag
+        rsp = None
+
+        if opcode == 'READ':
+            rsp = tag.read(data[1]) or NAK
+        elif opcode == 'WRITE':
+            rsp = ACK if tag.write(data[1], bytes(data[2:6])) else NAK
+        elif opcode == 'FAST_READ' and tag.model.fast_read:
+            rsp = tag.fast_read(data[1], data[2]) or NAK
+        elif opcode == 'GET_VERSION' and tag.model.version:
+            rsp = bytearray(tag.model.version)
+        elif opcode == 'READ_SIG' and tag.model.signature:
+            rsp = bytearray(tag.signature)
+        elif opcode == 'AUTHENTICATE' and tag.model.auth:
+            rsp = bytearray([0xaf]) + bytearray(8) # ek(RndB), first step of 3DES auth
+
+        if rsp is None:
+            # unsupported commands mute a type 2 tag until the next sense
+            self._muted = True
+            raise nfc.clf.TimeoutError
+        return rsp
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+from collections import namedtuple
+
+import nfc.tag.tt2_nxp
+
+Profile_Def = namedtuple('profile_definition',
+                         'name cc pages user_start user_stop dynamic_lock config pwd pack '
+                         'fast_read oem')
+
+def _ntag(name, cc, pages, oem=None):
+    """ NTAG21x/Ultralight EV1 layout: [dynamic lock], 2 config pages, PWD, PACK at the end """
+    pack = pages - 1
+    config = (pages - 4, pages - 3)
+    dynamic_lock = pages - 5 if pages > 20 else None
+    return Profile_Def(name, cc, pages, 4, dynamic_lock or config[0], dynamic_lock,
+                       config, pack - 1, pack, True, oem)
+
+# https://www.nxp.com/docs/en/data-sheet/NTAG213_215_216.pdf, NTAG210_212.pdf,
+# MF0ULX1.pdf (Ultralight EV1), MF0ICU1.pdf and MF0ICU2.pdf (Ultralight C)
+PROFILES = {
+    'NTAG210': _ntag('NTAG210', 0x06, 20,
+                     [('03h', bytes([0xe1, 0x10, 0x06, 0x00])),
+                      ('04h', bytes([0x03, 0x00, 0xfe, 0x00])),
+                      ('05h', bytes([0x00, 0x00, 0x00, 0x00]))]),
+    'NTAG212': _ntag('NTAG212', 0x10, 41,
+                     [('03h', bytes([0xe1, 0x10, 0x10, 0x00])),
+                      ('04h', bytes([0x01, 0x03, 0x90, 0x0a])),
+                      ('05h', bytes([0x34, 0x03, 0x00, 0xfe]))]),
+    'NTAG213': _ntag('NTAG213', 0x12, 45,
+                     [('03h', bytes([0xe1, 0x10, 0x12, 0x00])),
+                      ('04h', bytes([0x01, 0x03, 0xa0, 0x0c])),
+                      ('05h', bytes([0x34, 0x03, 0x00, 0xfe]))]),
+    'NTAG215': _ntag('NTAG215', 0x3e, 135,
+                     [('03h', bytes([0xe1, 0x10, 0x3e, 0x00])),
+                      ('04h', bytes([0x03, 0x00, 0xfe, 0x00])),
+                      ('05h', bytes([0x00, 0x00, 0x00, 0x00]))]),
+    'NTAG216': _ntag('NTAG216', 0x6d, 231,
+                     [('03h', bytes([0xe1, 0x10, 0x6d, 0x00])),
+                      ('04h', bytes([0x03, 0x00, 0xfe, 0x00])),
+                      ('05h', bytes([0x00, 0x00, 0x00, 0x00]))]),
+    'MF0UL11': _ntag('MF0UL11', 0x06, 20),
+    'MF0UL21': _ntag('MF0UL21', 0x10, 41),
+    'Ultralight': Profile_Def('Ultralight', 0x06, 16, 4, 16, None, (), None, None, False, None),
+    'Ultralight C': Profile_Def('Ultralight C', 0x12, 48, 4, 40, 40, (42, 43), None, None,
+                                False, None),
+    'NTAG203': Profile_Def('NTAG203', 0x12, 42, 4, 40, 40, (), None, None, False, None),
+    'Type2Tag': Profile_Def('Type2Tag', 0x00, 0, 0, 0, None, (), None, None, False, None),
+}
+
+CLASS_PROFILES = { # nfcpy tag class (picked by GET_VERSION, or AUTHENTICATE) -> profile
+    'NTAG210': 'NTAG210', 'NTAG212': 'NTAG212', 'NTAG213': 'NTAG213',
+    'NTAG215': 'NTAG215', 'NTAG216': 'NTAG216', 'NTAG203': 'NTAG203',
+    'MF0UL11': 'MF0UL11', 'MF0ULH11': 'MF0UL11',
+    'MF0UL21': 'MF0UL21', 'MF0ULH21': 'MF0UL21',
+    'MifareUltralight': 'Ultralight', 'MifareUltralightC': 'Ultralight C',
+}
+
+def from_version(version):
+    """
+    Parameters:
+    version (bytes): the 8-byte GET_VERSION (60h) response
+
+    Returns: Profile_Def, or None if the version is unknown
+    """
+    cls = nfc.tag.tt2_nxp.VERSION_MAP.get(bytes(version))
+    return PROFILES.get(CLASS_PROFILES.get(cls.__name__)) if cls is not None else None
+
+def from_product(product):
+    """ Returns: Profile_Def by product name, e.g., 'NXP NTAG215'; None if unknown """
+    product = product.lower()
+    for name in ('NTAG210', 'NTAG212', 'NTAG213', 'NTAG215', 'NTAG216', 'NTAG203'):
+        if name.lower() in product:
+            return PROFILES[name]
+    if 'ul11' in product or 'ulh11' in product:
+        return PROFILES['MF0UL11']
+    elif 'ul21' in product or 'ulh21' in product:
+        return PROFILES['MF0UL21']
+    elif 'ultralight c' in product:
+        return PROFILES['Ultralight C']
+    elif 'ultralight' in product:
+        return PROFILES['Ultralight']
+    return None
+
+def resolve(tag):
+    """
+    The profile of an activated nfcpy tag.  nfc.tag.activate already
+    identified it by GET_VERSION (AUTHENTICATE for Ultralight C) when
+    choosing the tag's class, so this costs no further exchanges; the
+    product string is only a fallback for classes not listed above.
+
+    Returns: Profile_Def; PROFILES['Type2Tag'] for uid-only/unknown tags
+    """
+    name = CLASS_PROFILES.get(type(tag).__name__)
+    if name is not None:
+        return PROFILES[name]
+    return from_product(tag.product) or PROFILES['Type2Tag']
+
+def from_pages(num_pages):
+    """
+    Returns: a Profile_Def laid out like an image of num_pages pages, for
+             dumps read back without their tag; None if no size matches
+    """
+    for profile in PROFILES.values():
+        if profile.pages == num_pages:
+            return profile
+    return None
+
+def page_roles(profile):
+    """
+    Names the special pages of a profile: uid, static lock and the
+    capability container on every tag, then its dynamic lock, config,
+    PWD and PACK pages where it has them.
+
+    Returns: {page: role}
+    """
+    roles = {0: 'uid', 1: 'uid', 2: 'lock', 3: 'cc'} if profile.pages else {}
+    if profile.dynamic_lock is not None:
+        roles[profile.dynamic_lock] = 'dynamic lock'
+    roles.update((p, 'config') for p in profile.config)
+    if profile.pwd is not None:
+        roles[profile.pwd] = 'pwd'
+        roles[profile.pack] = 'pack'
+    return roles
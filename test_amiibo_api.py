@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import json
+import time
+import tempfile
+import threading
+import unittest
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from amiibo_api import amiibo_api
+
+KNOWN = {
+    '01830001': {'amiiboSeries': 'Animal Crossing', 'character': 'Tom Nook', 'name': 'Tom Nook'},
+    '021b0001': {'amiiboSeries': 'Animal Crossing', 'character': 'Tutu', 'name': 'Tutu'},
+}
+for i in range(64):
+    KNOWN['0a{0:02x}0001'.format(i)] = {'amiiboSeries': 'Test', 'character': str(i), 'name': str(i)}
+
+class stand_in(BaseHTTPRequestHandler):
+    """ Answers like amiiboapi.com, from KNOWN, with a little latency """
+    protocol_version = 'HTTP/1.1' # keep-alive, so reuse is observable
+    disable_nagle_algorithm = True
+    latency = 0.005
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.latency)
+        head = parse_qs(urlparse(self.path).query)['head'][0]
+        if head in KNOWN:
+            status, body = 200, {'amiibo': [KNOWN[head]]}
+        else:
+            status, body = 404, {'code': 404, 'error': 'Not Found'}
+
+        body = json.dumps(body).encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestAmiiboApi(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), stand_in)
+        self.server.connections = 0
+        self.server.requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.url = 'http://127.0.0.1:{0}/api/amiibo/'.format(self.server.server_port)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.api = amiibo_api(self.url, cache_dir=self.tmpdir.name)
+
+    def tearDown(self):
+        self.api.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_lookup(self):
+        self.assertEqual(self.api.lookup('01830001')['character'], 'Tom Nook')
+        self.assertEqual(self.api.lookup('021B0001')['character'], 'Tutu')
+        self.assertEqual(self.api.lookup('01830001')['character'], 'Tom Nook')
+
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.api.stats['hits'], 1)
+
+    def test_negative_cache(self):
+        self.assertIsNone(self.api.lookup('ffffffff'))
+        self.assertIsNone(self.api.lookup('ffffffff'))
+        self.assertEqual(self.server.requests, 1)
+
+        self.api.negative_ttl = 0
+        self.assertIsNone(self.api.lookup('ffffffff'))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_disk_cache(self):
+        self.api.lookup('01830001')
+        reopened = amiibo_api(self.url, cache_dir=self.tmpdir.name)
+        self.assertEqual(reopened.lookup('01830001')['character'], 'Tom Nook')
+        self.assertEqual(self.server.requests, 1)
+
+        reopened.ttl = 0
+        reopened.lookup('01830001')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_lookup_many(self):
+        heads = sorted(KNOWN) + ['ffffffff', '01830001']
+        results = self.api.lookup_many(heads)
+
+        self.assertEqual(len(results), len(KNOWN) + 1)
+        self.assertIsNone(results['ffffffff'])
+        self.assertEqual(self.server.requests, len(KNOWN) + 1)
+        self.assertLessEqual(self.server.connections, self.api.max_in_flight)
+
+    def test_handle_reuse(self):
+        heads = sorted(KNOWN)
+
+        for head in heads[0:8]:
+            single = amiibo_api(self.url, cache_dir=None) # a handle per lookup, as before
+            single.lookup(head)
+            self.assertEqual(single.stats['handles'], 1)
+            single.close()
+
+        self.api.lookup_many(heads) # cold: pooled handles, one request per head
+        self.assertLessEqual(self.api.stats['handles'], self.api.max_in_flight)
+        self.assertEqual(self.api.stats['requests'], len(heads))
+
+        self.api.lookup_many(heads) # warm: no requests at all
+        self.assertEqual(self.api.stats['requests'], len(heads))
+        self.assertEqual(self.api.stats['hits'], len(heads))
+        self.assertEqual(self.server.requests, 8 + len(heads))
+
+    def test_bad_heads(self):
+        for head in ('../../etc/passwd', '0183000', '018300010', '0183000g', ''):
+            self.assertRaises(ValueError, self.api.lookup, head)
+            self.assertRaises(ValueError, self.api.lookup_many, [head])
+        self.assertEqual(self.server.requests, 0)
+
+    def test_bench_api(self):
+        from benchmark import bench_api
+        results = bench_api(latency=0, min_time=0.01)
+        self.assertEqual(list(results), ['handle/lookup', 'cold', 'warm'])
+        self.assertTrue(all(rate > 0 for rate in results.values()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import tempfile
+import unittest
+import amiibo_batch
+from unittest import mock
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from amiibo_batch import read_manifest, prepare_batch, _init_worker, _prepare
+from easy_nfc import nfc_parser
+from image_cache import image_cache
+
+KEYS = (b'\x01' * 80, b'\x02' * 80)
+
+def fake_prepare_image(master_keys, orig, uid):
+    """ Stands in for write_amiibo.prepare_image: no real keys needed """
+    return nfc_parser.spaced_hex(uid).encode('ascii') + orig
+
+class TestAmiiboBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.keys = []
+        for name, data in zip(('data.bin', 'tag.bin'), KEYS):
+            self.keys.append(self.write(name, data))
+        for name in ('a', 'b'):
+            self.write(name + '.bin', name.encode('ascii') * 8)
+
+        # workers run as threads of this process, so the patches reach them
+        # whatever the multiprocessing start method
+        patches = [mock.patch('amiibo_batch.prepare_image', fake_prepare_image),
+                   mock.patch('amiibo_batch.AmiiboMasterKey'),
+                   mock.patch('amiibo_batch.ProcessPoolExecutor', ThreadPoolExecutor),
+                   mock.patch('amiibo_batch._master_keys', None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb' if isinstance(data, bytes) else 'w') as fh:
+            fh.write(data)
+        return path
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_read_manifest(self):
+        manifest = self.write('manifest.txt', '# source,uid\n\n'
+                              'a.bin, 04 1F 06 D2 5C 64 85\n'
+                              'dir,with,commas/b.bin,04:1f:06:d2:5c:64:86\n')
+        self.assertEqual(read_manifest(manifest), [('a.bin', '041f06d25c6485'),
+                                                   ('dir,with,commas/b.bin', '041f06d25c6486')])
+
+        for bad in ('a.bin\n', 'a.bin,041f06d25c648\n', 'a.bin,041f06d25c64zz\n'):
+            manifest = self.write('manifest.txt', '# header\n' + bad)
+            with self.assertRaisesRegex(ValueError, 'manifest.txt:2'):
+                read_manifest(manifest)
+
+    def test_prepare_worker(self):
+        _init_worker(*KEYS)
+        with mock.patch('amiibo_batch.prepare_image', wraps=fake_prepare_image) as prepare:
+            self.assertEqual(_prepare(self.path('a.bin'), '041f06d25c6485'),
+                             (b'04 1f 06 d2 5c 64 85' + b'a' * 8, None))
+        self.assertIs(prepare.call_args[0][0], amiibo_batch._master_keys)
+        amiibo_batch.AmiiboMasterKey.from_separate_bin.assert_called_once_with(*KEYS)
+
+        # given bytes are used as-is; source isn't opened
+        self.assertEqual(_prepare(self.path('missing.bin'), '041f06d25c6485', b'c' * 8),
+                         (b'04 1f 06 d2 5c 64 85' + b'c' * 8, None))
+
+        image, error = _prepare(self.path('missing.bin'), '041f06d25c6485')
+        self.assertIsNone(image)
+        self.assertIsInstance(error, OSError)
+
+        image, error = _prepare(self.path('a.bin'), '041f06d25c648') # odd length
+        self.assertIsNone(image)
+        self.assertIsInstance(error, RuntimeError)
+
+    def test_prepare_batch(self):
+        manifest = [(self.path('a.bin'), '041f06d25c6485'),
+                    (self.path('missing.bin'), '041f06d25c6485'),
+                    (self.path('b.bin'), '041f06d25c648'), # odd length: spaced_hex raises
+                    (self.path('b.bin'), '041f06d25c6486')]
+        results = list(prepare_batch(manifest, *self.keys, processes=2))
+
+        self.assertEqual([(r.name, r.uid) for r in results], manifest)
+        self.assertEqual(results[0].image, b'04 1f 06 d2 5c 64 85' + b'a' * 8)
+        self.assertIsInstance(results[1].error, OSError)
+        self.assertIsInstance(results[2].error, RuntimeError)
+        self.assertIsNone(results[2].image)
+        self.assertEqual(results[3].image, b'04 1f 06 d2 5c 64 86' + b'b' * 8)
+
+    def test_prepare_batch_cache(self):
+        cache = image_cache(KEYS, directory=self.path('cache'))
+        manifest = [(self.path('a.bin'), '041f06d25c6485'),
+                    (self.path('b.bin'), '041f06d25c6486')]
+        cache.put(b'b' * 8, '041f06d25c6486', b'cached')
+
+        reads = Counter()
+        def counting_open(path, *args, **kwargs):
+            reads[os.path.basename(path)] += 1
+            return open(path, *args, **kwargs)
+
+        with mock.patch('amiibo_batch.open', counting_open, create=True):
+            results = list(prepare_batch(manifest, *self.keys, processes=1, cache=cache))
+
+        # the hit comes first; the miss is read once, by the parent, not the worker
+        self.assertEqual([r.image for r in results],
+                         [b'cached', b'04 1f 06 d2 5c 64 85' + b'a' * 8])
+        self.assertEqual(reads['a.bin'], 1)
+        self.assertEqual(reads['b.bin'], 1)
+        self.assertEqual(cache.get(b'a' * 8, '041f06d25c6485'), results[1].image)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import tempfile
+import unittest
+from amiibo_db import amiibo_db
+from benchmark import legacy_check_db
+
+SAMPLE_DB = {
+    'amiibo_series': {
+        '0x00': 'Super Smash Bros.',
+        '0x01': 'Super Mario Bros.',
+        '0x05': 'Animal Crossing',
+    },
+    'amiibos': {
+        '0x0000000000000002': {'name': 'Mario'},
+        '0x00000000003c0102': {'name': 'Mario - Gold Edition'},
+        '0x0183000102420502': {'name': 'Tom Nook'},
+        '0x021b000103a50502': {'name': 'Tutu'},
+    },
+}
+
+class TestAmiiboDB(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'amiibo.json')
+        with open(self.path, 'w') as fh:
+            json.dump(SAMPLE_DB, fh)
+
+    def tearDown(self):
+        amiibo_db.forget()
+        self.tmpdir.cleanup()
+
+    def test_shared(self):
+        db = amiibo_db.shared(self.path)
+        self.assertIs(db, amiibo_db.shared(self.path))
+        self.assertEqual(len(db), 4)
+
+        amiibo_db.forget(self.path)
+        self.assertIsNot(db, amiibo_db.shared(self.path))
+
+    def test_lookup_guid(self):
+        db = amiibo_db.shared(self.path)
+        json_obj = db.lookup('0x00000000003c0102')
+        self.assertEqual(json_obj['gameSeries'], 'Super Mario Bros.')
+        self.assertEqual(json_obj['name'], 'Mario - Gold Edition')
+        self.assertEqual(json_obj['head'], '00000000')
+
+    def test_lookup_head(self):
+        db = amiibo_db.shared(self.path)
+        json_obj = db.lookup('021B0001', 0x05)
+        self.assertEqual(json_obj['gameSeries'], 'Animal Crossing')
+        self.assertEqual(json_obj['name'], 'Tutu')
+        self.assertEqual(json_obj['head'], '021B0001')
+
+        # first guid in db order wins, as the old linear scan did
+        json_obj = db.lookup('00000000', 0x01)
+        self.assertEqual(json_obj['name'], 'Mario')
+
+    def test_compiled(self):
+        db = amiibo_db.load(self.path)
+        self.assertTrue(os.path.exists(self.path + '.cache'))
+        self.assertEqual(db.lookup('0x00000000003c0102')['name'], 'Mario - Gold Edition')
+
+        # touched but unchanged: same content hash, restamped
+        os.utime(self.path, ns=(0, 0))
+        db = amiibo_db.load(self.path)
+        self.assertEqual(db.source.mtime_ns, 0)
+        self.assertFalse(db.changed)
+
+        SAMPLE_DB['amiibos']['0x00000000003c0102']['name'] = 'Gold Mario'
+        with open(self.path, 'w') as fh:
+            json.dump(SAMPLE_DB, fh)
+        SAMPLE_DB['amiibos']['0x00000000003c0102']['name'] = 'Mario - Gold Edition'
+
+        self.assertTrue(db.changed)
+        db = amiibo_db.load(self.path)
+        self.assertEqual(db.lookup('0x00000000003c0102')['name'], 'Gold Mario')
+
+    def test_reload(self):
+        db = amiibo_db.shared(self.path)
+        self.assertIs(amiibo_db.reload(self.path), db)
+
+        with open(self.path, 'w') as fh:
+            json.dump(dict(SAMPLE_DB, amiibos={}), fh)
+        os.utime(self.path, ns=(1, 1))
+
+        self.assertIsNot(amiibo_db.reload(self.path), db)
+        self.assertEqual(len(amiibo_db.shared(self.path)), 0)
+
+    def test_shared_reloads(self):
+        db = amiibo_db.shared(self.path)
+        with open(self.path, 'w') as fh:
+            json.dump(dict(SAMPLE_DB, amiibos={}), fh)
+        os.utime(self.path, ns=(1, 1))
+        self.assertEqual(len(amiibo_db.shared(self.path)), 0)
+
+        os.unlink(self.path) # json gone: keep what was loaded
+        self.assertEqual(len(amiibo_db.shared(self.path)), 0)
+
+    def test_unwritable_cache(self):
+        compiled = os.path.join(self.tmpdir.name, 'missing', 'amiibo.json.cache')
+        db = amiibo_db.load(self.path, compiled)
+        self.assertFalse(os.path.exists(compiled))
+        self.assertEqual(db.lookup('0x0183000102420502')['name'], 'Tom Nook')
+        self.assertFalse(db.save(compiled))
+
+    def test_parity(self):
+        db = amiibo_db.shared(self.path)
+        cases = [
+            ('01830001', 0x05), ('021b0001', 0x05), ('00000000', 0x01),
+            ('00000000', 0xFF), ('ffffffff', 0x00), ('00000000', None),
+            ('0x00000000003c0102', None), (None, None), (None, 0x00),
+        ]
+        for amiibo_id, series in cases:
+            self.assertEqual(db.lookup(amiibo_id, series),
+                             legacy_check_db(amiibo_id, series, path=self.path))
+
+    def test_search(self):
+        db = amiibo_db.shared(self.path)
+        found = db.search('tom n')
+        self.assertEqual(found.total, 1)
+        self.assertEqual(found.matches[0].guid, '0x0183000102420502')
+        self.assertEqual(found.matches[0].series, 'Animal Crossing')
+
+        # whole-word and shorter names first
+        self.assertEqual([m.name for m in db.search('MARIO').matches],
+                         ['Mario', 'Mario - Gold Edition'])
+        # series words match too, but below names
+        self.assertEqual([m.name for m in db.search('animal cr').matches], ['Tutu', 'Tom Nook'])
+        self.assertEqual([m.name for m in db.search('mar').matches][0], 'Mario')
+        self.assertEqual(db.search('tom mario').total, 0)
+        self.assertEqual(db.search('').total, 0)
+
+    def test_search_fuzzy(self):
+        db = amiibo_db.shared(self.path)
+        self.assertEqual(db.search('mraio').matches[0].name, 'Mario')
+        self.assertEqual(db.search('tom nok').matches[0].name, 'Tom Nook')
+        self.assertEqual(db.search('mraio', fuzzy=False).total, 0)
+        self.assertLess(db.search('mraio').matches[0].score, db.search('mario').matches[0].score)
+
+    def test_search_pages(self):
+        db = amiibo_db.shared(self.path)
+        everything = [m.guid for m in db.search('s', limit=100).matches] # super, smash, ...
+        self.assertEqual(len(everything), 2)
+        pages = [db.search('s', limit=1, offset=o) for o in (0, 1, 2)]
+        self.assertEqual([p.total for p in pages], [2, 2, 2])
+        self.assertEqual(pages[2].matches, [])
+        self.assertEqual([m.guid for p in pages for m in p.matches], everything)
+
+    def test_search_compiled(self):
+        amiibo_db.compile(self.path)
+        self.assertEqual(amiibo_db.load(self.path).search('tutu').matches[0].name, 'Tutu')
+
+if __name__ == '__main__':
+    unittest.main()
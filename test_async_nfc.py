@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+import unittest
+from amiibo_db import amiibo_db
+from async_nfc import async_reader, check_db
+from sim_tag import sim_tag, sim_frontend
+from test_amiibo_db import SAMPLE_DB
+from write_amiibo import lock_data
+
+class TestAsyncNfc(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        with open('amiibo.json', 'w') as fh:
+            json.dump(SAMPLE_DB, fh)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        amiibo_db.forget()
+        self.tmpdir.cleanup()
+
+    def test_check_db(self):
+        json_obj = asyncio.run(check_db('0x0183000102420502'))
+        self.assertEqual(json_obj['name'], 'Tom Nook')
+
+    def test_reader_io_off_loop(self):
+        async def scenario():
+            reader = await async_reader(clf=sim_frontend()).open()
+            busy = reader._run(time.sleep, 0.3) # e.g., a commit_image
+
+            start = time.perf_counter()
+            ticks = 0
+            while time.perf_counter() - start < 0.1:
+                await asyncio.sleep(0.01)
+                ticks += 1
+            json_obj = await check_db('0x021b000103a50502')
+            looked_up = time.perf_counter() - start
+
+            self.assertFalse(busy.done())
+            await busy
+            await reader.close()
+            return ticks, json_obj, looked_up
+
+        ticks, json_obj, looked_up = asyncio.run(scenario())
+        self.assertGreater(ticks, 5)
+        self.assertEqual(json_obj['name'], 'Tutu')
+        self.assertLess(looked_up, 0.3)
+
+    def test_readers_independent(self):
+        async def scenario():
+            readers = [await async_reader(clf=sim_frontend()).open() for i in range(3)]
+            start = time.perf_counter()
+            await asyncio.gather(*[r._run(time.sleep, 0.2) for r in readers])
+            elapsed = time.perf_counter() - start
+            for r in readers:
+                await r.close()
+            return elapsed
+
+        self.assertLess(asyncio.run(scenario()), 0.4)
+
+    def test_tag_io(self):
+        clf = sim_frontend()
+        tag = sim_tag('NTAG215')
+        tag.memory[84:92] = bytes.fromhex('0183000102420502')
+
+        async def scenario():
+            async with async_reader(clf=clf, snapshot=False) as reader:
+                self.assertIsNone(await reader.sense())
+                asyncio.get_running_loop().call_later(0.05, clf.present, tag)
+                found = await reader.wait_for_tag(interval=0.01)
+                self.assertIsNone(await reader.sense()) # handed out once while present
+
+                self.assertEqual(found.uid, tag.uid.hex())
+                self.assertEqual((await found.check_db())['name'], 'Tom Nook')
+                self.assertIn('Character   : Tom Nook', await found.summary())
+                self.assertEqual(await found.read_image(), bytes(tag.memory))
+
+                image = bytes(tag.memory[0:16]) + bytes(range(256)) * 2 + bytes(12)
+                result = await found.commit_image(lock_data, image=image)
+                self.assertEqual((result.written, result.error), (133, None))
+
+                write = tag.write # page 10 ACKs writes but keeps its contents
+                tag.write = lambda page, data: page == 10 or write(page, data)
+                tag.memory[40] ^= 0xff
+                verified = await found.verify_image(image, lock_data, attempts=3)
+                self.assertEqual(verified, (131, 3, [10]))
+
+        asyncio.run(scenario())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from dump_archive import dump_archive
+
+UID = '041f06d25c6485'
+GUID = '0x0183000102420502'
+IMAGE = bytes(range(256)) * 2 + bytes(28)
+
+class TestDumpArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = dump_archive(self.tmpdir.name)
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmpdir.cleanup()
+
+    def objects(self):
+        return [f for _, _, files in os.walk(os.path.join(self.tmpdir.name, 'objects'))
+                for f in files]
+
+    def test_add_get(self):
+        digest = self.archive.add(IMAGE, UID, GUID, 'NTAG215')
+        self.assertEqual(self.archive.get(digest), IMAGE)
+        self.assertRaises(KeyError, self.archive.get, '0' * 64)
+
+        uncompressed = dump_archive(self.tmpdir.name, compress=False)
+        other = uncompressed.add(IMAGE[::-1], UID)
+        self.assertEqual(uncompressed.get(other), IMAGE[::-1])
+        self.assertEqual(self.archive.get(digest), IMAGE)
+        uncompressed.close()
+
+    def test_reread_adds_row_only(self):
+        for i in range(3):
+            self.archive.add(IMAGE, UID, GUID, 'NTAG215', read_at=1000 + i)
+
+        self.assertEqual(len(self.archive), 1)
+        self.assertEqual(len(self.objects()), 1)
+        self.assertEqual(len(self.archive.find(uid=UID)), 3)
+
+    def test_find(self):
+        self.archive.add(IMAGE, UID, GUID, 'NTAG215', read_at=1000)
+        self.archive.add(IMAGE[::-1], UID, None, 'NTAG215', read_at=2000)
+        self.archive.add(IMAGE, '04000000000000', GUID, 'NTAG213', read_at=3000)
+
+        self.assertEqual(len(self.archive.find()), 3)
+        self.assertEqual(len(self.archive.find(character_guid=GUID)), 2)
+        self.assertEqual(len(self.archive.find(tag_type='NTAG215')), 2)
+        self.assertEqual([r.read_at for r in self.archive.find(uid=UID, since=1500)], [2000])
+        self.assertEqual([r.uid for r in self.archive.find(until=2000)], [UID])
+
+    def test_export(self):
+        self.archive.add(IMAGE, UID, GUID, 'NTAG215', read_at=1000)
+        self.archive.add(IMAGE, UID, GUID, 'NTAG215', read_at=2000)
+        self.archive.add(IMAGE[::-1], UID, GUID, 'NTAG215', read_at=3000)
+
+        fh = io.BytesIO()
+        self.assertEqual(self.archive.export(fh, uid=UID), 2)
+
+        fh.seek(0)
+        with tarfile.open(fileobj=fh) as tar:
+            members = tar.getmembers()
+            self.assertEqual(len(members), 2)
+            self.assertEqual(tar.extractfile(members[0]).read(), IMAGE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import tempfile
+import unittest
+import dump_catalog
+from dump_catalog import dump_catalog as catalog_of, read_dump
+from amiibo_db import amiibo_db
+from test_amiibo_db import SAMPLE_DB
+
+UID = bytes.fromhex('04010203040506')
+
+def image(guid):
+    data = bytearray(540)
+    data[0:3], data[4:8] = UID[0:3], UID[3:7]
+    data[0x54:0x5c] = bytes.fromhex(guid[2:])
+    return bytes(data)
+
+class TestDumpCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmpdir.name, 'amiibo.json')
+        with open(self.db, 'w') as fh:
+            json.dump(SAMPLE_DB, fh)
+
+        self.dumps = os.path.join(self.tmpdir.name, 'dumps')
+        os.makedirs(os.path.join(self.dumps, 'ac'))
+        self.write('ac/nook.bin', '0x0183000102420502')
+        self.write('ac/tutu.bin', '0x021b000103a50502')
+        self.write('mario.bin', '0x0000000000000002')
+        self.write('unknown.bin', '0x0123456789abcdef')
+        self.catalog = catalog_of(os.path.join(self.tmpdir.name, 'catalog.sqlite3'))
+
+    def tearDown(self):
+        self.catalog.close()
+        amiibo_db.forget()
+        self.tmpdir.cleanup()
+
+    def write(self, name, guid):
+        with open(os.path.join(self.dumps, name), 'wb') as fh:
+            fh.write(image(guid))
+
+    def test_read_dump(self):
+        path = os.path.join(self.dumps, 'ac', 'nook.bin')
+        entry = read_dump(path, amiibo_db.load(self.db))
+        self.assertEqual(entry[4:], (UID.hex(), '0x0183000102420502', 'Tom Nook', 'Animal Crossing'))
+        self.assertEqual(read_dump(os.path.join(self.dumps, 'unknown.bin'),
+                                   amiibo_db.load(self.db))[6:], (None, None))
+
+    def test_update(self):
+        stats = self.catalog.update(self.dumps, self.db, processes=1)
+        self.assertEqual(stats['added'], 4)
+        self.assertEqual(len(self.catalog), 4)
+
+        self.assertEqual([e.name for e in self.catalog.find(series='Animal Crossing')],
+                         ['Tom Nook', 'Tutu'])
+        self.assertEqual(self.catalog.find(name='Mario')[0].path,
+                         os.path.join(os.path.abspath(self.dumps), 'mario.bin'))
+        self.assertEqual(len(self.catalog.find(character_guid='0x0183000102420502')), 1)
+        self.assertEqual(self.catalog.counts()[0], ('Animal Crossing', 2))
+
+    def test_incremental(self):
+        self.catalog.update(self.dumps, self.db, processes=1)
+        stats = self.catalog.update(self.dumps, self.db, processes=1)
+        self.assertEqual(stats['unchanged'], 4)
+        self.assertEqual(stats['added'] + stats['changed'], 0)
+
+        nook = os.path.join(self.dumps, 'ac', 'nook.bin')
+        os.utime(nook, ns=(0, 10 ** 9))
+        self.write('mario.bin', '0x00000000003c0102')
+        os.utime(os.path.join(self.dumps, 'mario.bin'), ns=(0, 2 * 10 ** 9))
+        os.remove(os.path.join(self.dumps, 'ac', 'tutu.bin'))
+
+        stats = self.catalog.update(self.dumps, self.db, processes=1)
+        self.assertEqual((stats['touched'], stats['changed'], stats['removed'], stats['unchanged']),
+                         (1, 1, 1, 1))
+        self.assertEqual(self.catalog.find(name='Mario%')[0].name, 'Mario - Gold Edition')
+
+    def test_pool(self):
+        inline = dump_catalog.INLINE_MAX
+        try:
+            dump_catalog.INLINE_MAX = 0
+            stats = self.catalog.update(self.dumps, self.db, processes=2)
+        finally:
+            dump_catalog.INLINE_MAX = inline
+        self.assertEqual(stats['added'], 4)
+        self.assertEqual(self.catalog.find(name='Tutu')[0].series, 'Animal Crossing')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import tempfile
+import unittest
+from dump_corpus import dump_corpus
+from easy_nfc import nfc_parser, OEM_BYTES
+from sim_tag import sim_tag, sim_frontend
+
+GUID = bytes.fromhex('0183000102420502')
+
+def image(uid, guid=GUID, locked=False):
+    """ An NTAG215 dump as nfc_parser.dump would write it """
+    tag = sim_tag('NTAG215', uid=uid)
+    for loc, d_bytes in OEM_BYTES['NTAG215']:
+        tag.memory[int(loc[:-1], 16) * 4:int(loc[:-1], 16) * 4 + 4] = d_bytes
+    if guid is not None:
+        tag.memory[0x54:0x5c] = guid
+    if locked:
+        tag.memory[10:12] = b'\x0f\xe0'
+    return bytes(tag.memory)
+
+class TestDumpCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        os.makedirs(os.path.join(self.dir, 'more'))
+
+        self.write('a.bin', image(bytes.fromhex('04010203040506')))
+        self.write('b.bin', image(bytes.fromhex('04010203040506'), locked=True))
+        self.write('more/c.bin', image(bytes.fromhex('04aabbccddeeff'), guid=None))
+        self.write('more/d.bin', image(bytes.fromhex('04aabbccddeeff'), guid=None))
+        self.write('short.bin', image(bytes.fromhex('04999999999999'))[0:532])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.dir, name), 'wb') as fh:
+            fh.write(data)
+
+    def test_fields(self):
+        corpus = dump_corpus(self.dir)
+        self.assertEqual(len(corpus), 5)
+        self.assertEqual(corpus.data.shape, (5, 540))
+        self.assertEqual(corpus.uids[0], '04010203040506')
+        self.assertEqual(corpus.character_guids[0], '0x0183000102420502')
+        self.assertTrue(corpus.bcc_ok.all())
+        self.assertEqual(corpus.static_lock[1].tobytes(), b'\x0f\xe0')
+        self.assertEqual(corpus.dynamic_lock.shape, (5, 3))
+        self.assertEqual(list(corpus.lengths), [540, 540, 540, 540, 532])
+
+    def test_matches_parser(self):
+        corpus = dump_corpus(self.dir)
+        with open(corpus.paths[0], 'rb') as fh:
+            tag = sim_tag('NTAG215', uid=bytes.fromhex('04010203040506'), image=fh.read())
+        ni = nfc_parser(clf=sim_frontend(tag), snapshot=True)
+        self.assertEqual(corpus.uids[0], ni.uid)
+        self.assertEqual(corpus.character_guids[0], ni.character_guid)
+        self.assertEqual(bool(corpus.blank[0]), ni.oem_bytes)
+
+    def test_conformance(self):
+        self.write('bad_cc.bin', image(bytes.fromhex('04121212121212'))[0:14] + b'\x00'
+                   + bytes(525))
+        corpus = dump_corpus(self.dir)
+        summary = corpus.summary()
+        self.assertEqual(summary['cc_mismatch'], 1)
+        self.assertEqual(summary['blank'], 5)
+        self.assertEqual(summary['static_locked'], 1)
+        self.assertEqual(summary['short'], 1)
+
+    def test_duplicates(self):
+        corpus = dump_corpus(self.dir)
+        self.assertEqual(sorted(map(sorted, corpus.duplicate_uids())),
+                         [sorted(corpus.paths[0:2]), sorted(corpus.paths[2:4])])
+        self.assertEqual(corpus.duplicate_images(), [corpus.paths[2:4]])
+
+    def test_cache(self):
+        cache = os.path.join(self.dir, 'corpus.npy')
+        built = dump_corpus(self.dir, cache=cache)
+        loaded = dump_corpus(self.dir, cache=cache)
+        self.assertEqual(loaded.data.tobytes(), built.data.tobytes())
+        self.assertEqual(list(loaded.lengths), list(built.lengths))
+
+        self.write('e.bin', image(bytes.fromhex('04eeeeeeeeeeee')))
+        self.assertEqual(len(dump_corpus(self.dir, cache=cache)), 6)
+
+    def test_empty(self):
+        corpus = dump_corpus(os.path.join(self.dir, 'nothing'))
+        self.assertEqual(corpus.summary()['dumps'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
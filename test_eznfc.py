@@ -6,8 +6,10 @@ __maintainer__ = "William Dizon"
 __email__ = "wdchromium@gmail.com"
 __status__ = "Development"
 
+import asyncio
 import unittest
-from easy_nfc import nfc_parser, TAG_SPECS, OEM_BYTES
+from easy_nfc import nfc_parser, reader_session, TAG_SPECS, OEM_BYTES
+from async_nfc import async_reader
 
 class TestNFCDump(unittest.TestCase):
     def setUp(self):
@@ -33,6 +35,17 @@ class TestNFCDump(unittest.TestCase):
             self.assertEqual(nfc_parser.spaced_hex(uid_start),
                              nfc_parser.spaced_hex(ni.uid))
 
+    def test_reader_session(self):
+        with reader_session() as session:
+            ni = session.poll()
+            self.assertIsNotNone(ni)
+            self.assertIs(ni.clf, session.clf)
+            self.assertTrue(ni.snapshot_mode)
+
+            # still on the reader: not handed out twice
+            self.assertIsNone(session.poll())
+            self.assertEqual(session.run(lambda ni: None, interval=0, limit=0), 0)
+
     def test_get_uid(self):
         ni = nfc_parser()
         if ni.uid_only:
@@ -90,8 +103,9 @@ class TestNFCDump(unittest.TestCase):
     def test_dynamic_lockpages(self):
         ni = nfc_parser()
 
-        if ni.tag.product == 'NXP NTAG215':
-            self.assertEqual(ni.dynamic_lockpages, ni.spaced_hex(ni.get_page(130)[0:3]))
+        if ni.profile.dynamic_lock is not None:
+            self.assertEqual(ni.dynamic_lockpages,
+                             ni.spaced_hex(ni.get_page(ni.profile.dynamic_lock)[0:3]))
         else:
             self.assertIsNone(ni.dynamic_lockpages)
 
@@ -112,6 +126,67 @@ class TestNFCDump(unittest.TestCase):
             raw = df.read()
         self.assertEqual(bytes(raw), ni.raw[0:TAG_SPECS[ni.tag_type].pages * 4])
 
+    def test_async_reader(self):
+        async def scenario():
+            async with async_reader() as reader:
+                tag = await reader.sense()
+                self.assertIsNotNone(tag)
+                image = await tag.read_image()
+                self.assertTrue((await tag.snapshot()).startswith(image))
+
+                result = await tag.commit_image(diff=True, dry_run=True, image=image)
+                self.assertEqual(result.written, 0)
+
+        asyncio.run(scenario())
+
+    def test_record(self):
+        ni = nfc_parser()
+        record = ni.record(pages=True)
+
+        self.assertEqual(record['uid'], ni.uid)
+        self.assertEqual(record['tag_type'], ni.tag_type)
+        if ni.uid_only:
+            self.assertEqual(record['pages'], [])
+        else:
+            self.assertEqual(record['pages'], ni.pages)
+            self.assertEqual(record['character_guid'], ni.character_guid)
+
+    def test_snapshot(self):
+        ni = nfc_parser(snapshot=True)
+        image = ni.snapshot()
+
+        if ni.uid_only:
+            self.assertEqual(image, b'')
+            self.assertIsNone(ni.get_page(0))
+        else:
+            num_pages = TAG_SPECS[ni.tag_type].pages
+            self.assertEqual(len(image), 4 * num_pages)
+            self.assertIs(ni.snapshot(), image) #served from the buffer
+
+            for i in range(num_pages):
+                self.assertEqual(ni.get_page(i), image[i * 4:i * 4 + 4])
+                self.assertEqual(ni.pages[i], image[i * 4:i * 4 + 4].hex())
+
+            self.assertEqual(str(ni).split('\n')[11:15], ni.tag.dump()[0:4])
+
+            ni.invalidate()
+            self.assertIsNot(ni.snapshot(), image)
+            self.assertEqual(ni.refresh(), image)
+            self.assertEqual(ni.snapshot(), bytes(ni.raw[0:4 * num_pages]))
+
+    def test_read_pages(self):
+        ni = nfc_parser()
+        if ni.uid_only:
+            raise unittest.SkipTest('uid-only card has no pages to read')
+
+        num_pages = TAG_SPECS[ni.tag_type].pages
+        image = ni.read_pages(0, num_pages, fast_read=False)
+        self.assertEqual(image, ni.raw[0:num_pages * 4])
+        self.assertEqual(ni.read_pages(5, 7), image[20:28])
+
+        if ni.fast_read:
+            self.assertEqual(ni.read_pages(0, num_pages, fast_read=True), image)
+
     def test_pprint(self):
         ni = nfc_parser()
         num_pages = TAG_SPECS[ni.tag_type].pages
@@ -183,6 +258,21 @@ class TestNFCDump(unittest.TestCase):
                 self.assertEqual(np.raw[start_byte:end_byte],
                                  bytearray(bytedata)[offset:])
 
+    def test_commit_image_dry_run(self):
+        lock_data = [#page, #byteoffset, #bytedata
+            ('02h', 2, [0x0F, 0x48, 0x0F, 0xE0]), #static lockpages
+        ]
+
+        ni = nfc_parser()
+        if ni.uid_only:
+            raise unittest.SkipTest('uid-only card has no pages to write')
+        ni.dump()
+
+        # the card already holds dump.bin: nothing but the override to write
+        written, skipped, error = ni.commit_image(byte_override=lock_data, diff=True, dry_run=True)
+        self.assertEqual(written, 0)
+        self.assertEqual(skipped, TAG_SPECS[ni.tag_type].pages - 3)
+
     def test_cc_byte(self):
         ni = nfc_parser()
         b = ni.get_page('03h')
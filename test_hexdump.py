@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import unittest
+from hexdump import render_pages, render, diff, page_roles, page_range, RESET
+from easy_nfc import nfc_parser, TAG_SPECS
+from sim_tag import sim_tag, sim_frontend
+
+IMAGE = bytes(range(256)) * 2 + bytes(28)
+
+class TestHexdump(unittest.TestCase):
+    def test_render_pages(self):
+        lines = list(render_pages(IMAGE))
+        self.assertEqual(len(lines), 135)
+        self.assertEqual(lines[0], '000  00 01 02 03')
+        self.assertEqual(lines[66], '066  08 09 0a 0b')
+        self.assertEqual(list(render_pages(IMAGE, 4, 6)), ['004  10 11 12 13', '005  14 15 16 17'])
+        self.assertEqual(list(render_pages(memoryview(IMAGE), 134, 500)), ['134  00 00 00 00'])
+
+    def test_matches_pprint(self):
+        for snapshot in (False, True):
+            ni = nfc_parser(clf=sim_frontend(sim_tag('NTAG215', image=IMAGE)), snapshot=snapshot)
+            num_pages = TAG_SPECS['NTAG215'].pages
+            expected = ['{}  {}'.format(str(p).zfill(3), ni.spaced_hex(ni.get_page(p)))
+                        for p in range(num_pages)]
+            self.assertEqual(ni._pprint, expected)
+            self.assertEqual(ni.pages, [ni.get_page(p).hex() for p in range(num_pages)])
+
+    def test_render(self):
+        lines = list(render(IMAGE, 0, 12))
+        self.assertEqual(lines[0], '000h 0000  00 01 02 03 04 05 06 07 08 09 0a 0b 0c 0d 0e 0f'
+                                   '  |................|')
+        self.assertEqual(lines[2][-18:], '| !"#$%&\'()*+,-./|')
+
+        short = list(render(IMAGE, 0, 2))[0] # a partial row keeps the columns aligned
+        self.assertEqual(short.index('|'), lines[0].index('|'))
+
+    def test_roles(self):
+        roles = page_roles(135)
+        self.assertEqual(roles[2], 'lock')
+        self.assertEqual(roles[130], 'dynamic lock')
+        self.assertEqual(roles[133], 'pwd')
+        self.assertNotIn(130, page_roles(16))
+
+        lines = list(render(IMAGE, roles=roles))
+        self.assertTrue(lines[0].endswith('uid, lock, cc'))
+        self.assertTrue(lines[32].endswith('dynamic lock, config'))
+        self.assertNotIn('lock', lines[1])
+
+        colored = list(render(IMAGE, roles=roles, color=True))
+        self.assertIn(RESET, colored[0])
+        self.assertNotIn(RESET, colored[1])
+
+    def test_diff(self):
+        changed = bytearray(IMAGE)
+        changed[16:20] = b'\xff' * 4
+        changed[40] = 0
+        self.assertEqual(list(diff(IMAGE, changed)),
+                         ['-004  10 11 12 13', '+004  ff ff ff ff',
+                          '...',
+                          '-010  28 29 2a 2b', '+010  00 29 2a 2b'])
+        self.assertEqual(list(diff(IMAGE, changed, context=1))[0:4],
+                         [' 003  0c 0d 0e 0f', '-004  10 11 12 13', '+004  ff ff ff ff',
+                          ' 005  14 15 16 17'])
+        self.assertEqual(list(diff(IMAGE, changed, start=5)), ['-010  28 29 2a 2b', '+010  00 29 2a 2b'])
+        self.assertEqual(list(diff(IMAGE, IMAGE)), [])
+        self.assertEqual(list(diff(IMAGE[0:8], IMAGE[0:12])), ['-002  (none)', '+002  08 09 0a 0b'])
+
+    def test_page_range(self):
+        self.assertEqual(page_range('4:16'), (4, 16))
+        self.assertEqual(page_range('15h:'), (21, None))
+        self.assertEqual(page_range(':8'), (0, 8))
+
+if __name__ == '__main__':
+    unittest.main()
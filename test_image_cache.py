@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import time
+import tempfile
+import unittest
+from image_cache import image_cache
+
+KEYS = (b'\x01' * 80, b'\x02' * 80)
+UID = '041f06d25c6485'
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = image_cache(KEYS, directory=self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get(b'source', UID))
+        self.cache.put(b'source', UID, b'image' * 108)
+
+        self.assertEqual(self.cache.get(b'source', UID), b'image' * 108)
+        self.assertEqual(self.cache.get(b'source', UID.upper()), b'image' * 108)
+        self.assertIsNone(self.cache.get(b'source', '04000000000000'))
+        self.assertIsNone(self.cache.get(b'other', UID))
+
+        self.assertEqual(self.cache.stats['hits'], 2)
+        self.assertEqual(self.cache.stats['misses'], 3)
+        self.assertEqual(self.cache.hit_rate, 0.4)
+
+    def test_keys_in_key(self):
+        self.cache.put(b'source', UID, b'image')
+        other = image_cache((b'\x03' * 80, KEYS[1]), directory=self.tmpdir.name)
+        self.assertIsNone(other.get(b'source', UID))
+        self.assertEqual(len(other), 1) #sees the same directory
+
+    def test_integrity(self):
+        self.cache.put(b'source', UID, b'image')
+        path, = [e.path for e in os.scandir(self.tmpdir.name)]
+        with open(path, 'r+b') as fh:
+            fh.seek(-1, os.SEEK_END)
+            fh.write(b'?')
+
+        self.assertIsNone(self.cache.get(b'source', UID))
+        self.assertEqual(self.cache.stats['corrupt'], 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_lru_eviction(self):
+        cache = image_cache(KEYS, directory=self.tmpdir.name, max_bytes=3 * (540 + 32))
+        for i in range(3):
+            cache.put(bytes([i]), UID, bytes(540))
+        cache.get(bytes([0]), UID) #most recently used now
+
+        cache.put(bytes([3]), UID, bytes(540))
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.stats['evicted'], 1)
+        self.assertIsNotNone(cache.get(bytes([0]), UID))
+        self.assertIsNone(cache.get(bytes([1]), UID))
+
+    def test_lru_survives_restart(self):
+        size = 3 * (540 + 32)
+        cache = image_cache(KEYS, directory=self.tmpdir.name, max_bytes=size)
+        for i in range(3):
+            cache.put(bytes([i]), UID, bytes(540))
+            time.sleep(0.01) # recency is kept as mtime; keep the order unambiguous
+        cache.get(bytes([0]), UID)
+
+        reopened = image_cache(KEYS, directory=self.tmpdir.name, max_bytes=size)
+        self.assertEqual(len(reopened), 3)
+        reopened.put(bytes([3]), UID, bytes(540))
+        self.assertIsNone(reopened.get(bytes([1]), UID)) # least recently used
+        for i in (0, 2, 3):
+            self.assertIsNotNone(reopened.get(bytes([i]), UID))
+
+    def test_shared_directory(self):
+        size = 2 * (540 + 32)
+        a = image_cache(KEYS, directory=self.tmpdir.name, max_bytes=size)
+        b = image_cache(KEYS, directory=self.tmpdir.name, max_bytes=size)
+        a.put(b'one', UID, bytes(540))
+        a.put(b'two', UID, bytes(540))
+        a.put(b'three', UID, bytes(540))
+
+        self.assertEqual(b.get(b'two', UID), bytes(540)) # unknown to b until now
+        self.assertEqual(b.get(b'three', UID), bytes(540))
+        self.assertEqual(len(b), 2)
+        self.assertEqual(b._size, size)
+        self.assertEqual(b.stats['hits'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import tempfile
+import unittest
+import nfc
+from easy_nfc import nfc_parser
+from metrics import registry, histogram
+from sim_tag import sim_tag, sim_frontend
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        registry.reset()
+        registry.enable()
+        self.clf = sim_frontend(sim_tag('NTAG215'))
+        self.ni = nfc_parser(clf=self.clf)
+
+    def tearDown(self):
+        registry.disable()
+        registry.reset()
+
+    def test_histogram(self):
+        h = histogram((0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 2.0):
+            h.observe(seconds)
+        self.assertEqual(h.cumulative(), [('0.1', 2), ('1.0', 3), ('+Inf', 4)])
+        self.assertEqual(h.count, 4)
+        self.assertAlmostEqual(h.sum, 2.65)
+
+    def test_operations(self):
+        self.ni.get_page(4)
+        self.ni.get_page(5) # served by the memory reader's cache, still an op
+        self.ni.write_page(4, b'\x00\x00\x00\x00')
+        self.ni.commit_image(image=bytes(540))
+
+        self.assertEqual(registry.operations['get_page'].count, 2)
+        self.assertEqual(registry.operations['write_page'].count, 1)
+        self.assertEqual(registry.operations['commit_page'].count, 133)
+        self.assertEqual(registry.commands['READ'].count, self.clf.commands['READ'])
+        self.assertEqual(registry.commands['WRITE'].count, 134)
+
+    def test_errors_by_page(self):
+        self.clf.fail_pages[8] = 3
+        self.assertIsNone(self.ni.get_page(8))
+        self.assertEqual(registry.errors[('READ', 8)], 1)
+
+    def test_naked_pages(self):
+        # NAKs and short responses fail in tag.read/write, not transceive
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, self.ni.tag.write, 0, bytes(4))
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, self.ni.tag.read, 200)
+        self.assertEqual(registry.errors, {('WRITE', 0): 1, ('READ', 200): 1})
+
+        self.clf.fail_pages[8] = 3 # counted once, by transceive
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, self.ni.tag.read, 8)
+        self.assertEqual(registry.errors[('READ', 8)], 1)
+
+    def test_disabled(self):
+        registry.disable()
+        self.ni.get_page(4)
+        self.assertEqual(registry.operations, {})
+        self.assertEqual(registry.commands, {})
+
+    def test_export(self):
+        self.ni.get_page(4)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            prom = os.path.join(tmpdir, 'nfc.prom')
+            registry.export(prom)
+            with open(prom, 'r') as fh:
+                text = fh.read()
+            self.assertIn('nfc_operation_seconds_count{op="get_page"} 1', text)
+            self.assertIn('nfc_command_seconds_bucket{{command="READ",le="+Inf"}} {0}'.format(
+                          self.clf.commands['READ']), text)
+
+            jsonl = os.path.join(tmpdir, 'nfc.jsonl')
+            registry.export(jsonl)
+            registry.export(jsonl)
+            with open(jsonl, 'r') as fh:
+                lines = [json.loads(line) for line in fh]
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[0]['operations']['get_page']['count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import time
+import tempfile
+import unittest
+import nfc
+from easy_nfc import nfc_parser
+from nfc_trace import recording_frontend, replay_frontend, trace_mismatch, summarize
+from sim_tag import sim_tag, sim_frontend
+
+class TestNfcTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'session.trace')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record(self, session, **kwargs):
+        """ Runs session(nfc_parser) against a recorded sim; returns its result """
+        self.sim = sim_frontend(sim_tag('NTAG215'), **kwargs)
+        with recording_frontend(self.sim, self.path, meta={'test': True}) as clf:
+            return session(nfc_parser(clf=clf))
+
+    def replay(self, session, **kwargs):
+        self.clf = replay_frontend(self.path, **kwargs)
+        return session(nfc_parser(clf=self.clf))
+
+    def test_replay(self):
+        def session(ni):
+            ni.write_page(4, b'\x01\x02\x03\x04')
+            return ni.uid, ni.tag_type, ni.read_image(), ni.get_page(4)
+
+        recorded = self.record(session)
+        self.assertEqual(self.replay(session), recorded)
+        self.assertEqual(self.clf.remaining, 0)
+        self.assertEqual(self.clf.commands, self.sim.commands)
+        self.assertEqual(self.clf.max_recv_data_size, self.sim.max_recv_data_size)
+
+        info = summarize(self.path)
+        self.assertEqual(info['meta'], {'test': True})
+        self.assertEqual(info['commands'], dict(self.sim.commands))
+        self.assertEqual(info['errors'], {'TimeoutError': 1}) # activate's AUTHENTICATE probe
+
+    def test_errors(self):
+        def session(ni):
+            self.assertRaises(nfc.tag.tt2.Type2TagCommandError, ni.read_pages, 0, 12, False)
+            return ni.read_pages(0, 12, False)
+
+        def failing(ni):
+            self.sim.fail_pages[8] = 3 # outlasts the retries in tag.transceive
+            return session(ni)
+
+        recorded = self.record(failing)
+        self.assertEqual(self.replay(session), recorded)
+        self.assertEqual(summarize(self.path)['errors'], {'TimeoutError': 1 + 3})
+
+    def test_mismatch(self):
+        first = lambda ni: ni.write_page(4, b'\x01\x02\x03\x04')
+        second = lambda ni: ni.write_page(5, b'\x05\x06\x07\x08')
+        self.record(lambda ni: (first(ni), second(ni)))
+        self.assertRaises(trace_mismatch, self.replay, second)
+        self.replay(lambda ni: (second(ni), first(ni)), strict=False)
+        self.assertEqual(self.clf.remaining, 0)
+        self.assertRaises(trace_mismatch, self.replay, lambda ni: ni.write_page(4, bytes(4)),
+                          strict=False)
+
+    def test_realtime(self):
+        session = lambda ni: ni.read_pages(0, 16, fast_read=False)
+        self.record(session, latency=0.005)
+        started = time.perf_counter()
+        self.replay(session)
+        fast = time.perf_counter() - started
+
+        started = time.perf_counter()
+        self.replay(session, realtime=True)
+        self.assertGreaterEqual(time.perf_counter() - started, summarize(self.path)['reader_seconds'])
+        self.assertLess(fast, summarize(self.path)['reader_seconds'])
+
+if __name__ == '__main__':
+    unittest.main()
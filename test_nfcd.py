@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import threading
+import subprocess
+import unittest
+from amiibo_db import amiibo_db
+from nfcd import nfcd
+from nfc_client import nfc_client, nfcd_error
+from sim_tag import sim_tag, sim_frontend
+from test_amiibo_db import SAMPLE_DB
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class TestNfcd(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        with open('amiibo.json', 'w') as fh:
+            json.dump(SAMPLE_DB, fh)
+
+        self.clf = sim_frontend(sim_tag('NTAG215'))
+        self.path = os.path.join(self.tmpdir.name, 'nfcd.sock')
+        self.daemon = nfcd([self.clf], self.path, interval=0.01)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.close()
+        self.thread.join()
+        os.chdir(self.cwd)
+        amiibo_db.forget()
+        self.tmpdir.cleanup()
+
+    def test_ping(self):
+        with nfc_client(self.path) as client:
+            info = client.ping()
+        self.assertEqual(info['readers'], ['reader0'])
+        self.assertFalse(info['keys'])
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_socket_in_use(self):
+        self.assertRaises(RuntimeError, nfcd, [sim_frontend()], self.path)
+        with nfc_client(self.path) as client: # the running daemon is untouched
+            self.assertEqual(client.ping()['readers'], ['reader0'])
+
+        stale = os.path.join(self.tmpdir.name, 'stale.sock')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(stale)
+        sock.close()
+        nfcd([sim_frontend()], stale).close()
+
+    def test_db_reload(self):
+        self.clf.tag.memory[84:92] = bytes.fromhex('0183000102420502')
+        with nfc_client(self.path) as client:
+            self.assertEqual(client.read()['name'], 'Tom Nook')
+
+            SAMPLE_DB['amiibos']['0x0183000102420502']['name'] = 'Tom Nook (updated)'
+            try:
+                with open('amiibo.json', 'w') as fh:
+                    json.dump(SAMPLE_DB, fh)
+            finally:
+                SAMPLE_DB['amiibos']['0x0183000102420502']['name'] = 'Tom Nook'
+            os.utime('amiibo.json', ns=(1, 1))
+            self.assertEqual(client.read()['name'], 'Tom Nook (updated)')
+
+    def test_read(self):
+        tag = self.clf.tag
+        tag.memory[84:92] = bytes.fromhex('0183000102420502')
+        with nfc_client(self.path) as client:
+            record = client.read(pages=True)
+            self.assertEqual(record['uid'], tag.uid.hex())
+            self.assertEqual(record['character_guid'], '0x0183000102420502')
+            self.assertEqual(len(record['pages']), 135)
+            self.assertEqual(client.dump(), bytes(tag.memory))
+            self.assertIn('UID         : ' + tag.uid.hex(), client.summary())
+
+            self.clf.present(sim_tag('NTAG213')) # swapped between commands
+            self.assertEqual(client.read()['tag_type'], 'NTAG213')
+
+    def test_no_tag(self):
+        self.clf.remove()
+        with nfc_client(self.path) as client:
+            started = time.perf_counter()
+            self.assertRaises(nfcd_error, client.summary, wait=0.05)
+            self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+            self.assertRaises(nfcd_error, client.read, reader='usb:001:001')
+            self.assertRaises(nfcd_error, client.call, 'format')
+
+            threading.Timer(0.05, self.clf.present, (sim_tag(),)).start()
+            self.assertEqual(len(client.dump(wait=2)), 540)
+
+    def test_provision(self):
+        tag = self.clf.tag
+        image = bytes(tag.memory[0:16]) + bytes(range(256)) * 2 + bytes(12)
+        with nfc_client(self.path) as client:
+            self.assertRaises(nfcd_error, client.provision, source=image) # no keys
+            result = client.provision(image=image, verify=True)
+        self.assertEqual(result['uid'], tag.uid.hex())
+        self.assertEqual(result['verified'], 131)
+        self.assertEqual(bytes(tag.memory[16:0x82 * 4]), image[16:0x82 * 4])
+        self.assertEqual(tag.memory[0x82 * 4:0x82 * 4 + 3], bytes([0x01, 0x00, 0x0f]))
+
+    def test_client_cli(self):
+        code = 'import sys, nfc_client; print("nfc" in sys.modules)'
+        out = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True)
+        self.assertEqual(out.stdout.strip(), b'False')
+
+        out = subprocess.run([sys.executable, os.path.join(HERE, 'nfc_client.py'), 'read',
+                              '--socket', self.path], capture_output=True)
+        self.assertEqual(out.returncode, 0)
+        self.assertEqual(json.loads(out.stdout)['uid'], self.clf.tag.uid.hex())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import time
+import tempfile
+import threading
+import unittest
+from provision_pool import provision_pool
+from sim_tag import sim_tag, sim_frontend
+from write_journal import write_journal
+
+def payload(source):
+    """ A 540-byte image with source's first byte repeated through user memory """
+    return bytes(16) + bytes([source[0]]) * 512 + bytes(12)
+
+def prepare(source, uid):
+    return payload(source)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.01)
+
+class TestProvisionPool(unittest.TestCase):
+    def pool(self, tags, **kwargs):
+        self.clfs = [sim_frontend(tag) for tag in tags]
+        return provision_pool(kwargs.pop('prepare', prepare), readers=self.clfs,
+                              interval=0.01, **kwargs)
+
+    def run_in_background(self, pool, timeout=5.0):
+        thread = threading.Thread(target=pool.run, args=(timeout,), daemon=True)
+        thread.start()
+        return thread
+
+    def test_two_readers(self):
+        tags = [sim_tag(), sim_tag()]
+        pool = self.pool(tags)
+        pool.submit(b'\x01', 'one')
+        pool.submit(b'\x02', 'two')
+        pool.run(timeout=5)
+
+        self.assertEqual(sorted(name for name, uid, reader in pool.done), ['one', 'two'])
+        self.assertEqual(pool.failed, [])
+        self.assertEqual({pool.stats[r]['written'] for r in pool.sessions}, {1})
+        self.assertEqual({tag.memory[16] for tag in tags}, {1, 2})
+
+    def test_failed_on_rotation(self):
+        broken = sim_tag()
+        write = broken.write
+        broken.write = lambda page, data: page != 10 and write(page, data) # NAKs page 10
+        pool = self.pool([broken, None])
+        pool.submit(b'\x07', 'seven')
+        thread = self.run_in_background(pool)
+
+        wait_for(lambda: pool.stats['reader0']['failed'] == 1)
+        good = sim_tag()
+        self.clfs[1].present(good)
+        thread.join()
+
+        self.assertEqual(pool.done, [('seven', good.uid.hex(), 'reader1')])
+        self.assertEqual(good.memory[16], 7)
+
+    def test_max_attempts(self):
+        def failing(source, uid):
+            raise ValueError('corrupt source')
+
+        pool = self.pool([sim_tag()], prepare=failing, max_attempts=2)
+        pool.submit(b'\x01', 'bad')
+        thread = self.run_in_background(pool)
+
+        # one reader: a job that failed on every reader may retry on it, on a new tag
+        wait_for(lambda: pool.stats['reader0']['failed'] == 1)
+        self.clfs[0].present(sim_tag())
+        thread.join()
+
+        self.assertEqual(pool.done, [])
+        self.assertEqual(len(pool.failed), 1)
+        self.assertEqual(pool.failed[0].attempts, 2)
+        self.assertEqual(pool.failed[0].failed_on, {'reader0'})
+
+    def test_bound_image(self):
+        other, target = sim_tag(), sim_tag()
+        pool = self.pool([other, None])
+        pool.submit_image(target.uid.hex(), payload(b'\x09'), 'bound')
+        thread = self.run_in_background(pool)
+
+        time.sleep(0.05) # other is polled, but the job is not for it
+        self.clfs[1].present(target)
+        thread.join()
+
+        self.assertEqual(pool.done, [('bound', target.uid.hex(), 'reader1')])
+        self.assertEqual(other.memory[16], 0)
+
+    def test_timeout(self):
+        pool = self.pool([sim_tag()])
+        pool.submit_image('04000000000000', payload(b'\x09'), 'absent')
+        started = time.perf_counter()
+        pool.run(timeout=0.2)
+
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual([job.name for job in pool.failed], ['absent'])
+        self.assertEqual(pool.jobs.unfinished_tasks, 0)
+
+    def test_poll_errors(self):
+        pool = self.pool([sim_tag()])
+        sense = self.clfs[0].sense
+        calls = []
+        def flaky(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise IOError('usb hiccup')
+            return sense(*args, **kwargs)
+        self.clfs[0].sense = flaky
+
+        pool.submit(b'\x01', 'one')
+        pool.run(timeout=5)
+        self.assertEqual([name for name, uid, reader in pool.done], ['one'])
+
+    def test_journal_rebind(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tag = sim_tag()
+            pool = self.pool([tag, None], journal=write_journal(tmpdir, sync=False))
+            self.clfs[0].remove_after = 40 # pulled partway through the write
+            pool.submit(b'\x05', 'five')
+            thread = self.run_in_background(pool)
+
+            wait_for(lambda: pool.stats['reader0']['failed'] == 1)
+            self.clfs[1].present(tag) # the same tag, on the other reader
+            thread.join()
+
+        self.assertEqual(pool.done, [('five', tag.uid.hex(), 'reader1')])
+        self.assertEqual(bytes(tag.memory[16:0x82 * 4]), payload(b'\x05')[16:0x82 * 4])
+        self.assertLess(self.clfs[1].commands['WRITE'], 130) # resumed, not rewritten
+
+if __name__ == '__main__':
+    unittest.main()
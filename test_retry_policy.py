@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import unittest
+import nfc
+from easy_nfc import nfc_parser, TAG_SPECS
+from retry_policy import retry_policy
+from sim_tag import sim_tag, sim_frontend
+
+IMAGE = bytes(range(256)) * 2 + bytes(28)
+NUM_PAGES = TAG_SPECS['NTAG215'].pages
+
+def noisy(error_rate, seed=3):
+    """ A frontend where each exchange times out with error_rate """
+    clf = sim_frontend(sim_tag('NTAG215', image=IMAGE), error_rate=error_rate, seed=seed)
+    clf.error_rate = 0.0 # quiet while sensing
+    ni = nfc_parser(clf=clf, retry=retry_policy(retries=4, budget=None, backoff=0))
+    clf.error_rate = error_rate
+    return clf, ni
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delay(self):
+        policy = retry_policy(backoff=0.01, factor=2, max_backoff=0.05)
+        self.assertEqual([policy.delay(n) for n in range(4)], [0.01, 0.02, 0.04, 0.05])
+
+    def test_no_policy(self):
+        clf = sim_frontend(sim_tag('NTAG215'))
+        ni = nfc_parser(clf=clf)
+        clf.fail_pages[8] = 3 # outlasts the retries in tag.transceive
+        self.assertIsNone(ni.get_page(8))
+        self.assertIsNone(ni.retry)
+
+    def test_page_retry(self):
+        clf = sim_frontend(sim_tag('NTAG215', image=IMAGE))
+        ni = nfc_parser(clf=clf, retry=retry_policy(backoff=0))
+        clf.fail_pages[8] = 3
+        self.assertEqual(ni.get_page(8), IMAGE[32:36])
+        self.assertEqual(ni.retry.stats['retries'], 1)
+        self.assertEqual(ni.retry.stats['recovered'], 1)
+
+        clf.fail_pages[4] = 3
+        ni.write_page(4, b'\x01\x02\x03\x04')
+        self.assertEqual(clf.tag.memory[16:20], b'\x01\x02\x03\x04')
+        self.assertEqual(ni.retry.stats['recovered'], 2)
+
+    def test_chunk_shrinks(self):
+        clf = sim_frontend(sim_tag('NTAG215', image=IMAGE))
+        ni = nfc_parser(clf=clf, retry=retry_policy(backoff=0))
+        full = ni.fast_read_pages
+
+        clf.fail_pages[0] = 3
+        self.assertEqual(ni.read_pages(0, NUM_PAGES)[16:], IMAGE[16:NUM_PAGES * 4])
+        self.assertEqual(ni.retry.stats['shrunk'], 1)
+        self.assertEqual(ni._chunk, full) # grown back after clean reads
+
+    def test_budget(self):
+        clf = sim_frontend(sim_tag('NTAG215'))
+        ni = nfc_parser(clf=clf, retry=retry_policy(retries=5, budget=2, backoff=0))
+        clf.remove()
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, ni.read_pages, 0, 8, False)
+        self.assertEqual(ni.retry.stats['retries'], 2)
+        self.assertEqual(ni.retry.stats['over_budget'], 1)
+
+        # every tag gets its own budget, the policy sums them up
+        policy = ni.retry.policy
+        clf.present(sim_tag('NTAG215'))
+        other = nfc_parser(clf=clf, retry=policy)
+        self.assertEqual(other.retry.remaining, 2)
+        self.assertEqual(policy.stats['retries'], 2)
+
+    def test_permanent(self):
+        clf = sim_frontend(sim_tag('NTAG215'))
+        ni = nfc_parser(clf=clf, retry=retry_policy(backoff=0))
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, ni.write_page, 0, bytes(4))
+        self.assertEqual(ni.retry.stats['permanent'], 1)
+        self.assertEqual(ni.retry.stats['retries'], 0)
+
+    def test_noisy_commit(self):
+        clf, ni = noisy(0.4)
+        result = ni.commit_image(image=IMAGE)
+        self.assertIsNone(result.error)
+        self.assertEqual(bytes(clf.tag.memory[16:NUM_PAGES * 4]), IMAGE[16:NUM_PAGES * 4])
+        self.assertGreater(ni.retry.stats['recovered'], 0)
+
+    def test_noisy_dump(self):
+        clf, ni = noisy(0.4)
+        for fast_read in (True, False):
+            self.assertEqual(ni.read_pages(0, NUM_PAGES, fast_read)[16:],
+                             IMAGE[16:NUM_PAGES * 4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import json
+import time
+import tempfile
+import unittest
+import nfc
+from amiibo_db import amiibo_db
+from easy_nfc import nfc_parser, reader_session, TAG_SPECS
+from sim_tag import sim_tag, sim_frontend, SIM_MODELS
+from benchmark import bench_suite, SUITE_OPS
+from test_amiibo_db import SAMPLE_DB
+
+class TestSimTag(unittest.TestCase):
+    def parser(self, model='NTAG215', **kwargs):
+        self.clf = sim_frontend(sim_tag(model), **kwargs)
+        return nfc_parser(clf=self.clf)
+
+    def test_models(self):
+        for model in SIM_MODELS:
+            if model == 'Type2Tag':
+                continue
+            ni = self.parser(model)
+            self.assertEqual(ni.tag_type, model)
+            self.assertEqual(ni.uid, self.clf.tag.uid.hex())
+            self.assertFalse(ni.uid_only)
+            self.assertEqual(ni.get_page(0), bytes(self.clf.tag.memory[0:4]))
+            self.assertEqual(ni.fast_read, model.startswith(('NTAG', 'MF0UL')))
+            self.assertEqual(len(ni.read_image()), SIM_MODELS[model].pages * 4)
+
+    def test_uid_only(self):
+        ni = self.parser('Type2Tag')
+        self.assertTrue(ni.uid_only)
+        self.assertEqual(len(ni.uid), 8)
+        self.assertIsNone(ni.get_page(4))
+
+    def test_write(self):
+        ni = self.parser()
+        ni.write_page(4, b'\x01\x02\x03\x04')
+        self.assertEqual(ni.get_page(4), b'\x01\x02\x03\x04')
+        self.assertEqual(self.clf.commands['WRITE'], 1)
+
+    def test_latency(self):
+        ni = self.parser(latency=0.01)
+        start = time.perf_counter()
+        ni.read_pages(0, 8, fast_read=False)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.02)
+
+    def test_error_injection(self):
+        ni = self.parser()
+        self.clf.fail_pages[8] = 3 # outlasts the retries in tag.transceive
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, ni.read_pages, 0, 12, False)
+        self.assertEqual(len(ni.read_pages(0, 12, False)), 48)
+
+        self.clf.error_rate = 1.0
+        self.assertIsNone(ni.get_page(40))
+
+        ni = self.parser(seed=1)
+        self.clf.remove_after = 3
+        self.assertRaises(nfc.tag.tt2.Type2TagCommandError, ni.read_pages,
+                          0, TAG_SPECS['NTAG215'].pages, False)
+        self.assertIsNone(self.clf.tag)
+
+    def test_record(self):
+        ni = self.parser()
+        self.clf.tag.memory[84:92] = bytes.fromhex('0183000102420502')
+        self.clf.commands.clear()
+
+        record = ni.record(pages=True)
+        self.assertEqual(record['uid'], ni.uid)
+        self.assertEqual(record['tag_type'], 'NTAG215')
+        self.assertEqual(record['character_guid'], '0x0183000102420502')
+        self.assertEqual(len(record['pages']), TAG_SPECS['NTAG215'].pages)
+        self.assertEqual(json.loads(json.dumps(record)), record)
+        # a single pass of FAST_READs (3 frames of 63 pages) plus READ_SIG
+        self.assertEqual(sum(self.clf.commands.values()), 3 + 1)
+
+        for model, lock_page in (('NTAG213', 0x28), ('NTAG216', 0xe2)):
+            ni = self.parser(model)
+            self.clf.tag.memory[lock_page * 4:lock_page * 4 + 3] = b'\x01\x02\x03'
+            record = ni.record()
+            self.assertEqual(record['dynamic_lock'], '010203')
+            self.assertEqual(ni.dynamic_lockpages, '01 02 03')
+
+        ni = self.parser('Ultralight')
+        self.assertIsNone(ni.record()['dynamic_lock'])
+
+        ni = self.parser('Type2Tag')
+        record = ni.record()
+        self.assertIsNone(record['character_guid'])
+        self.assertNotIn('pages', record)
+
+    def test_session_blank_tag(self):
+        summaries = []
+        session = reader_session(clf=sim_frontend(sim_tag('NTAG215')))
+        self.assertEqual(session.run(lambda ni: summaries.append(str(ni)), limit=1), 1)
+        self.assertIn('Character   : None', summaries[0])
+
+    def test_verify_image(self):
+        lock_data = [('82h', 3, [0x01, 0x00, 0x0F, 0xBD]), ('02h', 2, [0x0F, 0x48, 0x0F, 0xE0])]
+        ni = self.parser()
+        tag = self.clf.tag
+        image = bytes(tag.memory[0:16]) + bytes(range(256)) * 2 + bytes(12)
+        ni.commit_image(byte_override=lock_data, image=image)
+
+        self.clf.commands.clear()
+        result = ni.verify_image(image, lock_data)
+        self.assertEqual(result, (131, 0, []))
+        self.assertEqual(dict(self.clf.commands), {'FAST_READ': 3}) # no reopen, no page reads
+
+        tag.memory[40] ^= 0xff          # a data page
+        tag.memory[0x82 * 4 + 3] = 0x00 # the checked byte of the dynamic lock page
+        tag.memory[0x85 * 4] ^= 0xff    # PWD reads back as zeros, not checked
+        self.assertEqual(ni.verify_image(image, lock_data, rewrite=False).failed, [10, 0x82])
+
+        self.clf.commands.clear()
+        self.assertEqual(ni.verify_image(image, lock_data), (131, 2, []))
+        self.assertEqual(self.clf.commands['WRITE'], 2)
+        self.assertEqual(tag.memory[40:44], image[40:44])
+
+        write = tag.write # a page that ACKs writes but keeps its contents
+        tag.write = lambda page, data: page == 10 or write(page, data)
+        tag.memory[40] ^= 0xff
+        self.assertEqual(ni.verify_image(image, lock_data, attempts=2), (131, 2, [10]))
+
+    def test_snapshot(self):
+        self.clf = sim_frontend(sim_tag('NTAG215'))
+        tag = self.clf.tag
+        ni = nfc_parser(clf=self.clf, snapshot=True)
+        self.clf.commands.clear()
+
+        for i in range(3):
+            str(ni), ni.record(), ni.pages, ni.get_page(4), ni.character_guid
+        # one bulk read (3 frames of 63 pages) serves them all; READ_SIG is in record()
+        self.assertEqual(self.clf.commands['FAST_READ'], 3)
+        self.assertEqual(self.clf.commands['READ'], 0)
+
+        tag.memory[20:24] = b'\x01\x02\x03\x04' # changed underneath: still the snapshot
+        self.assertEqual(ni.get_page(5), bytes(4))
+        self.assertEqual(ni.refresh()[20:24], b'\x01\x02\x03\x04')
+        self.assertEqual(ni.get_page(5), b'\x01\x02\x03\x04')
+
+        ni.write_page(4, b'\x05\x06\x07\x08')
+        self.assertEqual(ni.get_page(4), b'\x05\x06\x07\x08')
+
+        image = bytes(tag.memory[0:16]) + bytes(range(256)) * 2 + bytes(12)
+        ni.commit_image(image=image)
+        self.clf.commands.clear()
+        self.assertEqual(ni.read_image()[16:0x82 * 4], image[16:0x82 * 4])
+        self.assertEqual(self.clf.commands['FAST_READ'], 3)
+
+    def test_commit_diff(self):
+        lock_data = [('82h', 3, [0x01, 0x00, 0x0F, 0xBD]), ('02h', 2, [0x0F, 0x48, 0x0F, 0xE0])]
+        ni = self.parser()
+        tag = self.clf.tag
+        image = bytearray(tag.memory[0:16]) + bytes(range(256)) * 2 + bytes(12)
+        self.assertEqual(ni.commit_image(byte_override=lock_data, image=image).written, 133)
+
+        image[40:44] = b'\x01\x02\x03\x04' # one data page changed
+        self.clf.commands.clear()
+        result = ni.commit_image(byte_override=lock_data, diff=True, image=image)
+        self.assertEqual(result, (3, 130, None)) # page 10, then the two overrides
+        self.assertEqual(self.clf.commands['WRITE'], 3)
+        self.assertEqual(bytes(tag.memory[16:0x82 * 4]), image[16:0x82 * 4])
+
+class TestBenchSuite(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        with open('amiibo.json', 'w') as fh:
+            json.dump(SAMPLE_DB, fh)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        amiibo_db.forget()
+        self.tmpdir.cleanup()
+
+    def test_suite(self):
+        results = bench_suite(min_time=0.01)
+        self.assertEqual(tuple(results), SUITE_OPS)
+        self.assertTrue(all(r['ops_per_sec'] > 0 for r in results.values()))
+        self.assertFalse(os.path.exists('dump.bin'))
+
+        snapshot = bench_suite(snapshot=True, min_time=0.01)
+        self.assertEqual(snapshot['__str__']['commands'], 0)
+        self.assertLess(snapshot['dump']['commands'], results['dump']['commands'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import unittest
+import easy_nfc
+import tag_profile
+from tag_profile import PROFILES, from_version, from_product, from_pages, page_roles
+from easy_nfc import nfc_parser, TAG_SPECS, OEM_BYTES
+from sim_tag import sim_tag, sim_frontend, SIM_MODELS
+
+class TestTagProfile(unittest.TestCase):
+    def test_layout(self):
+        ntag215 = PROFILES['NTAG215']
+        self.assertEqual((ntag215.user_start, ntag215.user_stop), (4, 130))
+        self.assertEqual(ntag215.dynamic_lock, 0x82)
+        self.assertEqual((ntag215.config, ntag215.pwd, ntag215.pack), ((131, 132), 133, 134))
+
+        ntag210 = PROFILES['NTAG210']
+        self.assertIsNone(ntag210.dynamic_lock)
+        self.assertEqual((ntag210.user_stop, ntag210.config, ntag210.pack), (16, (16, 17), 19))
+        self.assertEqual(PROFILES['MF0UL21'].dynamic_lock, 36)
+
+        for profile in PROFILES.values(): # the CC advertises the user memory
+            if profile.pages and profile.name != 'NTAG203':
+                self.assertLessEqual(profile.cc * 8, (profile.user_stop - profile.user_start) * 4)
+
+    def test_compat(self):
+        self.assertEqual(TAG_SPECS['NTAG213'].pages, 45)
+        self.assertEqual(TAG_SPECS['NTAG215'], (0x3e, 496, 135))
+        self.assertEqual(TAG_SPECS['Type2Tag'].pages, 0)
+        self.assertEqual(OEM_BYTES['NTAG215'][0], ('03h', bytes([0xe1, 0x10, 0x3e, 0x00])))
+        self.assertNotIn('Ultralight', OEM_BYTES)
+
+    def test_lookup(self):
+        for name, model in SIM_MODELS.items():
+            if model.version is not None:
+                self.assertEqual(from_version(model.version).name, name)
+            if model.pages:
+                self.assertEqual(from_product(model.product).name, name)
+        self.assertIsNone(from_version(bytes(8)))
+        self.assertIsNone(from_product('NTAG I2C 1K (NT3H1101)'))
+        self.assertEqual(from_product('Mifare Ultralight EV1 (MF0ULH21)').name, 'MF0UL21')
+        self.assertEqual(from_pages(41).pack, 40) # NTAG212 and MF0UL21 alike
+
+    def test_roles(self):
+        roles = page_roles(PROFILES['Ultralight C'])
+        self.assertEqual(roles[40], 'dynamic lock')
+        self.assertEqual(roles[43], 'config')
+        self.assertNotIn('pwd', roles.values())
+        self.assertEqual(page_roles(PROFILES['Type2Tag']), {})
+
+    def test_resolved_once(self):
+        ni = nfc_parser(clf=sim_frontend(sim_tag('NTAG212')))
+        self.assertEqual(ni.profile, PROFILES['NTAG212'])
+        try:
+            easy_nfc.resolve = None # would raise if looked up again
+            self.assertEqual(ni.tag_type, 'NTAG212')
+            self.assertEqual(len(ni.read_image()), 41 * 4)
+        finally:
+            easy_nfc.resolve = tag_profile.resolve
+        self.assertEqual(ni.dynamic_lockpages, '00 00 00')
+        self.assertIsNone(nfc_parser(clf=sim_frontend(sim_tag('NTAG210'))).dynamic_lockpages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import tempfile
+import unittest
+from easy_nfc import nfc_parser
+from sim_tag import sim_tag, sim_frontend
+from write_amiibo import lock_data
+from write_journal import write_journal
+
+UID = '041f06d25c6485'
+IMAGE = bytes(range(256)) * 2 + bytes(28)
+
+class TestWriteJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.journal = write_journal(self.tmpdir.name, sync=False)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_checkpoint(self):
+        self.assertIsNone(self.journal.checkpoint(UID, IMAGE))
+        with self.journal.open(UID, IMAGE) as entry:
+            entry.confirm(4)
+            entry.confirm(5)
+        self.assertEqual(self.journal.checkpoint(UID, IMAGE), 5)
+        self.assertEqual(self.journal.checkpoint(UID.upper(), IMAGE), 5)
+        self.assertIsNone(self.journal.checkpoint(UID, IMAGE[::-1]))
+        self.assertEqual(len(self.journal), 1)
+
+        self.journal.complete(UID, IMAGE)
+        self.assertIsNone(self.journal.checkpoint(UID, IMAGE))
+        self.assertEqual(len(self.journal), 0)
+
+    def test_torn_checkpoint(self):
+        with self.journal.open(UID, IMAGE) as entry:
+            entry.confirm(4)
+        with open(self.journal._path(UID, IMAGE), 'a') as fh:
+            fh.write('12') # crashed mid-line
+        self.assertEqual(self.journal.checkpoint(UID, IMAGE), 4)
+
+    def pulled_then_resumed(self, journal, pull_after=60):
+        """ Returns: (pages written before the tag was pulled, WRITEs spent finishing it) """
+        tag = sim_tag('NTAG215')
+        clf = sim_frontend(tag)
+        image = bytes(tag.memory[0:16]) + IMAGE[16:]
+
+        clf.remove_after = pull_after
+        pulled = nfc_parser(clf=clf).commit_image(byte_override=lock_data, image=image,
+                                                  journal=journal)
+        self.assertIsNotNone(pulled.error)
+        self.assertEqual(tag.memory[10:12], b'\x00\x00') # not locked half-written
+
+        clf.remove_after = None
+        clf.present(tag)
+        clf.commands.clear()
+        result = nfc_parser(clf=clf).commit_image(byte_override=lock_data, image=image,
+                                                  journal=journal)
+        self.assertIsNone(result.error)
+        self.assertEqual(bytes(tag.memory[16:520]), image[16:520])
+        self.assertEqual(tag.memory[10:12], b'\x0f\xe0')
+        return pulled.written, clf.commands['WRITE']
+
+    def test_resume(self):
+        # 135 pages, less 0-1 and the two override pages, then the overrides
+        lost, restarted = self.pulled_then_resumed(None)
+        self.assertEqual(restarted, 131 + len(lock_data))
+
+        saved, resumed = self.pulled_then_resumed(self.journal)
+        self.assertEqual(saved, lost)
+        self.assertEqual(resumed, restarted - saved)
+        self.assertEqual(len(self.journal), 0)
+
+if __name__ == '__main__':
+    unittest.main()
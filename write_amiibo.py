@@ -15,27 +15,107 @@ lock_data = [#page, #byteoffset, #bytedata
     ('02h', 2, [0x0F, 0x48, 0x0F, 0xE0]), #static lockpages
 ]
 
-ni = nfc_parser()
+def read_key_files(data_bin='unfixed-info.bin', tag_bin='locked-secret.bin'):
+    """ Returns the contents of the two retail key files """
+    with open(data_bin, 'rb') as fp_d, open(tag_bin, 'rb') as fp_t:
+        return (fp_d.read(), fp_t.read())
 
-with open('unfixed-info.bin', 'rb') as fp_d, open('locked-secret.bin', 'rb') as fp_t:
-    master_keys = AmiiboMasterKey.from_separate_bin(fp_d.read(), fp_t.read())
+def load_master_keys(data_bin='unfixed-info.bin', tag_bin='locked-secret.bin'):
+    """ Reads the two retail key files into an AmiiboMasterKey """
+    return AmiiboMasterKey.from_separate_bin(*read_key_files(data_bin, tag_bin))
 
-with open('orig.bin', 'rb') as fp:
-    dump = AmiiboDump(master_keys, fp.read())
+def prepare_image(master_keys, orig, uid):
+    """
+    Re-signs an amiibo dump for the tag it is about to be written to.
 
-try:
+    Parameters:
+    master_keys (AmiiboMasterKey): see load_master_keys
+    orig (bytes): the source amiibo dump
+    uid (str): hex uid of the target tag, e.g., nfc_parser.uid
+
+    Returns: bytes() object of the image to commit
+
+    Raises: crypto.AmiiboHMACDataError if orig does not verify (corrupt bin?)
+    """
+    dump = AmiiboDump(master_keys, orig)
     dump.unlock()
-except amiibo.crypto.AmiiboHMACDataError:
-    print('AmiiboHMACDataError error thrown (corrupt bin?)')
-    quit(1)
-else:
-    print(ni)
-    dump.uid_hex = ni.spaced_hex(ni.uid)
+    dump.uid_hex = nfc_parser.spaced_hex(uid)
     dump.lock()
     dump.unset_lock_bytes()
+    return bytes(dump.data)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--diff',
+                        action='store_true',
+                        default=False,
+                        help="only write pages that differ from the tag's contents")
+    parser.add_argument('--dry-run',
+                        action='store_true',
+                        default=False,
+                        help="show the pages that would be written, write nothing")
+    parser.add_argument('--cache',
+                        action='store_true',
+                        default=False,
+                        help="reuse images already re-keyed for this tag (see image_cache)")
+    parser.add_argument('--retries',
+                        type=int,
+                        default=0,
+                        help="retry transient RF failures up to N times per page (see retry_policy)")
+    parser.add_argument('--verify',
+                        action='store_true',
+                        default=False,
+                        help="read the tag back after writing and rewrite any page that differs")
+    parser.add_argument('--journal',
+                        action='store_true',
+                        default=False,
+                        help="resume an earlier write to this tag that was cut short")
+    args = parser.parse_args()
+
+    retry = None
+    if args.retries:
+        from retry_policy import retry_policy
+        retry = retry_policy(retries=args.retries)
+
+    ni = nfc_parser(retry=retry)
+    keys = read_key_files()
+    master_keys = AmiiboMasterKey.from_separate_bin(*keys)
+
+    with open('orig.bin', 'rb') as fp:
+        orig = fp.read()
+
+    prepare = prepare_image
+    if args.cache:
+        from image_cache import image_cache
+        prepare = image_cache(keys).prepare
+
+    try:
+        image = prepare(master_keys, orig, ni.uid)
+    except crypto.AmiiboHMACDataError:
+        print('AmiiboHMACDataError error thrown (corrupt bin?)')
+        quit(1)
+    else:
+        print(ni)
 
-    with open('dump.bin', 'wb') as fp:
-        fp.write(dump.data)
+        if not args.dry_run: # a copy of what the tag is about to hold
+            with open('dump.bin', 'wb') as fp:
+                fp.write(image)
 
-    ni.commit_image(byte_override=lock_data)
+        journal = None
+        if args.journal:
+            from write_journal import write_journal
+            journal = write_journal()
 
+        result = ni.commit_image(byte_override=lock_data, diff=args.diff, dry_run=args.dry_run,
+                                 image=image, journal=journal)
+        print('wrote {0} pages, skipped {1} unchanged'.format(result.written, result.skipped))
+        if args.verify and not args.dry_run and result.error is None:
+            verified = ni.verify_image(image, byte_override=lock_data)
+            print('verified {0} pages, rewrote {1}{2}'.format(
+                  verified.checked, verified.rewritten,
+                  ', still differing: {0}'.format(verified.failed) if verified.failed else ''))
+        if retry:
+            from retry_policy import format_stats
+            print('retry stats: {0}'.format(format_stats(retry.stats) or 'none needed'))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+__author__ = "William Dizon"
+__license__ = "MIT"
+__version__ = "0.0.1"
+__maintainer__ = "William Dizon"
+__email__ = "wdchromium@gmail.com"
+__status__ = "Development"
+
+import os
+import hashlib
+
+JOURNAL_DIR = 'write_journal'
+
+class journal_entry(object):
+    def __init__(self, path, sync=True):
+        """ An open journal for one (uid, image); see write_journal.open """
+        self.path = path
+        self.sync = sync
+        self._fh = open(path, 'a')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._fh.close()
+
+    def confirm(self, page):
+        """ Durably records that every data page up to page is written """
+        self._fh.write('{0}\n'.format(page))
+        self._fh.flush()
+        if self.sync:
+            os.fsync(self._fh.fileno())
+
+class write_journal(object):
+    def __init__(self, directory=JOURNAL_DIR, sync=True):
+        """
+        Checkpoints of interrupted commit_image calls, one small file per
+        (uid, image) being written, so a tag pulled mid-write can be
+        presented again and picked up where it left off.
+
+        A journal file lists the confirmed pages in write order, one per
+        line; only complete lines count, so a write torn by a crash
+        costs at most the page it was recording.
+
+        Parameters:
+        directory (str): where journal files live; created if missing
+        sync (bool): fsync every checkpoint (off only for tests/benches)
+
+        Returns: Nothing
+        """
+        self.directory = directory
+        self.sync = sync
+        os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        """ Number of unfinished writes on record """
+        return len([f for f in os.listdir(self.directory) if f.endswith('.journal')])
+
+    def _path(self, uid, image):
+        digest = hashlib.sha256(bytes(image)).hexdigest()
+        return os.path.join(self.directory, '{0}-{1}.journal'.format(uid.lower(), digest))
+
+    def checkpoint(self, uid, image):
+        """
+        Returns: the last page confirmed for image on tag uid (int), or
+                 None if no write of it was left unfinished
+        """
+        try:
+            with open(self._path(uid, image), 'r') as fh:
+                lines = fh.read().split('\n')[:-1] # drop any torn last line
+        except FileNotFoundError:
+            return None
+        return int(lines[-1]) if lines else None
+
+    def open(self, uid, image):
+        """ Returns: journal_entry recording the write of image to tag uid """
+        return journal_entry(self._path(uid, image), self.sync)
+
+    def complete(self, uid, image):
+        """ Forgets the write of image to tag uid, which has finished """
+        try:
+            os.remove(self._path(uid, image))
+        except FileNotFoundError:
+            pass